@@ -0,0 +1,268 @@
+"""
+analytics/indicator_planner.py
+-----------
+宣告式指標規格與執行計畫：
+    - 每個指標以運算節點（tuple）描述，例如 ("rolling_mean", ("col", "close_price"), 20)
+    - build_plan 合併相同節點並排出計算順序：MA_20 與 BB_middle 共用同一個 20 日均線，
+      RSI 的漲跌共用同一次 diff，要求再多指標也只付出不重複運算的成本
+    - evaluate_plan 依序在 NumPy 陣列上計算一次（一維為單檔、二維為面板的「序號 × 股票」矩陣），
+      移動視窗與 EWM 使用 pandas 的計算核心，結果與原本逐欄計算逐位元相同
+    - 均線帶（ribbon）由單一補償前綴和相減取得任意多個視窗的均線，成本不隨視窗數增加
+    - calculate_indicators 最後一次寫入所有輸出欄位，不逐欄修改呼叫端的 DataFrame
+"""
+
+from utils.helpers import setup_logger
+import numpy as np
+import pandas as pd
+from analytics.streaming_indicators import DEFAULT_PARAMS
+
+logger = setup_logger("indicator_planner")
+
+
+# ---------------------
+# 運算節點
+# ---------------------
+def col(name: str) -> tuple:
+    """輸入欄位"""
+    return ("col", name)
+
+def diff(x: tuple) -> tuple:
+    """與前一筆的差"""
+    return ("diff", x)
+
+def clip_lower(x: tuple, bound: float = 0) -> tuple:
+    """下限截斷"""
+    return ("clip_lower", x, bound)
+
+def clip_upper(x: tuple, bound: float = 0) -> tuple:
+    """上限截斷"""
+    return ("clip_upper", x, bound)
+
+def rolling_mean(x: tuple, window: int) -> tuple:
+    """移動平均"""
+    return ("rolling_mean", x, window)
+
+def rolling_std(x: tuple, window: int) -> tuple:
+    """移動標準差（ddof=1）"""
+    return ("rolling_std", x, window)
+
+def ewm_mean(x: tuple, span: int = None, alpha: float = None, min_periods: int = 0) -> tuple:
+    """指數移動平均（adjust=False）"""
+    return ("ewm_mean", x, span, alpha, min_periods)
+
+
+def prefix_sum(x: tuple) -> tuple:
+    """補償前綴和與有效筆數（多個均線視窗共用）"""
+    return ("prefix_sum", x)
+
+def window_mean(prefix: tuple, window: int) -> tuple:
+    """由前綴和相減取得的簡單移動平均"""
+    return ("window_mean", prefix, window)
+
+
+def compensated_prefix_sum(x: np.ndarray):
+    """
+    沿第 0 軸的補償前綴和：以 TwoSum 取得每一步累加的捨入誤差另行累計（與 Neumaier 補償相同），
+    缺值以 0 累加並另計有效筆數
+
+    參數：
+        x (np.ndarray): 一維或二維陣列
+
+    返回：
+        prefix (tuple[np.ndarray, np.ndarray, np.ndarray]): 前綴和、補償項、有效筆數（皆在首列補 0，長度 n + 1）
+    """
+    valid = ~np.isnan(x)
+    values = np.where(valid, x, 0.0)
+    zero = np.zeros((1,) + x.shape[1:])
+    total = np.cumsum(values, axis=0)
+    previous = np.concatenate([zero, total[:-1]])
+    part = total - previous
+    error = (previous - (total - part)) + (values - part)
+    return (
+        np.concatenate([zero, total]),
+        np.concatenate([zero, np.cumsum(error, axis=0)]),
+        np.concatenate([zero, np.cumsum(valid, axis=0)]),
+    )
+
+
+def prefix_window_mean(prefix, window: int) -> np.ndarray:
+    """
+    由前綴和計算簡單移動平均，視窗內有缺值時為 NaN（同 rolling(window).mean()）
+
+    參數：
+        prefix (tuple): compensated_prefix_sum 結果
+        window (int): 視窗長度
+
+    返回：
+        mean (np.ndarray)
+    """
+    total, comp, count = prefix
+    out = np.full((len(total) - 1,) + total.shape[1:], np.nan)
+    if len(out) >= window:
+        sums = (total[window:] - total[:-window]) + (comp[window:] - comp[:-window])
+        np.divide(sums, window, out=out[window - 1:])
+        if count[-1].min() < len(out):
+            out[window - 1:][(count[window:] - count[:-window]) < window] = np.nan
+    return out
+
+
+def _window(values: np.ndarray):
+    """以 pandas 包裝陣列以使用其移動視窗/EWM 計算核心（二維時逐欄計算）"""
+    return pd.DataFrame(values) if values.ndim == 2 else pd.Series(values)
+
+
+OPS = {
+    "diff": lambda x: np.diff(x, axis=0, prepend=np.nan),
+    "clip_lower": lambda x, bound: np.maximum(x, bound),
+    "clip_upper": lambda x, bound: np.minimum(x, bound),
+    "neg": lambda x: -x,
+    "add": lambda a, b: a + b,
+    "sub": lambda a, b: a - b,
+    "mul": lambda a, k: a * k,
+    "rsi": lambda gain, loss: 100 - (100 / (1 + gain / loss)),
+    "prefix_sum": compensated_prefix_sum,
+    "window_mean": prefix_window_mean,
+    "rolling_mean": lambda x, window: _window(x).rolling(window).mean().to_numpy(),
+    "rolling_std": lambda x, window: _window(x).rolling(window).std().to_numpy(),
+    "ewm_mean": lambda x, span, alpha, min_periods: _window(x).ewm(
+        span=span, alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy(),
+}
+
+
+# ---------------------
+# 指標規格
+# ---------------------
+def ma_spec(windows, column: str = "close_price", name: str = "MA_{w}") -> dict:
+    """移動平均線規格"""
+    return {name.format(w=w, column=column): rolling_mean(col(column), w) for w in windows}
+
+
+def ribbon_spec(windows, column: str = "close_price") -> dict:
+    """均線帶規格：所有視窗共用同一個前綴和，視窗再多也只多一次相減"""
+    prefix = prefix_sum(col(column))
+    return {ribbon_column(column, w): window_mean(prefix, w) for w in windows}
+
+
+def ribbon_column(column: str, window: int) -> str:
+    """均線帶欄位名稱，例如 close_price_ribbon_60"""
+    return f"{column}_ribbon_{window}"
+
+
+def rsi_spec(period: int = 14, method: str = "sma", column: str = "close_price") -> dict:
+    """RSI 規格（sma 或 wilder 平滑）"""
+    delta = diff(col(column))
+    gain, loss = clip_lower(delta), ("neg", clip_upper(delta))
+    if method == "wilder":
+        gain = ewm_mean(gain, alpha=1 / period, min_periods=period)
+        loss = ewm_mean(loss, alpha=1 / period, min_periods=period)
+    else:
+        gain, loss = rolling_mean(gain, period), rolling_mean(loss, period)
+    return {"RSI": ("rsi", gain, loss)}
+
+
+def macd_spec(fast: int = 12, slow: int = 26, signal: int = 9, column: str = "close_price") -> dict:
+    """MACD 與訊號線規格"""
+    macd = ("sub", ewm_mean(col(column), span=fast), ewm_mean(col(column), span=slow))
+    return {"MACD": macd, "Signal": ewm_mean(macd, span=signal)}
+
+
+def bollinger_spec(window: int = 20, num_std: int = 2, column: str = "close_price") -> dict:
+    """布林通道規格"""
+    middle = rolling_mean(col(column), window)
+    width = ("mul", rolling_std(col(column), window), num_std)
+    return {"BB_middle": middle, "BB_upper": ("add", middle, width), "BB_lower": ("sub", middle, width)}
+
+
+def build_indicator_spec(params: dict = None) -> dict:
+    """
+    依參數組合 calculate_all_indicators 的完整指標規格
+
+    參數：
+        params (dict): 指標參數（預設 DEFAULT_PARAMS；ribbon_windows 另加收盤價與成交量均線帶）
+
+    返回：
+        spec (dict[str, tuple]): {輸出欄位: 運算節點}，順序同 calculate_all_indicators
+    """
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    spec = ma_spec(p["ma_windows"])
+    spec.update(rsi_spec(p["rsi_period"], p["rsi_method"]))
+    spec.update(macd_spec(*p["macd"]))
+    spec.update(bollinger_spec(p["bb_window"], p["bb_std"]))
+    spec.update(ma_spec(p["volume_windows"], column="volume", name="{column}_MA{w}"))
+    for column in ("close_price", "volume") if p.get("ribbon_windows") else ():
+        spec.update(ribbon_spec(p["ribbon_windows"], column))
+    return spec
+
+
+# ---------------------
+# 執行計畫
+# ---------------------
+def is_node(value) -> bool:
+    """是否為運算節點（常數參數不會是 tuple）"""
+    return isinstance(value, tuple) and bool(value) and (value[0] == "col" or value[0] in OPS)
+
+
+def build_plan(spec: dict) -> list:
+    """
+    合併重複節點並排出計算順序（相依節點在前）
+
+    參數：
+        spec (dict[str, tuple]): 指標規格
+
+    返回：
+        plan (list[tuple]): 不重複的運算節點
+    """
+    plan, seen = [], set()
+
+    def visit(node):
+        if node in seen:
+            return
+        for arg in node[1:]:
+            if is_node(arg):
+                visit(arg)
+        seen.add(node)
+        plan.append(node)
+
+    for node in spec.values():
+        visit(node)
+    return plan
+
+
+def evaluate_plan(spec: dict, columns: dict, plan: list = None) -> dict:
+    """
+    依執行計畫計算指標，每個節點只計算一次
+
+    參數：
+        spec (dict[str, tuple]): 指標規格
+        columns (dict[str, np.ndarray]): 輸入欄位（一維或二維陣列）
+        plan (list[tuple]): build_plan 結果（None 時由 spec 產生）
+
+    返回：
+        values (dict[str, np.ndarray]): {輸出欄位: 計算結果}
+    """
+    results = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for node in plan or build_plan(spec):
+            if node[0] == "col":
+                results[node] = np.asarray(columns[node[1]], dtype=np.float64)
+            else:
+                results[node] = OPS[node[0]](*(results[a] if is_node(a) else a for a in node[1:]))
+    return {name: results[node] for name, node in spec.items()}
+
+
+def calculate_indicators(df: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    """
+    依規格計算指標並一次加入所有輸出欄位（回傳新的 DataFrame，不修改傳入的 df）
+
+    參數：
+        df (pd.Dataframe): 股價資料
+        spec (dict[str, tuple]): 指標規格
+
+    返回：
+        df (pd.Dataframe): 股價資料加上指標欄位（同名欄位以新值取代）
+    """
+    plan = build_plan(spec)
+    sources = {node[1] for node in plan if node[0] == "col"}
+    values = evaluate_plan(spec, {name: df[name].to_numpy() for name in sources}, plan)
+    out = pd.DataFrame(values, index=df.index)
+    return pd.concat([df.drop(columns=[c for c in out.columns if c in df.columns]), out], axis=1)
@@ -0,0 +1,311 @@
+"""
+analytics/indicator_store.py
+-----------
+預先計算的技術指標（stock_indicator_daily）：
+    - refresh_indicators：每日更新流程於股價寫入後執行，只為新交易日計算指標；
+      依 stock_indicator_state 保存的 StreamingIndicators 狀態接續，不重算整段歷史
+    - 計算狀態記錄參數雜湊 (params_hash)，參數或公式版本改變、或有早於最後計算日的股價補入時整檔重算
+    - 整檔重算以 panel_indicators 一次計算整批股票，不逐檔呼叫 calculate_all_indicators
+    - attach_indicators / attach_indicators_multi：Dashboard 與摘要表讀取已計算的指標，涵蓋不足時才即時計算
+      （即時計算時補上查詢區間之前的歷史，結果與預先計算相同）
+"""
+
+from utils.helpers import setup_logger
+import json
+import hashlib
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from analytics.indicators import calculate_all_indicators
+from analytics.streaming_indicators import StreamingIndicators
+from analytics.panel_indicators import calculate_panel_indicators, panel_to_frames
+from database.storage import get_storage
+from database.coverage import get_all_coverage
+from data_collector.data_updater import load_stock_data_multi
+from utils.trading_calendar import to_date
+
+logger = setup_logger("indicator_store")
+
+# 與 calculate_all_indicators 預設參數一致；修改參數或計算方式時調整 INDICATOR_VERSION，既有指標會整檔重算
+INDICATOR_PARAMS = {
+    "ma_windows": [5, 20],
+    "rsi_period": 14,
+    "rsi_method": "sma",
+    "macd": [12, 26, 9],
+    "bb_window": 20,
+    "bb_std": 2,
+    "volume_windows": [5],
+}
+INDICATOR_VERSION = 2
+INDICATOR_CHUNK = 100       # 每批處理的股票檔數（限制整檔重算時的記憶體用量）
+
+# calculate_all_indicators 欄位，依序對應 stock_indicator_daily 的 INDICATOR_COLUMNS
+FRAME_COLUMNS = ("MA_5", "MA_20", "RSI", "MACD", "Signal", "BB_middle", "BB_upper", "BB_lower", "volume_MA5")
+
+
+def params_hash() -> str:
+    """目前指標參數與版本的雜湊（16 碼）"""
+    payload = json.dumps({"params": INDICATOR_PARAMS, "version": INDICATOR_VERSION}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------
+# 計算
+# ---------------------
+def compute_indicator_frame(df: pd.DataFrame):
+    """
+    以完整歷史計算指標，並產生接續計算的狀態
+
+    參數：
+        df (pd.Dataframe): 單一股票股價資料（依交易日排序）
+
+    返回：
+        indicators (pd.Dataframe): FRAME_COLUMNS 指標
+        state (dict): StreamingIndicators.snapshot()
+    """
+    return extend_indicator_frame(None, df)
+
+
+def extend_indicator_frame(state, new: pd.DataFrame):
+    """
+    以保存的狀態接續計算新交易日的指標（每筆 O(1)，只處理新資料）
+
+    參數：
+        state (dict | None): compute_indicator_frame / 前次 extend 產生的狀態（None 為從頭計算）
+        new (pd.Dataframe): 最後計算日之後的股價資料
+
+    返回：
+        indicators (pd.Dataframe): 新交易日的 FRAME_COLUMNS 指標
+        state (dict): 更新後的狀態
+    """
+    engine = StreamingIndicators(INDICATOR_PARAMS) if state is None else StreamingIndicators.restore(state)
+    values = engine.run(new["close_price"].to_numpy(np.float64), new["volume"].to_numpy(np.float64))
+    return pd.DataFrame(values, columns=engine.columns())[list(FRAME_COLUMNS)], engine.snapshot()
+
+
+def warm_state(df: pd.DataFrame) -> dict:
+    """以完整歷史推進引擎（不輸出指標），取得接續計算的狀態"""
+    engine = StreamingIndicators(INDICATOR_PARAMS)
+    return engine.warm(df["close_price"].to_numpy(np.float64), df["volume"].to_numpy(np.float64)).snapshot()
+
+
+def to_indicator_rows(stock_id: str, dates, indicators: pd.DataFrame) -> list:
+    """指標轉為寫入 stock_indicator_daily 的 tuple（NaN 寫為 NULL）"""
+    values = indicators.to_numpy(np.float64)
+    cells = values.astype(object)
+    cells[np.isnan(values)] = None
+    return [(stock_id, day) + tuple(row) for day, row in zip(pd.DatetimeIndex(dates).date, cells.tolist())]
+
+
+# ---------------------
+# 每日更新
+# ---------------------
+def refresh_indicators(stock_ids=None, rebuild: bool = False, chunk_size: int = INDICATOR_CHUNK) -> dict:
+    """
+    更新預先計算的指標：已有狀態且參數相同者只計算新交易日，其餘整檔重算
+
+    參數：
+        stock_ids (list[str]): 限定的股票代碼（None 為 stock_price_coverage 中所有股票）
+        rebuild (bool): 是否全部整檔重算
+        chunk_size (int): 每批處理的股票檔數
+
+    返回：
+        report (dict | None): extended, rebuilt, skipped, rows；連線失敗時回傳 None
+    """
+    coverage = get_all_coverage()
+    if coverage is None:
+        return None
+    ids = [s for s in (stock_ids or sorted(coverage)) if s in coverage]
+    storage = get_storage()
+    current = params_hash()
+    report = {"extended": 0, "rebuilt": 0, "skipped": 0, "rows": 0}
+
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        states = storage.get_indicator_states(chunk)
+        to_rebuild, to_extend = [], {}
+        for stock_id in chunk:
+            state, cov = states.get(stock_id), coverage[stock_id]
+            if rebuild or state is None or state["params_hash"] != current or state["row_count"] > cov["row_count"]:
+                to_rebuild.append(stock_id)
+            elif to_date(state["last_date"]) < to_date(cov["last_date"]):
+                to_extend[stock_id] = state
+            elif state["row_count"] != cov["row_count"]:
+                # 最新交易日相同但筆數不同：有較早的資料補入
+                to_rebuild.append(stock_id)
+            else:
+                report["skipped"] += 1
+
+        rows, new_states = [], []
+        if to_extend:
+            since = min(to_date(s["last_date"]) for s in to_extend.values()) + timedelta(days=1)
+            until = max(to_date(coverage[s]["last_date"]) for s in to_extend)
+            frames = load_stock_data_multi(list(to_extend), since, until)
+            for stock_id, state in to_extend.items():
+                df = frames.get(stock_id, pd.DataFrame())
+                new = df[df["trade_date"] > pd.Timestamp(to_date(state["last_date"]))] if not df.empty else df
+                # 筆數對不上代表有早於最後計算日的資料補入，改為整檔重算
+                if new.empty or len(new) != coverage[stock_id]["row_count"] - state["row_count"]:
+                    to_rebuild.append(stock_id)
+                    continue
+                indicators, next_state = extend_indicator_frame(json.loads(state["state"]), new)
+                rows += to_indicator_rows(stock_id, new["trade_date"], indicators)
+                new_states.append(build_state_row(stock_id, current, new, state["row_count"] + len(new), next_state))
+                report["extended"] += 1
+
+        if to_rebuild:
+            since = min(to_date(coverage[s]["first_date"]) for s in to_rebuild)
+            until = max(to_date(coverage[s]["last_date"]) for s in to_rebuild)
+            frames = load_stock_data_multi(to_rebuild, since, until)
+            # 整檔重算的指標值以面板一次計算，計算狀態由引擎快速推進取得
+            for stock_id, df in panel_to_frames(calculate_panel_indicators(frames, INDICATOR_PARAMS)).items():
+                rows += to_indicator_rows(stock_id, df["trade_date"], df[list(FRAME_COLUMNS)])
+                new_states.append(build_state_row(stock_id, current, df, len(df), warm_state(df)))
+                report["rebuilt"] += 1
+
+        storage.write_indicators(rows, new_states, reset_ids=to_rebuild)
+        report["rows"] += len(rows)
+
+    print(f"✅ 技術指標更新完成：接續 {report['extended']} 檔、重算 {report['rebuilt']} 檔、"
+          f"已是最新 {report['skipped']} 檔，共寫入 {report['rows']} 筆")
+    logger.info(f"refresh_indicators report: {report}")
+    return report
+
+
+def build_state_row(stock_id: str, params: str, df: pd.DataFrame, row_count: int, state: dict) -> tuple:
+    """計算狀態列（依 INDICATOR_STATE_COLUMNS 排列）"""
+    return (stock_id, params, df["trade_date"].iloc[-1].date(), row_count, json.dumps(state))
+
+
+# ---------------------
+# 讀取
+# ---------------------
+def load_indicators(stock_ids, start_date, end_date) -> dict:
+    """
+    讀取預先計算的指標（只回傳參數雜湊與目前設定相同的股票）
+
+    參數：
+        stock_ids (list[str]): 股票代碼
+        start_date / end_date: 查詢區間
+
+    返回：
+        frames (dict[str, pd.Dataframe]): {stock_id: trade_date + FRAME_COLUMNS}
+    """
+    storage = get_storage()
+    current = params_hash()
+    states = storage.get_indicator_states(list(stock_ids))
+    valid = [s for s in stock_ids if s in states and states[s]["params_hash"] == current]
+    if not valid:
+        return {}
+    rows = storage.read_indicators(valid, start_date, end_date)
+    if not rows:
+        return {}
+    stock_col, date_col, *value_cols = zip(*rows)
+    df = pd.DataFrame({"stock_id": np.array(stock_col, dtype=object), "trade_date": pd.to_datetime(np.array(date_col, dtype="datetime64[D]"))})
+    for name, values in zip(FRAME_COLUMNS, value_cols):
+        df[name] = np.array(values, dtype=np.float64)
+    return {stock_id: group.drop(columns="stock_id").reset_index(drop=True) for stock_id, group in df.groupby("stock_id", sort=False)}
+
+
+def attach_indicators(df: pd.DataFrame, stock_id: str = None) -> pd.DataFrame:
+    """
+    為股價資料加上技術指標：預先計算的指標涵蓋所有交易日時直接讀取，否則即時計算
+
+    參數：
+        df (pd.Dataframe): 單一股票股價資料
+        stock_id (str): 股票代碼（None 時取 df 的 stock_id 欄位）
+
+    返回：
+        df (pd.Dataframe): 含 FRAME_COLUMNS 指標的股價資料
+    """
+    if df.empty:
+        return df
+    stock_id = stock_id or df["stock_id"].iloc[0]
+    try:
+        stored = load_indicators([stock_id], df["trade_date"].min(), df["trade_date"].max()).get(stock_id)
+    except Exception as e:
+        logger.warning(f"讀取 {stock_id} 預先計算指標失敗，改為即時計算：{e}")
+        stored = None
+    if stored is None or len(stored) != len(df) or not np.array_equal(stored["trade_date"].to_numpy(), df["trade_date"].to_numpy()):
+        history, offset = with_history({stock_id: df})[stock_id]
+        return calculate_all_indicators(history).iloc[offset:].reset_index(drop=True)
+
+    df = df.reset_index(drop=True).copy()
+    for col in FRAME_COLUMNS:
+        df[col] = stored[col].to_numpy()
+    return df
+
+
+def attach_indicators_multi(frames: dict) -> dict:
+    """
+    多檔股票版 attach_indicators：以單一查詢讀取預先計算的指標，涵蓋不足的股票合併為一次面板計算
+
+    參數：
+        frames (dict[str, pd.Dataframe]): {stock_id: 股價資料}
+
+    返回：
+        frames (dict[str, pd.Dataframe]): {stock_id: 含 FRAME_COLUMNS 指標的股價資料}，空資料原樣保留
+    """
+    frames = dict(frames)
+    present = {s: df for s, df in frames.items() if df is not None and not df.empty}
+    if not present:
+        return frames
+    try:
+        start = min(df["trade_date"].min() for df in present.values())
+        end = max(df["trade_date"].max() for df in present.values())
+        stored = load_indicators(list(present), start, end)
+    except Exception as e:
+        logger.warning(f"讀取預先計算指標失敗，改為即時計算：{e}")
+        stored = {}
+
+    pending = {}
+    for stock_id, df in present.items():
+        ind = stored.get(stock_id)
+        if ind is not None:
+            ind = ind[ind["trade_date"].between(df["trade_date"].min(), df["trade_date"].max())]
+        if ind is None or len(ind) != len(df) or not np.array_equal(ind["trade_date"].to_numpy(), df["trade_date"].to_numpy()):
+            pending[stock_id] = df
+            continue
+        df = df.reset_index(drop=True).copy()
+        for col in FRAME_COLUMNS:
+            df[col] = ind[col].to_numpy()
+        frames[stock_id] = df
+
+    if pending:
+        extended = with_history(pending)
+        computed = panel_to_frames(calculate_panel_indicators({s: history for s, (history, _) in extended.items()}))
+        for stock_id, (_, offset) in extended.items():
+            frames[stock_id] = computed[stock_id].iloc[offset:].reset_index(drop=True)
+    return frames
+
+
+def with_history(frames: dict) -> dict:
+    """
+    即時計算前在各股資料前補上資料庫中更早的股價：預先計算的指標以完整歷史為起點
+    （EMA 與移動視窗的累加值都與更早的資料相關），補上後兩條路徑的結果逐位元相同
+
+    參數：
+        frames (dict[str, pd.Dataframe]): {stock_id: 股價資料}
+
+    返回：
+        extended (dict[str, tuple[pd.Dataframe, int]]): {stock_id: (補上歷史的股價資料, 原資料起始列)}；
+                                                        讀取失敗時不補歷史
+    """
+    extended = {stock_id: (df.reset_index(drop=True), 0) for stock_id, df in frames.items()}
+    try:
+        coverage = get_all_coverage() or {}
+        older = {s: to_date(coverage[s]["first_date"]) for s, df in frames.items()
+                 if s in coverage and to_date(coverage[s]["first_date"]) < df["trade_date"].min().date()}
+        if not older:
+            return extended
+        until = max(frames[s]["trade_date"].min().date() for s in older) - timedelta(days=1)
+        history = load_stock_data_multi(list(older), min(older.values()), until)
+    except Exception as e:
+        logger.warning(f"讀取較早的股價失敗，只以查詢區間計算指標：{e}")
+        return extended
+
+    for stock_id, past in history.items():
+        df = extended[stock_id][0]
+        past = past[past["trade_date"] < df["trade_date"].min()]
+        extended[stock_id] = (pd.concat([past, df], ignore_index=True), len(past))
+    return extended
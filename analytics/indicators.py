@@ -2,14 +2,17 @@
 analytics/indicators.py
 -----------
 技術指標計算模組
-包含 MA、RSI、MACD、BB、VOL
+包含 MA、RSI、MACD、BB、VOL、均線帶（多視窗 MA）
 """
 
 from utils.helpers import setup_logger
 import pandas as pd
+from analytics.indicator_planner import build_indicator_spec, calculate_indicators, ribbon_spec
 
 logger = setup_logger("indicators")
 
+RIBBON_WINDOWS = [5, 10, 20, 60, 120, 240]     # 均線帶預設視窗（週、雙週、月、季、半年、年）
+
 # -------------------------
 # 計算移動平均線
 # -------------------------
@@ -32,7 +35,7 @@ def calculate_ma(df: pd.DataFrame, column: str = "close_price", windows=[5, 20])
 # -------------------------
 # 計算 RSI
 # -------------------------
-def calculate_rsi(df: pd.DataFrame, column: str = "close_price", period: int = 14):
+def calculate_rsi(df: pd.DataFrame, column: str = "close_price", period: int = 14, method: str = "sma"):
     """
     計算 RSI (相對強弱指標)
     
@@ -40,6 +43,7 @@ def calculate_rsi(df: pd.DataFrame, column: str = "close_price", period: int = 1
         df (pd.Dataframe): 股價資料
         column (str): 預設欄位
         period (int): 期間
+        method (str): sma（簡單平均）或 wilder（Wilder 平滑，alpha = 1 / period）
     
     返回：
         df (pd.Dataframe): 數據計算結果
@@ -47,8 +51,12 @@ def calculate_rsi(df: pd.DataFrame, column: str = "close_price", period: int = 1
     delta = df[column].diff()
     gain = delta.clip(lower=0)
     loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(period).mean()
-    avg_loss = loss.rolling(period).mean()
+    if method == "wilder":
+        avg_gain = gain.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+        avg_loss = loss.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    else:
+        avg_gain = gain.rolling(period).mean()
+        avg_loss = loss.rolling(period).mean()
     rs = avg_gain / avg_loss
     df["RSI"] = 100 - (100 / (1 + rs))
     return df
@@ -119,22 +127,40 @@ def calculate_volume_ma(df: pd.DataFrame, column: str = "volume", windows=[5]):
         df[f"{column}_MA{w}"] = df[column].rolling(w).mean()
     return df
 
+# -------------------------
+# 計算均線帶
+# -------------------------
+def calculate_ma_ribbon(df: pd.DataFrame, windows=RIBBON_WINDOWS, columns=("close_price", "volume")):
+    """
+    計算均線帶（多個視窗的簡單移動平均）：每個欄位只建立一次補償前綴和，各視窗相減取得，
+    視窗數增加時成本幾乎不變
+    
+    參數：
+        df (pd.Dataframe): 股價資料（不會被修改）
+        windows (list): 均線基準
+        columns (tuple): 計算的欄位
+    
+    返回：
+        df (pd.Dataframe): 加上 {欄位}_ribbon_{視窗} 欄位的結果
+    """
+    spec = {}
+    for column in columns:
+        spec.update(ribbon_spec(windows, column))
+    return calculate_indicators(df, spec)
+
 # -------------------------
 # 整合計算函數
 # -------------------------
-def calculate_all_indicators(df: pd.DataFrame):
+def calculate_all_indicators(df: pd.DataFrame, params: dict = None):
     """
-    計算所有技術指標
+    計算所有技術指標（經由 indicator_planner 合併共用的中間運算，一次寫入所有欄位）
     
     參數：
-        df (pd.Dataframe): 股價資料
+        df (pd.Dataframe): 股價資料（不會被修改）
+        params (dict): 指標參數（預設 MA 5/20、RSI 14、MACD 12/26/9、布林 20/2、成交量均線 5；
+                       ribbon_windows 另加收盤價與成交量均線帶，例如 {"ribbon_windows": RIBBON_WINDOWS}）
     
     返回：
         df (pd.Dataframe): 數據計算結果
     """
-    df = calculate_ma(df)
-    df = calculate_rsi(df)
-    df = calculate_macd(df)
-    df = calculate_bollinger_bands(df)
-    df = calculate_volume_ma(df)
-    return df
+    return calculate_indicators(df, build_indicator_spec(params))
@@ -0,0 +1,115 @@
+"""
+analytics/panel_indicators.py
+-----------
+多檔股票一次計算技術指標（面板計算）：
+    - 輸入長表（stock_id、trade_date、close_price、volume…）或寬表（欄位為 (欄位, stock_id) 的 MultiIndex）
+    - 各股依序號（第 n 根 K 棒）對齊成二維陣列，以 indicator_planner 的執行計畫對整個矩陣計算，
+      每個運算各一次完成，不逐檔呼叫 calculate_all_indicators
+    - 依序號而非日期對齊，停牌或較晚上市的股票不會插入空值，結果與逐檔計算逐位元相同
+    - 輸出以 (stock_id, trade_date) 為索引的整齊面板，可再以 panel_to_frames 切回各股 DataFrame
+"""
+
+from utils.helpers import setup_logger
+import numpy as np
+import pandas as pd
+from analytics.indicator_planner import build_indicator_spec, build_plan, evaluate_plan
+from database.price_cache import split_price_frame
+
+logger = setup_logger("panel_indicators")
+
+PANEL_KEYS = ["stock_id", "trade_date"]
+
+
+# ---------------------
+# 長表 / 寬表轉換
+# ---------------------
+def to_long_panel(prices) -> pd.DataFrame:
+    """
+    將輸入整理為依 stock_id、trade_date 排序的長表
+
+    參數：
+        prices (pd.Dataframe | dict[str, pd.Dataframe]): 長表、寬表或 {stock_id: 股價資料}
+
+    返回：
+        df (pd.Dataframe): 含 stock_id、trade_date 欄位的長表
+    """
+    if isinstance(prices, dict):
+        frames = [df.assign(stock_id=stock_id) for stock_id, df in prices.items() if df is not None and not df.empty]
+        prices = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=PANEL_KEYS)
+    elif isinstance(prices.columns, pd.MultiIndex):
+        prices = prices.rename_axis(index="trade_date", columns=[None, "stock_id"])
+        prices = prices.stack(level="stock_id").dropna(how="all").reset_index()
+    elif isinstance(prices.index, pd.MultiIndex):
+        prices = prices.reset_index()
+
+    missing = [col for col in PANEL_KEYS + ["close_price", "volume"] if col not in prices.columns]
+    if missing:
+        raise ValueError(f"股價面板缺少欄位：{missing}")
+    return prices.sort_values(PANEL_KEYS, kind="stable").reset_index(drop=True)
+
+
+def bar_positions(stock_ids: np.ndarray):
+    """
+    已排序長表各列對應的（序號, 股票）位置
+
+    參數：
+        stock_ids (np.ndarray): 依 stock_id 排序的股票代碼
+
+    返回：
+        rows (np.ndarray): 該股第幾根 K 棒
+        cols (np.ndarray): 股票欄位編號
+        shape (tuple[int, int]): 二維陣列大小（最長序號, 股票數）
+    """
+    cols, uniques = pd.factorize(stock_ids, sort=False)
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    lengths = np.diff(np.r_[starts, len(cols)])
+    rows = np.arange(len(cols)) - np.repeat(starts, lengths)
+    return rows, cols, (int(lengths.max()) if len(lengths) else 0, len(uniques))
+
+
+def to_bar_matrix(values: np.ndarray, rows: np.ndarray, cols: np.ndarray, shape) -> np.ndarray:
+    """長表欄位依（序號, 股票）放入二維陣列，較短的股票尾端補 NaN"""
+    matrix = np.full(shape, np.nan)
+    matrix[rows, cols] = values
+    return matrix
+
+
+# ---------------------
+# 計算
+# ---------------------
+def calculate_panel_indicators(prices, params: dict = None) -> pd.DataFrame:
+    """
+    一次計算多檔股票的所有技術指標
+
+    參數：
+        prices (pd.Dataframe | dict[str, pd.Dataframe]): 長表、寬表或 {stock_id: 股價資料}
+        params (dict): 指標參數（預設與 calculate_all_indicators 相同）
+
+    返回：
+        panel (pd.Dataframe): 以 (stock_id, trade_date) 為索引，原有欄位加上指標欄位
+    """
+    df = to_long_panel(prices)
+    if df.empty:
+        return df.set_index(PANEL_KEYS)
+    rows, cols, shape = bar_positions(df["stock_id"].to_numpy())
+    spec = build_indicator_spec(params)
+    plan = build_plan(spec)
+    sources = {node[1] for node in plan if node[0] == "col"}
+    matrices = evaluate_plan(spec, {name: to_bar_matrix(df[name].to_numpy(np.float64), rows, cols, shape) for name in sources}, plan)
+    indicators = pd.DataFrame({name: m[rows, cols] for name, m in matrices.items()}, index=df.index)
+    panel = pd.concat([df.drop(columns=[c for c in indicators.columns if c in df.columns]), indicators], axis=1)
+    logger.info(f"panel indicators: {shape[1]} stocks, {len(panel)} rows")
+    return panel.set_index(PANEL_KEYS)
+
+
+def panel_to_frames(panel: pd.DataFrame) -> dict:
+    """
+    將面板切回各股 DataFrame（與單檔讀取的欄位配置相同）
+
+    參數：
+        panel (pd.Dataframe): calculate_panel_indicators 結果
+
+    返回：
+        frames (dict[str, pd.Dataframe]): {stock_id: 股價與指標}
+    """
+    return split_price_frame(panel.reset_index())
@@ -8,12 +8,13 @@ from utils.helpers import setup_logger
 import pandas as pd
 from io import BytesIO
 from analytics.trend_analysis import analyze_trend
+from analytics.indicator_store import attach_indicators_multi
 
 logger = setup_logger("portfolio_stats")
 
 def generate_summary_table(stock_data_dict):
     """
-    多股票技術指標摘要表
+    多股票技術指標摘要表（尚未含指標的股價資料改讀預先計算的指標）
     
     參數：
         stock_data_dict (dict): 股價資訊
@@ -24,9 +25,14 @@ def generate_summary_table(stock_data_dict):
 
     summary_rows = []
 
+    # 尚未含指標的股票合併為一次讀取/面板計算
+    pending = {s: df for s, (_, df) in stock_data_dict.items() if df is not None and not df.empty and "MA_5" not in df.columns}
+    attached = attach_indicators_multi(pending) if pending else {}
+
     for stock_id, (stock_name, df) in stock_data_dict.items():
         if df is None or df.empty:
             continue
+        df = attached.get(stock_id, df)
 
         latest = df.iloc[-1]
         close = latest["close_price"]
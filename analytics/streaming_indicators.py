@@ -0,0 +1,417 @@
+"""
+analytics/streaming_indicators.py
+-----------
+逐筆更新的技術指標引擎：每新增一根 K 棒只需 O(1) 計算，可保存/還原狀態
+    - RollingMean：移動平均（補償加法的累計和，與 pandas rolling().mean() 相同演算法）
+    - RollingVar：移動變異數（Welford 演算法，與 pandas rolling().std() 相同）
+    - EWMean：指數移動平均（adjust=False，含缺值時的權重衰減，與 pandas ewm().mean() 相同）
+    - StreamingIndicators：組合出 MA、RSI（SMA / Wilder）、MACD、布林通道、成交量均線，
+      輸出與 analytics/indicators 的批次函式一致
+每日更新與即時輪詢可由 snapshot() 保存的狀態接續，不需重算歷史。
+"""
+
+from utils.helpers import setup_logger
+import math
+from collections import deque
+import numpy as np
+
+logger = setup_logger("streaming_indicators")
+
+DEFAULT_PARAMS = {
+    "ma_windows": [5, 20],
+    "rsi_period": 14,
+    "rsi_method": "sma",
+    "macd": [12, 26, 9],
+    "bb_window": 20,
+    "bb_std": 2,
+    "volume_windows": [5],
+}
+
+
+class RollingMean:
+    """
+    移動平均：加入與移出分別以 Kahan 補償累加，並追蹤負值數與連續相同值（結果與 pandas 逐位元相同）
+
+    參數：
+        window (int): 視窗長度
+        min_periods (int): 最少有效筆數（預設同 window）
+    """
+
+    def __init__(self, window: int, min_periods: int = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self.nobs = 0
+        self.total = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.neg_ct = 0
+        self.same_ct = 0
+        self.prev_value = math.nan
+
+    def update(self, value: float) -> float:
+        """加入一筆並回傳目前平均"""
+        self.values.append(value)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(value)
+        return self.value()
+
+    def _add(self, value: float):
+        if math.isnan(value):
+            return
+        self.nobs += 1
+        y = value - self.comp_add
+        t = self.total + y
+        self.comp_add = t - self.total - y
+        self.total = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct += 1
+        self.same_ct = self.same_ct + 1 if value == self.prev_value else 1
+        self.prev_value = value
+
+    def _remove(self, value: float):
+        if math.isnan(value):
+            return
+        self.nobs -= 1
+        y = -value - self.comp_remove
+        t = self.total + y
+        self.comp_remove = t - self.total - y
+        self.total = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct -= 1
+
+    def value(self) -> float:
+        """目前平均（有效筆數不足時為 NaN）"""
+        if self.nobs < self.min_periods or self.nobs == 0:
+            return math.nan
+        result = self.total / self.nobs
+        if self.same_ct >= self.nobs:
+            return self.prev_value
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    def snapshot(self) -> dict:
+        """可 JSON 序列化的狀態"""
+        state = {k: v for k, v in vars(self).items() if k != "values"}
+        state["values"] = list(self.values)
+        return state
+
+    @classmethod
+    def restore(cls, state: dict):
+        """由 snapshot() 還原"""
+        obj = cls(state["window"], state["min_periods"])
+        obj.__dict__.update({k: v for k, v in state.items() if k != "values"})
+        obj.values = deque(state["values"])
+        return obj
+
+
+class RollingVar:
+    """
+    移動變異數（Welford 演算法加入/移出，ddof=1，結果與 pandas rolling().var() 相同）
+
+    參數：
+        window (int): 視窗長度
+        min_periods (int): 最少有效筆數（預設同 window）
+        ddof (int): 自由度修正
+    """
+
+    def __init__(self, window: int, min_periods: int = None, ddof: int = 1):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.ddof = ddof
+        self.values = deque()
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+
+    def update(self, value: float) -> float:
+        """加入一筆並回傳目前變異數"""
+        self.values.append(value)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(value)
+        return self.value()
+
+    def _add(self, value: float):
+        if math.isnan(value):
+            return
+        self.nobs += 1
+        prev_mean = self.mean - self.comp_add
+        y = value - self.comp_add
+        t = y - self.mean
+        self.comp_add = t + self.mean - y
+        self.mean = self.mean + t / self.nobs if self.nobs else 0.0
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+
+    def _remove(self, value: float):
+        if math.isnan(value):
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean - self.comp_remove
+            y = value - self.comp_remove
+            t = y - self.mean
+            self.comp_remove = t + self.mean - y
+            self.mean -= t / self.nobs
+            self.ssqdm -= (value - prev_mean) * (value - self.mean)
+        else:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+
+    def value(self) -> float:
+        """目前變異數（有效筆數不足時為 NaN）"""
+        if self.nobs < self.min_periods or self.nobs <= self.ddof:
+            return math.nan
+        return max(self.ssqdm / (self.nobs - self.ddof), 0.0)
+
+    def std(self) -> float:
+        """目前標準差"""
+        var = self.value()
+        return math.sqrt(var) if var >= 0 else math.nan
+
+    snapshot = RollingMean.snapshot
+
+    @classmethod
+    def restore(cls, state: dict):
+        """由 snapshot() 還原"""
+        obj = cls(state["window"], state["min_periods"], state["ddof"])
+        obj.__dict__.update({k: v for k, v in state.items() if k != "values"})
+        obj.values = deque(state["values"])
+        return obj
+
+
+class EWMean:
+    """
+    指數移動平均（adjust=False、ignore_na=False，缺值期間權重照樣衰減，與 pandas ewm().mean() 相同）
+
+    參數：
+        span (int): 期間（alpha = 2 / (span + 1)），與 alpha 擇一
+        alpha (float): 平滑係數
+        min_periods (int): 最少有效筆數
+    """
+
+    def __init__(self, span: int = None, alpha: float = None, min_periods: int = 0):
+        if alpha is None:
+            com = (span - 1) / 2.0
+            alpha = 1.0 / (1.0 + com)
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.weighted = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+        self.started = False
+
+    def update(self, value: float) -> float:
+        """加入一筆並回傳目前平均"""
+        observed = not math.isnan(value)
+        self.nobs += observed
+        if not self.started:
+            self.started = True
+            self.weighted = value
+            self.old_wt = 1.0
+        elif not math.isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if observed:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * value) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif observed:
+            self.weighted = value
+        return self.weighted if self.nobs >= max(self.min_periods, 1) else math.nan
+
+    def snapshot(self) -> dict:
+        """可 JSON 序列化的狀態"""
+        return dict(vars(self))
+
+    @classmethod
+    def restore(cls, state: dict):
+        """由 snapshot() 還原"""
+        obj = cls(alpha=state["alpha"], min_periods=state["min_periods"])
+        obj.__dict__.update(state)
+        return obj
+
+
+class StreamingIndicators:
+    """
+    單一股票的逐筆指標引擎，輸出欄位與 calculate_all_indicators 相同
+
+    參數：
+        params (dict): 指標參數（預設 DEFAULT_PARAMS）
+    """
+
+    def __init__(self, params: dict = None):
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        p = self.params
+        fast, slow, signal = p["macd"]
+        self.ma = {w: RollingMean(w) for w in p["ma_windows"]}
+        self.volume_ma = {w: RollingMean(w) for w in p["volume_windows"]}
+        period = p["rsi_period"]
+        if p["rsi_method"] == "wilder":
+            self.gain = EWMean(alpha=1.0 / period, min_periods=period)
+            self.loss = EWMean(alpha=1.0 / period, min_periods=period)
+        else:
+            self.gain = RollingMean(period)
+            self.loss = RollingMean(period)
+        self.ema_fast = EWMean(span=fast)
+        self.ema_slow = EWMean(span=slow)
+        self.signal = EWMean(span=signal)
+        self.bb_mean = RollingMean(p["bb_window"])
+        self.bb_var = RollingVar(p["bb_window"])
+        self.prev_close = math.nan
+        self.count = 0
+
+    def columns(self) -> list:
+        """輸出欄位名稱（順序同 calculate_all_indicators）"""
+        p = self.params
+        return ([f"MA_{w}" for w in p["ma_windows"]] + ["RSI", "MACD", "Signal", "BB_middle", "BB_upper", "BB_lower"]
+                + [f"volume_MA{w}" for w in p["volume_windows"]])
+
+    def update(self, close: float, volume: float) -> dict:
+        """
+        加入一根 K 棒並回傳該日所有指標
+
+        參數：
+            close (float): 收盤價（缺值為 NaN）
+            volume (float): 成交量
+
+        返回：
+            values (dict[str, float])
+        """
+        close, volume = float(close), float(volume)
+        values = {f"MA_{w}": ma.update(close) for w, ma in self.ma.items()}
+
+        delta = close - self.prev_close if self.count else math.nan
+        gain = max(delta, 0.0) if not math.isnan(delta) else math.nan
+        loss = -min(delta, 0.0) if not math.isnan(delta) else math.nan
+        avg_gain, avg_loss = self.gain.update(gain), self.loss.update(loss)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = np.float64(avg_gain) / np.float64(avg_loss)
+            values["RSI"] = float(100 - (100 / (1 + rs)))
+
+        fast, slow = self.ema_fast.update(close), self.ema_slow.update(close)
+        values["MACD"] = fast - slow
+        values["Signal"] = self.signal.update(values["MACD"])
+
+        middle = self.bb_mean.update(close)
+        self.bb_var.update(close)
+        std = self.bb_var.std()
+        values["BB_middle"] = middle
+        values["BB_upper"] = middle + self.params["bb_std"] * std
+        values["BB_lower"] = middle - self.params["bb_std"] * std
+
+        for w, ma in self.volume_ma.items():
+            values[f"volume_MA{w}"] = ma.update(volume)
+
+        self.prev_close = close
+        self.count += 1
+        return values
+
+    def run(self, closes, volumes) -> np.ndarray:
+        """
+        依序加入多根 K 棒
+
+        參數：
+            closes (Iterable[float]): 收盤價
+            volumes (Iterable[float]): 成交量
+
+        返回：
+            values (np.ndarray): shape (筆數, len(columns()))
+        """
+        columns = self.columns()
+        rows = [[v[c] for c in columns] for v in (self.update(c, vol) for c, vol in zip(closes, volumes))]
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(columns))
+
+    def warm(self, closes, volumes):
+        """
+        推進至歷史末端但不輸出指標（指標值已由批次/面板計算取得、只需接續狀態時使用）：
+        與 run 相同逐筆推進所有累加器（移動視窗的補償累加值與完整歷史相關，
+        只餵入最後一個視窗會與逐筆計算有捨入差異），只是不組出每筆的輸出
+
+        參數：
+            closes (Iterable[float]): 收盤價
+            volumes (Iterable[float]): 成交量
+
+        返回：
+            engine (StreamingIndicators): 自身
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        if not len(closes):
+            return self
+        deltas = np.diff(closes, prepend=self.prev_close if self.count else np.nan)
+        gains = np.where(np.isnan(deltas), np.nan, np.maximum(deltas, 0.0))
+        losses = np.where(np.isnan(deltas), np.nan, -np.minimum(deltas, 0.0))
+        windows = [(ma, closes) for ma in self.ma.values()] + [(ma, volumes) for ma in self.volume_ma.values()]
+        windows += [(self.bb_mean, closes), (self.bb_var, closes)]
+        if isinstance(self.gain, RollingMean):
+            windows += [(self.gain, gains), (self.loss, losses)]
+        else:
+            for gain, loss in zip(gains.tolist(), losses.tolist()):
+                self.gain.update(gain)
+                self.loss.update(loss)
+        for close in closes.tolist():
+            macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+            self.signal.update(macd)
+        for rolling, values in windows:
+            for value in values.tolist():
+                rolling.update(value)
+        self.prev_close = float(closes[-1])
+        self.count += len(closes)
+        return self
+
+    def snapshot(self) -> dict:
+        """
+        保存引擎狀態（可 JSON 序列化）
+
+        參數：
+            NA
+
+        返回：
+            state (dict)
+        """
+        return {
+            "params": self.params,
+            "ma": {str(w): ma.snapshot() for w, ma in self.ma.items()},
+            "volume_ma": {str(w): ma.snapshot() for w, ma in self.volume_ma.items()},
+            "gain": self.gain.snapshot(),
+            "loss": self.loss.snapshot(),
+            "ema_fast": self.ema_fast.snapshot(),
+            "ema_slow": self.ema_slow.snapshot(),
+            "signal": self.signal.snapshot(),
+            "bb_mean": self.bb_mean.snapshot(),
+            "bb_var": self.bb_var.snapshot(),
+            "prev_close": self.prev_close,
+            "count": self.count,
+        }
+
+    @classmethod
+    def restore(cls, state: dict):
+        """
+        由 snapshot() 還原引擎
+
+        參數：
+            state (dict): snapshot() 結果
+
+        返回：
+            engine (StreamingIndicators)
+        """
+        engine = cls(state["params"])
+        average = EWMean if engine.params["rsi_method"] == "wilder" else RollingMean
+        engine.ma = {int(w): RollingMean.restore(s) for w, s in state["ma"].items()}
+        engine.volume_ma = {int(w): RollingMean.restore(s) for w, s in state["volume_ma"].items()}
+        engine.gain = average.restore(state["gain"])
+        engine.loss = average.restore(state["loss"])
+        engine.ema_fast = EWMean.restore(state["ema_fast"])
+        engine.ema_slow = EWMean.restore(state["ema_slow"])
+        engine.signal = EWMean.restore(state["signal"])
+        engine.bb_mean = RollingMean.restore(state["bb_mean"])
+        engine.bb_var = RollingVar.restore(state["bb_var"])
+        engine.prev_close = state["prev_close"]
+        engine.count = state["count"]
+        return engine
@@ -0,0 +1,288 @@
+"""
+data_collector/daily_quote_fetcher.py
+---------------
+全市場每日行情匯入：
+    - TWSE 上市：MI_INDEX (type=ALLBUT0999) 每日收盤行情
+    - TPEx 上櫃：每日收盤行情 (dailyQuotes)
+每個交易日各市場只需一次請求即可取得所有股票 OHLCV，
+解析為 stock_price_daily 的 tuple 批次格式（依 PRICE_COLUMNS 排列）後寫入資料庫。
+"""
+
+from utils.helpers import setup_logger
+from datetime import date
+import time
+from database.data_loader import insert_stock_price
+from data_collector.http_cache import cached_get, invalidate, IMMUTABLE_TTL
+from utils.trading_calendar import trading_days, to_date
+
+logger = setup_logger("daily_quote_fetcher")
+
+# ========== 設定 ==========
+TWSE_DAILY_URL = "https://www.twse.com.tw/exchangeReport/MI_INDEX?response=json&type=ALLBUT0999&date={date}"
+TPEX_DAILY_URL = "https://www.tpex.org.tw/www/zh-tw/afterTrading/dailyQuotes?date={date}&id=&response=json"
+TWSE_TABLE_KEYWORD = "每日收盤行情"
+REQUEST_PAUSE = 3.0  # 連續請求間隔秒數（交易所有流量限制）
+
+# 各市場欄位名稱：(代號, 開盤, 最高, 最低, 收盤, 成交股數)
+TWSE_FIELDS = ("證券代號", "開盤價", "最高價", "最低價", "收盤價", "成交股數")
+TPEX_FIELDS = ("代號", "開盤", "最高", "最低", "收盤", "成交股數")
+# 舊版 TPEx (aaData) 無欄位名稱，依位置取值
+TPEX_LEGACY_INDEX = (0, 4, 5, 6, 2, 8)
+
+
+def parse_number(text):
+    """
+    解析交易所數字字串（去除千分位；"--"、空白等無成交記號回傳 None）
+
+    參數：
+        text (str): 數字字串
+
+    返回：
+        float | None
+    """
+    text = str(text).strip().replace(",", "")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_quote_rows(rows, index, trade_date: str):
+    """
+    依欄位位置將行情列轉換為 stock_price_daily tuple 批次，略過當日無成交的股票
+
+    參數：
+        rows (list[list]): 行情資料列
+        index (tuple[int]): (代號, 開盤, 最高, 最低, 收盤, 成交股數) 欄位位置
+        trade_date (str): 交易日 (YYYY-MM-DD)
+
+    返回：
+        result (list[tuple]): 股價資料
+    """
+    i_id, i_open, i_high, i_low, i_close, i_volume = index
+    result = []
+    for row in rows:
+        prices = [parse_number(row[i]) for i in (i_open, i_high, i_low, i_close)]
+        if None in prices:
+            continue
+        volume = parse_number(row[i_volume])
+        result.append((str(row[i_id]).strip(), trade_date, *prices, int(volume or 0)))
+    return result
+
+
+def find_field_index(fields, names):
+    """
+    依欄位名稱找出各欄位位置（名稱會去除前後空白）
+
+    參數：
+        fields (list[str]): 報表欄位名稱
+        names (tuple[str]): 欲尋找的欄位名稱
+
+    返回：
+        index (tuple[int] | None): 欄位位置，缺少任一欄位時回傳 None
+    """
+    stripped = [str(f).strip() for f in fields]
+    try:
+        return tuple(stripped.index(name) for name in names)
+    except ValueError:
+        return None
+
+
+def parse_twse_daily_report(payload: dict, trade_date) -> list:
+    """
+    解析 TWSE MI_INDEX 每日收盤行情 JSON
+    同時支援新版 (tables) 與舊版 (fieldsN / dataN) 格式
+
+    參數：
+        payload (dict): MI_INDEX 回傳 JSON
+        trade_date (str | date): 交易日
+
+    返回：
+        rows (list[tuple]): 股價資料（非交易日回傳空 list）
+    """
+    trade_date = to_date(trade_date).strftime("%Y-%m-%d")
+    tables = list(payload.get("tables") or [])
+    for key in payload:
+        if key.startswith("fields") and f"data{key[6:]}" in payload:
+            tables.append({"fields": payload[key], "data": payload[f"data{key[6:]}"]})
+
+    for table in tables:
+        if "title" in table and TWSE_TABLE_KEYWORD not in str(table["title"]):
+            continue
+        index = find_field_index(table.get("fields") or [], TWSE_FIELDS)
+        if index is not None:
+            return parse_quote_rows(table.get("data") or [], index, trade_date)
+    return []
+
+
+def parse_tpex_daily_report(payload: dict, trade_date) -> list:
+    """
+    解析 TPEx 每日收盤行情 JSON
+    同時支援新版 (tables) 與舊版 (aaData) 格式
+
+    參數：
+        payload (dict): TPEx 回傳 JSON
+        trade_date (str | date): 交易日
+
+    返回：
+        rows (list[tuple]): 股價資料（非交易日回傳空 list）
+    """
+    trade_date = to_date(trade_date).strftime("%Y-%m-%d")
+    for table in payload.get("tables") or []:
+        index = find_field_index(table.get("fields") or [], TPEX_FIELDS)
+        if index is not None:
+            return parse_quote_rows(table.get("data") or [], index, trade_date)
+    if payload.get("aaData"):
+        return parse_quote_rows(payload["aaData"], TPEX_LEGACY_INDEX, trade_date)
+    return []
+
+
+def request_json(url: str, ttl: float = None) -> dict:
+    """
+    發出交易所 JSON 請求（經由 http_cache）
+
+    參數：
+        url (str): 請求網址
+        ttl (float): 快取新鮮期限（秒），None 時依端點設定
+
+    返回：
+        dict: 回傳 JSON
+    """
+    resp = cached_get(url, ttl=ttl, timeout=15)
+    resp.raise_for_status()
+    try:
+        return resp.json()
+    except ValueError:
+        invalidate(url)  # 流量限制等非 JSON 回應不可留在快取
+        raise
+
+
+def report_ttl(trade_date: date):
+    """
+    已過去交易日的報表不會再變動，永久快取；當日報表依端點 TTL 重新驗證
+
+    參數：
+        trade_date (date): 交易日
+
+    返回：
+        ttl (float | None)
+    """
+    return IMMUTABLE_TTL if trade_date < date.today() else None
+
+
+def is_final_report(payload: dict) -> bool:
+    """
+    是否為可永久快取的報表：stat 為 OK 或含有行情表格；
+    錯誤訊息、查無資料、流量限制等回應日後可能不同，不可永久快取
+
+    參數：
+        payload (dict): 交易所回傳 JSON
+
+    返回：
+        bool
+    """
+    return str(payload.get("stat", "")).upper() == "OK" or bool(payload.get("tables") or payload.get("aaData"))
+
+
+def request_report(url: str, trade_date: date) -> dict:
+    """
+    依交易日取得行情報表：過去交易日先以永久快取讀取，內容不是完整報表時改依端點 TTL 重新驗證
+
+    參數：
+        url (str): 請求網址
+        trade_date (date): 交易日
+
+    返回：
+        dict: 回傳 JSON
+    """
+    ttl = report_ttl(trade_date)
+    payload = request_json(url, ttl=ttl)
+    if ttl == IMMUTABLE_TTL and not is_final_report(payload):
+        payload = request_json(url)
+    return payload
+
+
+def fetch_twse_daily(trade_date) -> list:
+    """
+    抓取 TWSE 上市股票單日全市場行情
+
+    參數：
+        trade_date (str | date): 交易日
+
+    返回：
+        rows (list[tuple]): 股價資料
+    """
+    d = to_date(trade_date)
+    payload = request_report(TWSE_DAILY_URL.format(date=d.strftime("%Y%m%d")), d)
+    return parse_twse_daily_report(payload, d)
+
+
+def fetch_tpex_daily(trade_date) -> list:
+    """
+    抓取 TPEx 上櫃股票單日全市場行情
+
+    參數：
+        trade_date (str | date): 交易日
+
+    返回：
+        rows (list[tuple]): 股價資料
+    """
+    d = to_date(trade_date)
+    payload = request_report(TPEX_DAILY_URL.format(date=d.strftime("%Y/%m/%d")), d)
+    return parse_tpex_daily_report(payload, d)
+
+
+MARKET_FETCHERS = {"TW": fetch_twse_daily, "TWO": fetch_tpex_daily}
+
+
+def ingest_market_daily(trade_date, markets=("TW", "TWO")) -> int:
+    """
+    匯入單日全市場行情至 stock_price_daily
+
+    參數：
+        trade_date (str | date): 交易日
+        markets (tuple[str]): 市場別 (TW 上市 / TWO 上櫃)
+
+    返回：
+        written (int): 寫入筆數
+    """
+    written = 0
+    for i, market in enumerate(markets):
+        if i:
+            time.sleep(REQUEST_PAUSE)
+        try:
+            rows = MARKET_FETCHERS[market](trade_date)
+        except Exception as e:
+            print(f"⚠️ {market} {trade_date} 行情抓取失敗：{e}")
+            logger.warning(f"ingest_market_daily {market} {trade_date} 失敗：{e}")
+            continue
+        if rows and insert_stock_price(rows):
+            written += len(rows)
+    return written
+
+
+def backfill_market_daily(start_date, end_date, markets=("TW", "TWO")) -> dict:
+    """
+    依日期區間逐日匯入全市場行情（依交易日曆略過週末與休市日）
+
+    參數：
+        start_date (str | date): 起始日期
+        end_date (str | date): 結束日期
+        markets (tuple[str]): 市場別 (TW 上市 / TWO 上櫃)
+
+    返回：
+        summary (dict[str, int]): {交易日: 寫入筆數}
+    """
+    summary = {}
+    for day in trading_days(to_date(start_date), to_date(end_date)):
+        if summary:
+            time.sleep(REQUEST_PAUSE)
+        summary[day.strftime("%Y-%m-%d")] = ingest_market_daily(day, markets)
+
+    print(f"✅ 全市場行情回補完成：{len(summary)} 日，共 {sum(summary.values())} 筆")
+    return summary
+
+
+# ========== 便利測試區（本檔直接執行時） ==========
+if __name__ == "__main__":
+    print(len(fetch_twse_daily(date.today())))
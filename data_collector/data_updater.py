@@ -2,24 +2,45 @@
 data_collector/data_updater.py
 ---------------
 負責檢查資料庫資料完整性，若使用者查詢區間內有缺資料，
-則自動從 Yahoo Finance 補抓並寫入 MySQL。
+則自動從 Yahoo Finance 補抓並寫入資料庫（MySQL 或 SQLite，見 database/storage）。
 同時確保台股清單存在。
 """
 
 from utils.helpers import setup_logger
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, timedelta
-from database.db_connection import get_connection, close_connection
-from data_collector.yahoo_api import fetch_stock_data, fetch_stock_name
+from database.db_connection import get_pool_stats
+from data_collector.yahoo_api import fetch_stock_data, fetch_stock_data_batch, fetch_stock_name, BATCH_CHUNK_SIZE
 from database.data_loader import insert_stock_price
+from database.coverage import get_coverage, get_all_last_dates
+from database.storage import get_storage
+from database.price_cache import load_price_history, rows_to_price_frame, split_price_frame, CACHE_ENABLED
+from data_collector.update_journal import UpdateJournal
 from utils.stock_info_map import get_stock_name, get_stock_type
+from utils.trading_calendar import (
+    count_missing_sessions, trading_days, expected_latest_session, covered_ranges, to_date, CalendarCoverageError,
+)
+import numpy as np
 import pandas as pd
 
 logger = setup_logger("data_updater")
 
+# 並行更新設定
+UPDATE_WORKERS = 8          # 並行更新的執行緒數
+MAX_RETRIES = 3             # 單檔股票最多重試次數
+RETRY_BACKOFF = 2.0         # 重試等待秒數（每次加倍）
+
+# 缺口補抓設定
+GAP_BRIDGE_SESSIONS = 5     # 兩段缺口間僅隔幾個已有交易日時合併為一次請求（重抓部分由 upsert 覆蓋）
+TW_MARKET_TYPES = ("TW", "TWO")  # 適用 TWSE 交易日曆的市場別（上市 / 上櫃）
+EMPTY_SETTLE_DAYS = 7       # 迄日早於幾天前的無資料區間才寫入 stock_price_empty_interval（較新的可能只是 Yahoo 尚未更新）
+_empty_intervals = set()    # 本程序中已補抓但無資料、尚未寫入資料庫的近期區間，避免重複請求
+
 # ---------------------
 # 載入資料
 # ---------------------
-def load_stock_data(stock_id: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+def load_stock_data(stock_id: str, start_date: str = None, end_date: str = None, float_dtype=np.float64) -> pd.DataFrame:
     """
     從資料庫讀取股價資料
     
@@ -27,35 +48,63 @@ def load_stock_data(stock_id: str, start_date: str = None, end_date: str = None)
         stock_id (str): 股票代碼
         start_date (str): 查詢起始日期
         end_date (str): 查詢結束日期
+        float_dtype: 價格欄位型別（np.float64 或 np.float32）
     
     返回：
-        df (pd.Dataframe): 股價資料
+        df (pd.Dataframe): 股價資料（依交易日排序）
     """
-    conn = get_connection()
-    if not conn:
+    df = load_stock_data_multi([stock_id], start_date, end_date, float_dtype).get(stock_id)
+    if df is None:
+        print("⚠️ 無資料可分析")
         return pd.DataFrame()
+    return df
 
-    cursor = conn.cursor(dictionary=True)
 
-    query = f"SELECT * FROM stock_price_daily WHERE stock_id = %s"
-    params = [stock_id]
-    if start_date and end_date:
-        query += " AND trade_date BETWEEN %s AND %s"
-        params.extend([start_date, end_date])
+def load_stock_data_multi(stock_ids, start_date=None, end_date=None, float_dtype=np.float64) -> dict:
+    """
+    以單一查詢讀取多檔股票股價資料：只取需要的欄位、排序交由 SQL，
+    由 tuple 資料列直接建立 float/int64 欄位（不經 dict 與 Decimal 物件）
+    指定區間時經由 price_cache 讀取（已結束年度讀本地 Parquet，只有缺少或未結束的分區查詢資料庫）
+    
+    參數：
+        stock_ids (list[str]): 股票代碼
+        start_date (str): 查詢起始日期
+        end_date (str): 查詢結束日期
+        float_dtype: 價格欄位型別（np.float64 或 np.float32）
+    
+    返回：
+        frames (dict[str, pd.Dataframe]): {stock_id: 股價資料}，查無資料的股票不列入
+    """
+    stock_ids = list(dict.fromkeys(stock_ids))
+    if not stock_ids:
+        return {}
+    if CACHE_ENABLED and start_date and end_date:
+        try:
+            return load_price_history(stock_ids, start_date, end_date, float_dtype)
+        except Exception as e:
+            logger.warning(f"股價快取讀取失敗，改查詢資料庫：{e}")
+    return split_price_frame(query_price_frame(stock_ids, start_date, end_date, float_dtype=float_dtype))
 
-    cursor.execute(query, tuple(params))
-    rows = cursor.fetchall()
-    cursor.close()
-    close_connection(conn)
 
-    if not rows:
-        print("⚠️ 無資料可分析")
+def query_price_frame(stock_ids, start_date=None, end_date=None, intervals=None, float_dtype=np.float64) -> pd.DataFrame:
+    """
+    經由儲存後端讀取股價並建立具型別的 DataFrame（依 stock_id、trade_date 排序）
+    
+    參數：
+        stock_ids (list[str]): 股票代碼
+        start_date / end_date: 查詢區間（皆有值時才限制）
+        intervals (list[tuple[date, date]]): 多個日期區間
+        float_dtype: 價格欄位型別
+    
+    返回：
+        df (pd.Dataframe): stock_id, trade_date, open_price ~ close_price, volume；讀取失敗時回傳空表
+    """
+    try:
+        rows = get_storage().read_prices(stock_ids, start_date, end_date, intervals)
+    except Exception as e:
+        logger.error(f"讀取股價失敗：{e}")
         return pd.DataFrame()
-
-    df = pd.DataFrame(rows)
-    df["trade_date"] = pd.to_datetime(df["trade_date"])
-    df = df.sort_values("trade_date")
-    return df
+    return rows_to_price_frame(rows, float_dtype)
 
 
 # ---------------------
@@ -63,7 +112,8 @@ def load_stock_data(stock_id: str, start_date: str = None, end_date: str = None)
 # ---------------------
 def check_stock_data_exists(stock_id: str, start_date: str, end_date: str) -> bool:
     """
-    確認目標股股價資料存在於資料庫
+    確認目標股股價資料存在於資料庫（查詢 stock_price_coverage，與股價表大小無關）
+    以覆蓋範圍判斷：資料期間與查詢區間有交集即視為存在，中段缺口由 find_missing_intervals 偵測
     
     參數：
         stock_id (str): 股票代碼
@@ -71,22 +121,230 @@ def check_stock_data_exists(stock_id: str, start_date: str, end_date: str) -> bo
         end_date (str): 查詢結束日期
     
     返回：
-        count > 0 (bool)
+        exists (bool)
     """
+    coverage = get_coverage(stock_id)
+    if not coverage or not coverage["row_count"]:
+        return False
+    return coverage["first_date"] <= to_date(end_date) and coverage["last_date"] >= to_date(start_date)
+
+def is_tw_market(stock_id: str) -> bool:
+    """
+    是否為上市/上櫃股票（只有這些股票適用 TWSE 交易日曆）：
+    4 碼數字代碼（與 fetch_and_store 相同視為台股）、帶 .TW / .TWO 後綴，或於股票對照表登錄為上市/上櫃（例如 00632R）
     
-    conn = get_connection()
-    if not conn:
+    參數：
+        stock_id (str): 股票代碼
+    
+    返回：
+        bool
+    """
+    if stock_id.isdigit() and len(stock_id) == 4:
+        return True
+    suffix = stock_id.rsplit(".", 1)[-1].upper() if "." in stock_id else None
+    return suffix in TW_MARKET_TYPES or get_stock_type(stock_id) in TW_MARKET_TYPES
+
+def find_missing_intervals(stock_id: str, start_date, end_date, existing_dates=None, bridge: int = GAP_BRIDGE_SESSIONS) -> list:
+    """
+    找出查詢區間內缺少的交易日區間（含中段缺口），並合併為最少的補抓請求。
+    只檢查至目前已收盤的交易日，且只檢查休市日表涵蓋的年度；已確認無資料的區間不視為缺口。
+    非上市/上櫃股票（見 is_tw_market）不適用 TWSE 交易日曆，一律回傳空 list。
+    existing_dates 未提供時先查 stock_price_coverage，
+    覆蓋範圍已涵蓋區間且無缺口時直接回傳，否則以一次查詢取得資料庫已有交易日。
+    
+    參數：
+        stock_id (str): 股票代碼
+        start_date (str | date): 查詢起始日期
+        end_date (str | date): 查詢結束日期
+        existing_dates (Iterable[date]): 資料庫已有的交易日（例如已載入的 DataFrame）
+        bridge (int): 兩段缺口間隔的已有交易日數不超過此值時合併
+    
+    返回：
+        intervals (list[tuple[date, date]]): [(缺口起日, 缺口迄日)]，皆為交易日
+    """
+    if not is_tw_market(stock_id):
+        return []
+    start_date = to_date(start_date)
+    try:
+        end_date = min(to_date(end_date), expected_latest_session())
+    except CalendarCoverageError:
+        end_date = min(to_date(end_date), date.today())
+    if start_date > end_date:
+        return []
+
+    # 只在休市日表涵蓋的年度判斷缺口，未涵蓋的年度無法分辨休市與缺資料
+    sessions = [day for first, last in covered_ranges(start_date, end_date) for day in trading_days(first, last)]
+    if not sessions:
+        return []
+    if existing_dates is None:
+        coverage = get_coverage(stock_id)
+        if coverage and is_contiguous(coverage) and coverage["first_date"] <= sessions[0] and coverage["last_date"] >= sessions[-1]:
+            return []
+        existing_dates = load_trade_dates(stock_id, start_date, end_date) if coverage else []
+    existing = {to_date(d) for d in existing_dates}
+    if any(day not in existing for day in sessions):
+        empty = known_empty_intervals(stock_id)
+        existing.update(day for day in sessions if any(first <= day <= last for first, last in empty))
+    return coalesce_missing_sessions(sessions, existing, bridge)
+
+
+def is_contiguous(coverage: dict) -> bool:
+    """
+    覆蓋範圍內是否沒有缺口（筆數等於期間內交易日數）；
+    期間跨越休市日表未涵蓋的年度時無法判斷，回傳 False
+    
+    參數：
+        coverage (dict): get_coverage 結果
+    
+    返回：
+        bool
+    """
+    first, last = to_date(coverage["first_date"]), to_date(coverage["last_date"])
+    if covered_ranges(first, last) != [(first, last)]:
         return False
-    cursor = conn.cursor()
-    query = """
-        SELECT COUNT(*) FROM stock_price_daily 
-        WHERE stock_id = %s AND trade_date BETWEEN %s AND %s
+    return coverage["row_count"] == len(trading_days(first, last))
+
+
+def coalesce_missing_sessions(sessions: list, existing: set, bridge: int = GAP_BRIDGE_SESSIONS) -> list:
+    """
+    將缺少的交易日合併為區間：連續缺少（僅隔週末/休市日）視為同一缺口，
+    兩缺口間隔的已有交易日數不超過 bridge 時亦合併
+    
+    參數：
+        sessions (list[date]): 依序排列的交易日
+        existing (set[date]): 已有資料的交易日
+        bridge (int): 可合併的最大間隔交易日數
+    
+    返回：
+        intervals (list[tuple[date, date]])
+    """
+    missing = [i for i, day in enumerate(sessions) if day not in existing]
+    intervals = []
+    for i in missing:
+        if intervals and i - intervals[-1][1] - 1 <= bridge:
+            intervals[-1][1] = i
+        else:
+            intervals.append([i, i])
+    return [(sessions[first], sessions[last]) for first, last in intervals]
+
+
+def load_trade_dates(stock_id: str, start_date, end_date) -> list:
+    """
+    讀取資料庫中指定區間已有的交易日
+    
+    參數：
+        stock_id (str): 股票代碼
+        start_date (date): 查詢起始日期
+        end_date (date): 查詢結束日期
+    
+    返回：
+        dates (list[date])
     """
-    cursor.execute(query, (stock_id, start_date, end_date))
-    count = cursor.fetchone()[0]
-    cursor.close()
-    close_connection(conn)
-    return count > 0
+    try:
+        return get_storage().read_trade_dates(stock_id, start_date, end_date)
+    except Exception as e:
+        logger.error(f"讀取 {stock_id} 交易日失敗：{e}")
+        return []
+
+
+def known_empty_intervals(stock_id: str) -> list:
+    """
+    已確認無資料的區間：資料庫記錄（跨程序保留）加上本程序中的近期區間
+    
+    參數：
+        stock_id (str): 股票代碼
+    
+    返回：
+        intervals (list[tuple[date, date]])
+    """
+    try:
+        intervals = list(get_storage().get_empty_intervals(stock_id))
+    except Exception as e:
+        logger.error(f"讀取 {stock_id} 無資料區間失敗：{e}")
+        intervals = []
+    return intervals + [(start, end) for sid, start, end in _empty_intervals if sid == stock_id]
+
+
+def record_empty_interval(stock_id: str, start: date, end: date):
+    """
+    記錄補抓後無資料的區間：迄日已超過 EMPTY_SETTLE_DAYS 者寫入資料庫，其餘僅保留於本程序
+    
+    參數：
+        stock_id (str): 股票代碼
+        start (date): 區間起日
+        end (date): 區間迄日
+    
+    返回：
+        NA
+    """
+    if end > date.today() - timedelta(days=EMPTY_SETTLE_DAYS):
+        _empty_intervals.add((stock_id, start, end))
+        return
+    try:
+        get_storage().add_empty_interval(stock_id, start, end)
+    except Exception as e:
+        logger.error(f"寫入 {stock_id} 無資料區間失敗：{e}")
+        _empty_intervals.add((stock_id, start, end))
+
+
+def backfill_intervals(stock_id: str, intervals: list) -> list:
+    """
+    依缺口區間補抓資料，略過已確認無資料的區間（見 known_empty_intervals）
+    
+    參數：
+        stock_id (str): 股票代碼
+        intervals (list[tuple[date, date]]): 缺口區間
+    
+    返回：
+        patched (list[tuple[date, date]]): 實際寫入資料的區間
+    """
+    patched = []
+    empty = known_empty_intervals(stock_id) if intervals else []
+    for start, end in intervals:
+        if any(first <= start and end <= last for first, last in empty):
+            continue
+        # Yahoo 的 end 不含當日，故往後加一天
+        if fetch_and_store(stock_id, start, end + timedelta(days=1)):
+            patched.append((start, end))
+        else:
+            record_empty_interval(stock_id, start, end)
+    return patched
+
+
+def load_stock_slices(stock_id: str, intervals: list) -> pd.DataFrame:
+    """
+    以單次查詢讀取多個日期區間的股價資料（補抓後只重新讀取補上的部分）
+    
+    參數：
+        stock_id (str): 股票代碼
+        intervals (list[tuple[date, date]]): 日期區間
+    
+    返回：
+        df (pd.Dataframe): 股價資料
+    """
+    if not intervals:
+        return pd.DataFrame()
+    return query_price_frame([stock_id], intervals=intervals)
+
+
+def merge_stock_slices(df: pd.DataFrame, patch: pd.DataFrame) -> pd.DataFrame:
+    """
+    合併既有股價資料與補抓後重新讀取的區段（同交易日以補抓結果為準）
+    
+    參數：
+        df (pd.Dataframe): 既有股價資料
+        patch (pd.Dataframe): 補抓區段
+    
+    返回：
+        df (pd.Dataframe): 依交易日排序的股價資料
+    """
+    if patch.empty:
+        return df
+    if df.empty:
+        return patch.sort_values("trade_date").reset_index(drop=True)
+    merged = pd.concat([df, patch], ignore_index=True)
+    merged = merged.drop_duplicates(subset="trade_date", keep="last")
+    return merged.sort_values("trade_date").reset_index(drop=True)
 
 # ---------------------
 # 動態抓資料
@@ -101,50 +359,53 @@ def fetch_and_store(stock_id: str, start_date: str, end_date: str):
         end_date (str): 查詢結束日期
     
     返回：
-        NA
+        rows (int): 寫入筆數
     """
     
     if stock_id.isdigit() and len(stock_id) == 4:  # 台股
         stock_name = get_stock_name(stock_id)
-        stock_type = get_stock_type(stock_id)
-        stock_id = f"{stock_id}.{stock_type}"
+        stock_id = to_yahoo_code(stock_id)
     else:
         stock_name = fetch_stock_name(stock_id)
 
     print(f"🚀 開始抓取 {stock_id} 股價資料...")
-    data = fetch_stock_data(stock_id, start_date=start_date, end_date=end_date)
+    data = fetch_stock_data(stock_id, start_date=start_date, end_date=end_date, as_rows=True)
 
-    if data:
-        insert_stock_price(data)
+    if data and insert_stock_price(data):
         print(f"✅ {stock_id} ({stock_name}) 股價資料寫入完成！")
-    else:
-        print("⚠️ 無資料可寫入")
+        return len(data)
+    print("⚠️ 無資料可寫入")
+    return 0
         
-def get_stock_latest_date(cursor, stock_id):
+def to_yahoo_code(stock_id: str) -> str:
     """
-    從資料庫讀取股價資料"
+    將台股代碼轉換為 yahoo 股票代碼（例如 2330 -> 2330.TW）
     
     參數：
-        cursor (conn.cursor(dictionary=True))
         stock_id (str): 股票代碼
     
     返回：
-        df (pd.Dataframe): 資料庫最新交易日
+        str: yahoo股票代碼
+    """
+    if stock_id.isdigit() and len(stock_id) == 4:
+        return f"{stock_id}.{get_stock_type(stock_id)}"
+    return stock_id
+
+def get_stock_latest_date(stock_id):
+    """
+    讀取資料庫中該股票的最新交易日（stock_price_coverage 主鍵查詢）
+    
+    參數：
+        stock_id (str): 股票代碼
+    
+    返回：
+        latest_date (date | None): 資料庫最新交易日
     """
     if not stock_id:
         print("⚠️ 遺失 stock ID")
         return
-    else:
-        print(f"🚀 開始抓取 {stock_id} 最後交易日...")
-        query = """
-            SELECT MAX(trade_date)
-            FROM stock_price_daily
-            WHERE stock_id = %s
-        """
-        cursor.execute(query, (stock_id,))
-        result = cursor.fetchone()
-        
-        return result["MAX(trade_date)"] if result and result["MAX(trade_date)"] else None
+    coverage = get_coverage(stock_id)
+    return coverage["last_date"] if coverage else None
 
 
 def update_stock_if_needed(stock_id, stock_name, start_date=None, end_date=None, days_tolerance=1):
@@ -156,62 +417,362 @@ def update_stock_if_needed(stock_id, stock_name, start_date=None, end_date=None,
         stock_name (str): 股票名稱
         start_date (str): 查詢起始日期
         end_date (str): 查詢結束日期
-        days_tolerance (int): 緩衝區間
+        days_tolerance (int): 容許缺少的交易日數
     
     返回：
         updated (bool): 更新成功與否
     """
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
     today = date.today()
     updated = False
 
-    latest_date = get_stock_latest_date(cursor, stock_id)
-    if not latest_date or (today - latest_date).days > days_tolerance:
+    latest_date = get_stock_latest_date(stock_id)
+
+    start = plan_start_date(latest_date, today, days_tolerance)
+    if start is not None:
         print(f"🔄 更新中: {stock_id} {stock_name} (最後資料: {latest_date})")
-        start_date = latest_date + timedelta(days=1) if latest_date else today - timedelta(days=365)
-        fetch_and_store(stock_id, start_date, end_date or today)
+        fetch_and_store(stock_id, start, end_date or today + timedelta(days=1))
         updated = True
     else:
         print(f"✅ {stock_id} {stock_name} 資料已是最新 ({latest_date})")
 
-    cursor.close()
-    conn.close()
     return updated
 
 
-def update_all_stocks(days_tolerance=1):
+def update_all_stocks(days_tolerance=1, workers=1, max_retries=MAX_RETRIES, resume=True, stock_ids=None):
     """
     檢查所有股票資料是否為最新，如缺少最近資料則自動補抓。
+    先以單一查詢取得全部股票的最新交易日並規劃補抓區間，只有需更新的股票才進入下載。
+    workers > 1 時以執行緒池並行更新，Yahoo 請求由 yahoo_api 共用限速器控管。
+    進度逐檔寫入 update_journal，中斷後重新執行只處理尚未完成的股票。
     
     參數：
-        days_tolerance (int): 緩衝區間
+        days_tolerance (int): 容許缺少的交易日數
+        workers (int): 並行執行緒數（1 為逐檔更新）
+        max_retries (int): 單檔股票最多重試次數
+        resume (bool): 是否接續當日未完成的更新作業
+        stock_ids (list[str]): 只更新這些股票（例如重試上次失敗的股票），None 為全部
     
     返回：
-        NA
+        report (dict): 更新統計報告
     """
     
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    stocks = load_stock_universe()
+    if stocks is None:
+        return {}
+    if stock_ids is not None:
+        wanted = set(stock_ids)
+        stocks = [stock for stock in stocks if stock["stock_id"] in wanted]
+
+    latest_dates = get_all_latest_dates()
+    if latest_dates is None:
+        return {}
+
+    journal = UpdateJournal(resume=resume)
+    pending = [stock for stock in stocks if not journal.is_done(stock["stock_id"])]
+    journal.start(len(pending), "concurrent" if workers > 1 else "serial")
 
-    cursor.execute("SELECT stock_id, stock_name FROM stock_info")
-    stocks = cursor.fetchall()
     today = date.today()
-    updated_count = 0
+    started = time.monotonic()
+    plans, results = plan_updates(pending, latest_dates, today, days_tolerance)
+    for result in results:
+        journal.record(result)
+    print(f"📋 {len(pending)} 檔股票中 {len(plans)} 檔需要更新，{len(results)} 檔已是最新")
+
+    def run(plan):
+        result = refresh_stock(plan["stock_id"], plan["stock_name"], plan["start_date"], today,
+                               latest_date=plan["latest_date"], max_retries=max_retries)
+        journal.record(result)
+        return result
+
+    if workers <= 1:
+        for plan in plans:
+            results.append(run(plan))
+    else:
+        print(f"🚀 並行更新 {len(plans)} 檔股票（{workers} 執行緒）...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run, plan) for plan in plans]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    report = build_update_report(results, time.monotonic() - started)
+    report["resumed"] = len(stocks) - len(pending)
+    report["pool"] = get_pool_stats()
+    journal.finish(report)
+    print_update_report(report)
+    return report
+
+
+def load_stock_universe():
+    """
+    讀取 stock_info 中所有股票
+    
+    參數：
+        NA
+    
+    返回：
+        stocks (list[dict] | None): [{"stock_id", "stock_name"}]，連線失敗時回傳 None
+    """
+    try:
+        return get_storage().list_stocks()
+    except Exception as e:
+        logger.error(f"讀取 stock_info 失敗：{e}")
+        return None
+
 
+def get_all_latest_dates(stock_ids=None):
+    """
+    取得各股票資料庫最新交易日（讀取 stock_price_coverage，每檔一列）
+    
+    參數：
+        stock_ids (list[str]): 限定的股票代碼（None 為全部）
+    
+    返回：
+        latest_dates (dict[str, date] | None): {stock_id: 最新交易日}，無資料的股票不列入；連線失敗時回傳 None
+    """
+    latest_dates = get_all_last_dates()
+    if latest_dates is None or not stock_ids:
+        return latest_dates
+    return {stock_id: latest_dates[stock_id] for stock_id in stock_ids if stock_id in latest_dates}
+
+
+def plan_updates(stocks, latest_dates, today, days_tolerance=1):
+    """
+    依各股票最新交易日一次規劃所有補抓工作
+    
+    參數：
+        stocks (list[dict]): [{"stock_id", "stock_name"}]
+        latest_dates (dict[str, date]): get_all_latest_dates 結果
+        today (date): 基準日期
+        days_tolerance (int): 容許缺少的交易日數
+    
+    返回：
+        plans (list[dict]): 需更新的股票 [{"stock_id", "stock_name", "latest_date", "start_date"}]
+        skipped (list[dict]): 已是最新的股票（refresh_stock 結果格式）
+    """
+    plans, skipped = [], []
     for stock in stocks:
         stock_id = stock["stock_id"]
-        stock_name = stock["stock_name"]
-        latest_date = get_stock_latest_date(cursor, stock_id)
-
-        if not latest_date or (today - latest_date).days > days_tolerance:
-            print(f"🔄 更新中: {stock_id} {stock_name} (最後資料: {latest_date})")
-            start_date = latest_date + timedelta(days=1) if latest_date else today - timedelta(days=365)
-            fetch_and_store(stock_id, start_date, today)
-            updated_count += 1
+        latest_date = latest_dates.get(stock_id)
+        start_date = plan_start_date(latest_date, today, days_tolerance)
+        if start_date is None:
+            skipped.append({"stock_id": stock_id, "status": "skipped", "rows": 0, "attempts": 0,
+                            "error": None, "last_date": latest_date, "elapsed": 0.0})
+        else:
+            plans.append({"stock_id": stock_id, "stock_name": stock["stock_name"],
+                          "latest_date": latest_date, "start_date": start_date})
+    return plans, skipped
+
+
+def plan_start_date(latest_date, today, days_tolerance=1):
+    """
+    依資料庫最新交易日決定補抓起始日，資料已是最新時回傳 None。
+    以交易日曆計算至 expected_latest_session 為止缺少的交易日數，
+    週末、休市日與尚未收盤的當日不視為缺資料。
+    
+    參數：
+        latest_date (date): 資料庫最新交易日
+        today (date): 基準日期
+        days_tolerance (int): 容許缺少的交易日數（缺少數未達此值時視為最新）
+    
+    返回：
+        start_date (date | None): 補抓起始日
+    """
+    if latest_date:
+        try:
+            if count_missing_sessions(latest_date, today) < max(days_tolerance, 1):
+                return None
+        except CalendarCoverageError as e:
+            # 無休市日表時無法判斷缺少的交易日數，視為需要補抓
+            logger.debug(f"{e}，{latest_date} 之後照常補抓")
+    return latest_date + timedelta(days=1) if latest_date else today - timedelta(days=365)
+
+
+def refresh_stock(stock_id, stock_name, start_date, today, latest_date=None, max_retries=MAX_RETRIES):
+    """
+    依規劃的補抓區間更新單一股票（供 update_all_stocks 逐檔或並行呼叫），失敗時以指數退避重試。
+    寫入為 upsert，重試時直接重抓同一區間即可，可安全於多執行緒中執行。
+    
+    參數：
+        stock_id (str): 股票代碼
+        stock_name (str): 股票名稱
+        start_date (date): 補抓起始日
+        today (date): 基準日期
+        latest_date (date): 資料庫最新交易日
+        max_retries (int): 最多重試次數
+    
+    返回：
+        result (dict): stock_id, status (updated/failed), rows, attempts, error, last_date, elapsed
+    """
+    result = {"stock_id": stock_id, "status": "failed", "rows": 0, "attempts": 0, "error": None, "last_date": latest_date}
+    started = time.monotonic()
+    print(f"🔄 更新中: {stock_id} {stock_name} (最後資料: {latest_date})")
+
+    for attempt in range(1, max_retries + 1):
+        result["attempts"] = attempt
+        try:
+            data = fetch_stock_data(to_yahoo_code(stock_id), start_date=start_date, end_date=today + timedelta(days=1), as_rows=True)
+            if data and not insert_stock_price(data):
+                raise RuntimeError("寫入資料庫失敗")
+
+            result.update(status="updated", rows=len(data), error=None, elapsed=time.monotonic() - started)
+            if data:
+                result["last_date"] = max(row[1] for row in data)
+            return result
+
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+            logger.warning(f"{stock_id} 第 {attempt} 次更新失敗：{e}")
+            if attempt < max_retries:
+                time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+    print(f"❌ {stock_id} {stock_name} 更新失敗：{result['error']}")
+    result["elapsed"] = time.monotonic() - started
+    return result
+
+
+def build_update_report(results, elapsed):
+    """
+    彙整更新結果為統計報告
+    
+    參數：
+        results (list[dict]): refresh_stock 回傳結果
+        elapsed (float): 總耗時（秒）
+    
+    返回：
+        report (dict): 更新統計報告
+    """
+    failed = [r for r in results if r["status"] == "failed"]
+    return {
+        "total": len(results),
+        "updated": sum(r["status"] == "updated" for r in results),
+        "skipped": sum(r["status"] == "skipped" for r in results),
+        "failed": len(failed),
+        "rows": sum(r["rows"] for r in results),
+        "retries": sum(max(r["attempts"] - 1, 0) for r in results),
+        "elapsed": elapsed,
+        "stocks_per_sec": len(results) / elapsed if elapsed > 0 else 0.0,
+        "failures": {r["stock_id"]: r["error"] for r in failed},
+    }
+
+
+def print_update_report(report):
+    """
+    輸出更新統計報告
+    
+    參數：
+        report (dict): build_update_report 產生的報告
+    
+    返回：
+        NA
+    """
+    print(
+        f"\n📊 全部更新完成，共檢查 {report['total']} 檔："
+        f"更新 {report['updated']} 檔、已是最新 {report['skipped']} 檔、失敗 {report['failed']} 檔"
+    )
+    print(
+        f"⏱️ 耗時 {report['elapsed']:.1f} 秒，{report['stocks_per_sec']:.2f} 檔/秒，"
+        f"寫入 {report['rows']} 筆，重試 {report['retries']} 次"
+    )
+    if report.get("resumed"):
+        print(f"♻️ 接續先前進度，略過已完成 {report['resumed']} 檔")
+    pool = report.get("pool")
+    if pool:
+        print(
+            f"🔗 連線池：借出 {pool['checkouts']} 次、新建 {pool['created']} 條、"
+            f"平均等待 {pool['wait_avg'] * 1000:.1f} ms（最長 {pool['wait_max'] * 1000:.1f} ms）、"
+            f"同時使用最多 {pool['active_peak']}/{pool['size']} 條"
+        )
+    for stock_id, error in report["failures"].items():
+        print(f"   ❌ {stock_id}: {error}")
+    logger.info(f"update_all_stocks report: {report}")
+
+
+def fetch_and_store_batch(stock_ids, start_date, end_date, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    批次抓取多檔股票同一區間資料並寫入資料庫（回補用），
+    每 chunk_size 檔只需一次 Yahoo 請求。
+    
+    參數：
+        stock_ids (list[str]): 股票代碼
+        start_date (str): 查詢起始日期
+        end_date (str): 查詢結束日期
+        chunk_size (int): 每次下載的股票檔數
+    
+    返回：
+        written (int): 寫入成功的股票檔數
+    """
+    requests_list = [(to_yahoo_code(stock_id), start_date, end_date) for stock_id in stock_ids]
+    return store_batch_results(fetch_stock_data_batch(requests_list, chunk_size=chunk_size, as_rows=True))
+
+
+def store_batch_results(batch):
+    """
+    將 fetch_stock_data_batch 結果逐檔寫入資料庫
+    
+    參數：
+        batch (dict[str, list[tuple]]): {yahoo股票代碼: 股價資料}
+    
+    返回：
+        written (int): 寫入成功的股票檔數
+    """
+    written = 0
+    for stock_code, data in batch.items():
+        if data and insert_stock_price(data):
+            written += 1
+    return written
+
+
+def update_all_stocks_batch(days_tolerance=1, chunk_size=BATCH_CHUNK_SIZE, resume=True):
+    """
+    以批次下載更新所有股票：先規劃各檔補抓區間，再以多檔合併請求下載寫入。
+    進度寫入 update_journal，中斷後重新執行只處理尚未完成的股票。
+    
+    參數：
+        days_tolerance (int): 容許缺少的交易日數
+        chunk_size (int): 每次下載的股票檔數
+        resume (bool): 是否接續當日未完成的更新作業
+    
+    返回：
+        report (dict): 更新統計報告
+    """
+    stocks = load_stock_universe()
+    if stocks is None:
+        return {}
+    latest_dates = get_all_latest_dates()
+    if latest_dates is None:
+        return {}
+
+    journal = UpdateJournal(resume=resume)
+    pending = [stock for stock in stocks if not journal.is_done(stock["stock_id"])]
+    journal.start(len(pending), "batch")
+
+    today = date.today()
+    started = time.monotonic()
+    plans, results = plan_updates(pending, latest_dates, today, days_tolerance)
+    for result in results:
+        journal.record(result)
+    requests_list = [(to_yahoo_code(plan["stock_id"]), plan["start_date"], today + timedelta(days=1)) for plan in plans]
+
+    print(f"🚀 批次更新 {len(requests_list)} 檔股票（每批 {chunk_size} 檔）...")
+    batch = fetch_stock_data_batch(requests_list, chunk_size=chunk_size, as_rows=True)
+    for plan, (stock_code, _, _) in zip(plans, requests_list):
+        result = {"stock_id": plan["stock_id"], "status": "updated", "rows": 0, "attempts": 1,
+                  "error": None, "last_date": plan["latest_date"]}
+        data = batch.get(stock_code)
+        if stock_code not in batch:
+            result.update(status="failed", error="批次下載失敗")
+        elif data and not insert_stock_price(data):
+            result.update(status="failed", error="寫入資料庫失敗")
         else:
-            print(f"✅ {stock_id} {stock_name} 資料已是最新 ({latest_date})")
+            result["rows"] = len(data)
+            if data:
+                result["last_date"] = max(row[1] for row in data)
+        journal.record(result)
+        results.append(result)
 
-    cursor.close()
-    conn.close()
-    print(f"\n📊 全部更新完成，共更新 {updated_count} 檔股票。")
+    report = build_update_report(results, time.monotonic() - started)
+    report["resumed"] = len(stocks) - len(pending)
+    report["pool"] = get_pool_stats()
+    journal.finish(report)
+    print_update_report(report)
+    return report
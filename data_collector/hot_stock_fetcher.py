@@ -16,21 +16,19 @@ data_collector/hot_stock_fetcher.py
 
 from utils.helpers import setup_logger
 import os
-from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-import urllib3
-import requests
+from datetime import datetime, date, timedelta
 import time
 import pandas as pd
 import re
+from data_collector.daily_quote_fetcher import TPEX_DAILY_URL, request_json, find_field_index, parse_number
+from data_collector.http_cache import cached_get
 
 logger = setup_logger("hot_stock_fetcher")
 
 # ========== 設定 ==========
 TWSE_API_URL = "https://www.twse.com.tw/exchangeReport/MI_INDEX?response=json&type=ALLBUT0999"
 TPEx_RANK_URL = "https://www.tpex.org.tw/zh-tw/mainboard/trading/historical/rank-volume/day.html"
+TPEx_LOOKBACK_DAYS = 7  # 當日尚無資料（盤中/休市）時往前回溯的天數
 CACHE_PATH = os.path.join("data", "hot_stocks.csv")
 
 
@@ -47,8 +45,7 @@ def fetch_hot_stocks_twse(limit: int = 20) -> pd.DataFrame:
     JSON_KEYWORD = "每日收盤行情"
 
     try:
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        resp = requests.get(TWSE_API_URL, timeout=10, verify=False)
+        resp = cached_get(TWSE_API_URL, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         # response = twse_request(TWSE_API_URL)
@@ -79,7 +76,64 @@ def fetch_hot_stocks_twse(limit: int = 20) -> pd.DataFrame:
 
 def fetch_hot_stocks_tpex(limit: int = 20) -> pd.DataFrame:
     """
-    從 TPEx (櫃買中心) 取得熱門股票排行（以成交量排行頁面抓取為主）。
+    從 TPEx (櫃買中心) 取得熱門股票排行（以成交量排序）。
+    直接請求每日收盤行情 JSON（成交量排行頁面的資料來源），單次解析，不需啟動瀏覽器；
+    當日尚無資料時往前回溯最近交易日。
+
+    Args:
+        limit (int): 取前 N 筆（預設 20）。
+
+    Returns:
+        pd.DataFrame: 欄位包含 StockID, StockName, Volumn, Market
+    """
+    try:
+        day = date.today()
+        for _ in range(TPEx_LOOKBACK_DAYS):
+            payload = request_json(TPEX_DAILY_URL.format(date=day.strftime("%Y/%m/%d")))
+            df = parse_tpex_hot_stocks(payload, limit=limit)
+            if not df.empty:
+                print(f"✅ TPEX抓取完成 ({day})，取前 {len(df)} 筆 (限制 {limit})")
+                return df
+            day -= timedelta(days=1)
+
+        raise ValueError("TPEX 回傳格式非預期，無法解析")
+
+    except Exception as e:
+        print(f"⚠️ fetch_hot_stocks_tpex 失敗：{e}")
+        return pd.DataFrame(columns=["StockID", "StockName", "Volumn", "Market"])
+
+
+def parse_tpex_hot_stocks(payload: dict, limit: int = 20) -> pd.DataFrame:
+    """
+    解析 TPEx 每日收盤行情 JSON，單次走訪取出代號/名稱/成交股數並依成交量排序。
+
+    Args:
+        payload (dict): TPEx 每日收盤行情回傳 JSON
+        limit (int): 取前 N 筆（預設 20）。
+
+    Returns:
+        pd.DataFrame: 欄位包含 StockID, StockName, Volumn, Market（無資料時為空表格）
+    """
+    rows = []
+    for table in payload.get("tables") or []:
+        index = find_field_index(table.get("fields") or [], ("代號", "名稱", "成交股數"))
+        if index is None:
+            continue
+        i_id, i_name, i_volume = index
+        for row in table.get("data") or []:
+            volume = parse_number(row[i_volume])
+            if volume:
+                rows.append((row[i_id].strip(), row[i_name].strip(), int(volume), "TWO"))
+        break
+
+    df = pd.DataFrame(rows, columns=["StockID", "StockName", "Volumn", "Market"])
+    return df.sort_values(by="Volumn", ascending=False).head(limit).reset_index(drop=True)
+
+
+def fetch_hot_stocks_tpex_selenium(limit: int = 20) -> pd.DataFrame:
+    """
+    舊版：以 Selenium 無頭瀏覽器抓取 TPEx 成交量排行頁面（保留供效能比較，selenium 列於 requirements-dev.txt，
+    見 scripts/bench_tpex_fetcher.py）。
 
     Args:
         limit (int): 取前 N 筆（預設 20）。
@@ -88,7 +142,10 @@ def fetch_hot_stocks_tpex(limit: int = 20) -> pd.DataFrame:
         pd.DataFrame: 欄位包含 StockID, StockName, Market
     """
     try:
-        
+        from bs4 import BeautifulSoup
+        from selenium import webdriver
+        from selenium.webdriver.common.by import By
+
         options = webdriver.ChromeOptions()        
         options.add_argument('--headless')  # 設定動態爬蟲在背景執行
         driver = webdriver.Chrome(options=options)
@@ -124,7 +181,7 @@ def fetch_hot_stocks_tpex(limit: int = 20) -> pd.DataFrame:
             raise ValueError("TPEX 回傳格式非預期，無法解析")
     
     except Exception as e:
-        print(f"⚠️ fetch_hot_stocks_tpex 失敗：{e}")
+        print(f"⚠️ fetch_hot_stocks_tpex_selenium 失敗：{e}")
         return pd.DataFrame(columns=["StockID", "StockName", "Volumn", "Market"])
 
 def merge_and_save_hot_stocks(limit: int = 20) -> pd.DataFrame:
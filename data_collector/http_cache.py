@@ -0,0 +1,490 @@
+"""
+data_collector/http_cache.py
+---------------
+data_collector 共用的 HTTP 回應磁碟快取：
+    - 內容定址儲存：回應內容以 SHA-256 命名存放於 data/http_cache/objects，相同內容只存一份
+    - 條件式重新驗證：過期後以 ETag (If-None-Match) / Last-Modified (If-Modified-Since) 詢問，
+      伺服器回 304 時直接沿用本地內容
+    - 各端點 TTL：依網址前綴設定新鮮期限，期限內完全不發出請求
+    - 容量上限：超過 MAX_CACHE_BYTES 時依最近存取時間 (LRU) 淘汰
+    - 網路失敗時若有舊資料則回傳舊資料
+    - 多程序共用：寫回索引前重新讀取磁碟上的索引並合併，只覆蓋本程序變更的項目
+    - cached_stream：大型頁面以串流方式取得，下載時邊寫入內容檔邊交給呼叫端解析，不在記憶體保留整份內容
+"""
+
+from utils.helpers import setup_logger
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import urllib3
+import requests
+
+logger = setup_logger("http_cache")
+
+# ========== 設定 ==========
+CACHE_DIR = os.path.join("data", "http_cache")
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+EVICT_TARGET_RATIO = 0.8     # 淘汰至容量上限的比例
+DEFAULT_TTL = 0              # 未設定的端點：每次都重新驗證
+IMMUTABLE_TTL = float("inf") # 歷史資料（已收盤日期的報表）永不過期
+
+# 網址前綴 -> 新鮮期限（秒）
+ENDPOINT_TTL = {
+    "https://isin.twse.com.tw/": 12 * 3600,                       # 股票清單：一天更新一次
+    "https://www.twse.com.tw/exchangeReport/MI_INDEX": 10 * 60,   # 每日收盤行情
+    "https://www.tpex.org.tw/": 10 * 60,                          # 櫃買每日收盤行情
+}
+
+_lock = threading.Lock()
+_index = None
+_pending = {}   # 尚未寫回的索引變更：{網址雜湊: 快取資訊，None 表示刪除}
+_touched = {}   # 尚未寫回的存取時間：{網址雜湊: 最近存取時間}
+_session = None
+
+
+class CachedResponse:
+    """
+    快取回應物件（介面相容 requests.Response 常用屬性：content / text / json() / status_code）
+
+    參數：
+        url (str): 請求網址
+        content (bytes): 回應內容
+        status_code (int): HTTP 狀態碼
+        encoding (str): 文字編碼
+        from_cache (bool): 是否由本地快取提供
+    """
+
+    def __init__(self, url, content, status_code=200, encoding=None, from_cache=False):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        """依 encoding 解碼後的文字內容"""
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        """解析 JSON 內容"""
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        """狀態碼非 2xx 時丟出例外"""
+        if not 200 <= self.status_code < 300:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def get_ttl(url: str) -> float:
+    """
+    取得網址對應的新鮮期限（最長前綴優先）
+
+    參數：
+        url (str): 請求網址
+
+    返回：
+        ttl (float): 秒數
+    """
+    matches = [prefix for prefix in ENDPOINT_TTL if url.startswith(prefix)]
+    return ENDPOINT_TTL[max(matches, key=len)] if matches else DEFAULT_TTL
+
+
+def cached_get(url: str, ttl: float = None, session: requests.Session = None, encoding: str = None, timeout: int = 30) -> CachedResponse:
+    """
+    經由磁碟快取發出 GET 請求
+
+    參數：
+        url (str): 請求網址
+        ttl (float): 新鮮期限（秒），None 時依 ENDPOINT_TTL 設定
+        session (requests.Session): 使用的連線（預設為模組共用連線）
+        encoding (str): 文字編碼（例如 ISIN 頁面為 big5）
+        timeout (int): 逾時秒數
+
+    返回：
+        response (CachedResponse)
+    """
+    ttl = get_ttl(url) if ttl is None else ttl
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    now = time.time()
+
+    with _lock:
+        entry = dict(load_index().get(key) or {})
+    content = read_object(entry["sha256"]) if entry else None
+    if content is None:
+        entry = {}
+
+    if entry and now - entry["fetched_at"] < ttl:
+        touch_entry(key, now)
+        return CachedResponse(url, content, encoding=encoding or entry.get("encoding"), from_cache=True)
+
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        resp = (session or get_session()).get(url, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        if entry:
+            print(f"⚠️ 網路請求失敗，改用快取資料：{url}")
+            logger.warning(f"cached_get 失敗，使用舊資料 {url}: {e}")
+            touch_entry(key, now)
+            return CachedResponse(url, content, encoding=encoding or entry.get("encoding"), from_cache=True)
+        raise
+
+    if resp.status_code == 304 and entry:
+        entry.update(fetched_at=now, accessed_at=now)
+        save_entry(key, entry)
+        return CachedResponse(url, content, encoding=encoding or entry.get("encoding"), from_cache=True)
+
+    if resp.status_code != 200:
+        return CachedResponse(url, resp.content, status_code=resp.status_code, encoding=encoding or resp.encoding)
+
+    sha256 = write_object(resp.content)
+    save_entry(key, {
+        "url": url,
+        "sha256": sha256,
+        "size": len(resp.content),
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "encoding": encoding or resp.encoding,
+        "fetched_at": now,
+        "accessed_at": now,
+    })
+    evict_if_needed()
+    return CachedResponse(url, resp.content, encoding=encoding or resp.encoding)
+
+
+def cached_stream(url: str, chunk_size: int = 64 * 1024, ttl: float = None, session: requests.Session = None,
+                  encoding: str = None, timeout: int = 30):
+    """
+    經由磁碟快取以串流方式取得回應內容（產生器）：
+    快取有效或伺服器回 304 時分段讀取本地內容檔；需下載時以 stream=True 逐段接收，
+    每段同時寫入暫存內容檔、累計雜湊並交給呼叫端，完整接收後才寫入索引（中途中斷不留下快取）。
+    請求失敗且無舊資料時丟出 requests 例外，狀態碼非 200 時丟出 requests.HTTPError
+
+    參數：
+        url (str): 請求網址
+        chunk_size (int): 每段位元組數
+        ttl (float): 新鮮期限（秒），None 時依 ENDPOINT_TTL 設定
+        session (requests.Session): 使用的連線（預設為模組共用連線）
+        encoding (str): 文字編碼（記錄於索引）
+        timeout (int): 逾時秒數
+
+    返回：
+        chunks (Iterator[bytes]): 回應內容片段
+    """
+    ttl = get_ttl(url) if ttl is None else ttl
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    now = time.time()
+
+    with _lock:
+        entry = dict(load_index().get(key) or {})
+    if entry and not os.path.exists(object_path(entry["sha256"])):
+        entry = {}
+
+    if entry and now - entry["fetched_at"] < ttl:
+        touch_entry(key, now)
+        yield from iter_object(entry["sha256"], chunk_size)
+        return
+
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        resp = (session or get_session()).get(url, headers=headers, timeout=timeout, stream=True)
+    except requests.exceptions.RequestException as e:
+        if not entry:
+            raise
+        print(f"⚠️ 網路請求失敗，改用快取資料：{url}")
+        logger.warning(f"cached_stream 失敗，使用舊資料 {url}: {e}")
+        touch_entry(key, now)
+        yield from iter_object(entry["sha256"], chunk_size)
+        return
+
+    try:
+        if resp.status_code == 304 and entry:
+            entry.update(fetched_at=now, accessed_at=now)
+            save_entry(key, entry)
+            yield from iter_object(entry["sha256"], chunk_size)
+            return
+        if resp.status_code != 200:
+            raise requests.HTTPError(f"{resp.status_code} Error for url: {url}")
+
+        digest, size = hashlib.sha256(), 0
+        os.makedirs(os.path.join(CACHE_DIR, "objects"), exist_ok=True)
+        tmp_path = os.path.join(CACHE_DIR, "objects", f"stream.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+            sha256 = digest.hexdigest()
+            os.makedirs(os.path.dirname(object_path(sha256)), exist_ok=True)
+            os.replace(tmp_path, object_path(sha256))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    finally:
+        resp.close()
+
+    save_entry(key, {
+        "url": url,
+        "sha256": sha256,
+        "size": size,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "encoding": encoding or resp.encoding,
+        "fetched_at": now,
+        "accessed_at": now,
+    })
+    evict_if_needed()
+
+
+def get_session() -> requests.Session:
+    """
+    取得快取模組共用的 requests.Session
+
+    參數：
+        NA
+
+    返回：
+        session (requests.Session)
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.verify = False
+    return _session
+
+
+# ---------------------
+# 索引與內容存取
+# ---------------------
+def index_path() -> str:
+    """索引檔路徑"""
+    return os.path.join(CACHE_DIR, "index.json")
+
+
+def object_path(sha256: str) -> str:
+    """內容檔路徑（依雜湊前兩碼分目錄）"""
+    return os.path.join(CACHE_DIR, "objects", sha256[:2], sha256)
+
+
+def load_index() -> dict:
+    """
+    載入快取索引（呼叫端需持有 _lock）
+
+    參數：
+        NA
+
+    返回：
+        index (dict): {網址雜湊: 快取資訊}
+    """
+    global _index
+    if _index is None:
+        _index = read_index_file()
+    return _index
+
+
+def read_index_file() -> dict:
+    """讀取磁碟上的索引檔，不存在或毀損時回傳空 dict"""
+    try:
+        with open(index_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def flush_index():
+    """
+    重新讀取磁碟上的索引，套用本程序尚未寫回的變更後以原子替換方式寫回（呼叫端需持有 _lock）。
+    多個程序共用快取目錄時只覆蓋自己新增、更新或刪除的項目，不會蓋掉其他程序寫入的快取
+
+    參數：
+        NA
+
+    返回：
+        NA
+    """
+    global _index
+    index = read_index_file()
+    for key, entry in _pending.items():
+        if entry is None:
+            index.pop(key, None)
+        else:
+            index[key] = entry
+    for key, accessed_at in _touched.items():
+        if key in index:
+            index[key]["accessed_at"] = max(index[key]["accessed_at"], accessed_at)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{index_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path())
+    _index = index
+    _pending.clear()
+    _touched.clear()
+
+
+def save_entry(key: str, entry: dict):
+    """寫入單筆索引"""
+    with _lock:
+        load_index()[key] = entry
+        _pending[key] = entry
+        flush_index()
+
+
+def remove_entry(key: str):
+    """刪除單筆索引（呼叫端需持有 _lock，於下次 flush_index 時寫回）"""
+    del load_index()[key]
+    _pending[key] = None
+
+
+def touch_entry(key: str, now: float):
+    """更新最近存取時間（LRU 依據，僅記憶體內更新，於下次寫入時一併保存）"""
+    with _lock:
+        if key in load_index():
+            _index[key]["accessed_at"] = now
+            _touched[key] = now
+
+
+def read_object(sha256: str):
+    """
+    讀取內容檔，不存在時回傳 None
+
+    參數：
+        sha256 (str): 內容雜湊
+
+    返回：
+        content (bytes | None)
+    """
+    try:
+        with open(object_path(sha256), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def iter_object(sha256: str, chunk_size: int):
+    """
+    分段讀取內容檔
+
+    參數：
+        sha256 (str): 內容雜湊
+        chunk_size (int): 每段位元組數
+
+    返回：
+        chunks (Iterator[bytes])
+    """
+    with open(object_path(sha256), "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def write_object(content: bytes) -> str:
+    """
+    以內容雜湊寫入內容檔（已存在則略過）
+
+    參數：
+        content (bytes): 回應內容
+
+    返回：
+        sha256 (str): 內容雜湊
+    """
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = object_path(sha256)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return sha256
+
+
+def evict_if_needed(max_bytes: int = None):
+    """
+    快取總量超過上限時，依最近存取時間淘汰索引並刪除不再被引用的內容檔
+
+    參數：
+        max_bytes (int): 容量上限（預設 MAX_CACHE_BYTES）
+
+    返回：
+        evicted (int): 淘汰的索引筆數
+    """
+    max_bytes = max_bytes or MAX_CACHE_BYTES
+    with _lock:
+        index = load_index()
+        sizes = {e["sha256"]: e["size"] for e in index.values()}
+        total = sum(sizes.values())
+        if total <= max_bytes:
+            return 0
+
+        evicted = 0
+        for key, entry in sorted(index.items(), key=lambda item: item[1]["accessed_at"]):
+            if total <= max_bytes * EVICT_TARGET_RATIO:
+                break
+            remove_entry(key)
+            evicted += 1
+            if all(e["sha256"] != entry["sha256"] for e in index.values()):
+                total -= entry["size"]
+                try:
+                    os.remove(object_path(entry["sha256"]))
+                except FileNotFoundError:
+                    pass
+        flush_index()
+
+    logger.info(f"http_cache 淘汰 {evicted} 筆快取")
+    return evicted
+
+
+def invalidate(url: str):
+    """
+    移除指定網址的快取（例如內容無法解析時）
+
+    參數：
+        url (str): 請求網址
+
+    返回：
+        NA
+    """
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    with _lock:
+        if key in load_index():
+            remove_entry(key)
+            flush_index()
+
+
+def clear_cache():
+    """
+    清除所有快取
+
+    參數：
+        NA
+
+    返回：
+        NA
+    """
+    global _index
+    with _lock:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        _index = {}
+        _pending.clear()
+        _touched.clear()
@@ -2,16 +2,23 @@
 data_collector/scheduler.py
 ---------------
 每日自動排程抓取股價資料
-使用 schedule 套件
+使用 schedule 套件，依交易日曆判斷：沒有新的收盤交易日時略過更新，
+同一交易日已更新過時只重試上次失敗的股票（由 update_journal 取得）
+股價更新後接續計算預先儲存的技術指標
 """
 
 from utils.helpers import setup_logger
 import schedule
 import time
-from data_collector.data_updater import update_all_stocks
+from data_collector.data_updater import update_all_stocks, UPDATE_WORKERS
+from data_collector.update_journal import last_run_failures
+from analytics.indicator_store import refresh_indicators
+from utils.trading_calendar import expected_latest_session, CalendarCoverageError
 
 logger = setup_logger("scheduler")
 
+_last_session = None    # 上次已執行全市場更新的最新交易日（不論是否有股票失敗）
+
 def job():
     """
     執行更新作業
@@ -22,12 +29,33 @@ def job():
     返回：
         NA
     """
-    
-    print("⏰ 開始自動抓取每日股價資料...")
-    # run through existing listed stocks in stock_info and fetch the latest data
-    update_all_stocks()
+    global _last_session
+
+    try:
+        session = expected_latest_session()
+    except CalendarCoverageError as e:
+        # 無休市日表時無法判斷是否有新交易日，照常更新（寫入為 upsert）
+        logger.warning(f"{e}，本次排程不略過更新")
+        session = None
+    if session is not None and session == _last_session:
+        failed = last_run_failures()
+        if not failed:
+            print(f"😴 沒有新的交易日（最新交易日 {session} 已更新過），略過本次排程")
+            return
+        print(f"🔁 最新交易日 {session} 已更新過，只重試上次失敗的 {len(failed)} 檔股票...")
+        update_all_stocks(workers=UPDATE_WORKERS, stock_ids=failed)
+    else:
+        print(f"⏰ 開始自動抓取每日股價資料（最新交易日 {session}）...")
+        # run through existing listed stocks in stock_info and fetch the latest data
+        report = update_all_stocks(workers=UPDATE_WORKERS)
+        if report:
+            # 少數股票失敗屬常態，仍記為已更新，失敗的股票於下次排程重試
+            _last_session = session
     print("✅ 每日股價資料更新完成")
 
+    # 只為新交易日接續計算技術指標
+    refresh_indicators()
+
 def run_scheduler(t: str):
     """
     批次執行更新作業設定
@@ -2,47 +2,174 @@
 data_collector/twse_crawler.py
 ---------------
 爬取台股上市/上櫃股票基本資訊並匯出成CSV檔
+預設 fast 模式：上市/上櫃兩頁以共用連線池並行抓取，以 lxml 串流解析
+頁面經由 http_cache 串流取得（邊下載邊寫入快取並解析），未更新時由本地快取提供
 """
 
 from utils.helpers import setup_logger
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
 from bs4 import BeautifulSoup
 import urllib3
+from data_collector.http_cache import cached_get, cached_stream
 
 logger = setup_logger("twse_crawler")
 
 TWSE_URL = {"TW": "https://isin.twse.com.tw/isin/C_public.jsp?strMode=2", "TWO": "https://isin.twse.com.tw/isin/C_public.jsp?strMode=4"}
+ISIN_ENCODING = "cp950"      # ISIN 頁面為 Big5 (MS950) 編碼
+STREAM_CHUNK_SIZE = 64 * 1024
+STOCK_LIST_COLUMNS = ["stock_id", "stock_name", "stock_type", "industry", "listing_date"]
 
-def fetch_twse_stock_list(save_path="data/tw_stock_list.csv"):
+# 共用連線池（Keep-Alive 連線重用）
+_session = None
+
+def get_session() -> requests.Session:
+    """
+    取得共用 requests.Session（含連線池與重試設定）
+    
+    參數：
+        NA
+    
+    返回：
+        session (requests.Session)
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=len(TWSE_URL), pool_maxsize=len(TWSE_URL) * 2,
+            max_retries=Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504))
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.verify = False
+        _session = session
+    return _session
+
+def fetch_twse_stock_list(save_path="data/tw_stock_list.csv", mode="fast"):
     """
-    爬取台股上市/上櫃股票代碼與中文名稱，並更新 CSV
+    爬取台股上市/上櫃股票代碼、中文名稱、產業別與上市日，並更新 CSV
     
     參數：
         save_path (str): 檔案路徑
+        mode (str): fast（並行 + lxml 串流解析）或 legacy（逐頁 + BeautifulSoup）
     
     返回：
+        df (pd.DataFrame): 股票清單（失敗時回傳 None）
+    """
+    
+    stock_list = fetch_stock_list_fast() if mode == "fast" else fetch_stock_list_legacy()
+    if not stock_list:
+        print("❌ 找不到表格資料")
+        return None
+
+    df = pd.DataFrame(stock_list, columns=STOCK_LIST_COLUMNS)
+    df.to_csv(save_path, index=False, encoding="utf-8-sig")
+    print(f"✅ 已更新台股中文名稱對照表，共 {len(df)} 檔股票")
+    return df
+
+def fetch_stock_list_fast():
+    """
+    以共用連線池並行抓取上市/上櫃 ISIN 頁面，邊下載邊以 lxml 串流解析
+    
+    參數：
         NA
+    
+    返回：
+        stock_list (list[tuple]): (stock_id, stock_name, stock_type, industry, listing_date)
+    """
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    with ThreadPoolExecutor(max_workers=len(TWSE_URL)) as executor:
+        futures = [executor.submit(fetch_isin_market, key) for key in TWSE_URL]
+        results = [future.result() for future in futures]
+
+    if any(rows is None for rows in results):
+        return []
+    return [row for rows in results for row in rows]
+
+def fetch_isin_market(key: str):
+    """
+    下載（經由 http_cache.cached_stream，未變更時由本地快取分段讀取）並串流解析單一市場的 ISIN 頁面：
+    下載的每一段同時寫入快取內容檔並交給解析器，記憶體中不保留整份頁面
+    
+    參數：
+        key (str): 市場別（TW / TWO）
+    
+    返回：
+        rows (list[tuple] | None): 股票清單，失敗時回傳 None
+    """
+    try:
+        chunks = cached_stream(TWSE_URL[key], STREAM_CHUNK_SIZE, session=get_session(), encoding="big5")
+        return parse_isin_stream(chunks, key)
+    except Exception as e:
+        # 網路錯誤、解析錯誤（lxml / 編碼）與快取檔讀寫錯誤皆視為抓取失敗
+        print(f"❌ {key} 股票清單抓取失敗: {e}")
+        logger.warning(f"fetch_isin_market {key} 失敗：{e}")
+        return None
+
+def parse_isin_stream(chunks, key: str):
+    """
+    以 lxml HTMLPullParser 串流解析 ISIN 頁面表格列，逐列釋放已解析節點
+    
+    參數：
+        chunks (iterable[bytes]): 頁面內容片段（Big5 編碼）
+        key (str): 市場別（TW / TWO）
+    
+    返回：
+        rows (list[tuple]): (stock_id, stock_name, stock_type, industry, listing_date)
     """
+    parser = etree.HTMLPullParser(events=("end",), tag="tr", encoding=ISIN_ENCODING)
+    rows = []
+
+    def drain():
+        for _, tr in parser.read_events():
+            # 資料列儲存格皆為純文字，直接取 .text 即可（分類標題列僅一格會被略過）
+            cells = [(td.text or "").strip() for td in tr]
+            tr.clear()
+            parent = tr.getparent()
+            if parent is not None:
+                del parent[:parent.index(tr)]
+            if len(cells) < 5:
+                continue
+            stock = cells[0].split("\u3000")
+            if stock[0].isdigit() and len(stock) > 1:
+                rows.append((stock[0], stock[1].strip(), key, cells[4], cells[2].replace("/", "-")))
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        drain()
+    parser.close()
+    drain()
+    return rows
+
+def fetch_stock_list_legacy():
+    """
+    舊版：逐頁抓取 ISIN 頁面並以 BeautifulSoup 解析
+    
+    參數：
+        NA
     
+    返回：
+        stock_list (list[tuple]): (stock_id, stock_name, stock_type, industry, listing_date)
+    """
     stock_list = []
     for key in TWSE_URL:
         response = twse_request(TWSE_URL[key])
         soup = BeautifulSoup(response.text, "html.parser")
         tables = soup.find_all("table", class_= 'h4')
         if not tables:
-            print("❌ 找不到表格資料")
-            return
+            return []
         for row in tables[0].find_all("tr")[2:]:
             cols = row.find_all("td")
             if len(cols) >= 5:
                 stock = cols[0].text.split('　')
                 if stock[0].isdigit():
-                    stock_list.append({"stock_id": stock[0], "stock_name": stock[1], "stock_type": key})
-
-    df = pd.DataFrame(stock_list)
-    df.to_csv(save_path, index=False, encoding="utf-8-sig")
-    print(f"✅ 已更新台股中文名稱對照表，共 {len(df)} 檔股票")
+                    stock_list.append((stock[0], stock[1], key, cols[4].text.strip(), cols[2].text.strip().replace("/", "-")))
+    return stock_list
 
 def twse_request(url: str):
     """
@@ -56,11 +183,8 @@ def twse_request(url: str):
     """
     
     try:
-        # 使用 certifi 提供的憑證進行 SSL 驗證
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        response = requests.get(url, verify=False)
-        response.encoding = "big5"
-        return response
+        # 經由 http_cache 取得（ETag/Last-Modified 重新驗證，未變更時不重新下載）
+        return cached_get(url, encoding="big5")
     except requests.exceptions.SSLError as e:
         print(f"❌ SSL 驗證失敗: {e}")
         return
@@ -0,0 +1,276 @@
+"""
+data_collector/update_journal.py
+---------------
+更新作業進度日誌（checkpoint journal）：
+    - 每次執行 (run) 一個 JSON Lines 檔：data/update_journal/<run_id>.jsonl（run_id 為微秒時間加隨機碼）
+    - 記錄 run 開始/結束、逐檔狀態 (updated/skipped/failed)、最後寫入交易日與耗時
+    - 當日未完成的 run 重新啟動時沿用同一 run_id，只處理尚未完成的股票
+    - summarize_runs 提供各次 run 的耗時統計，供容量規劃參考
+    - last_run_failures 取得最近一次 run 最後仍失敗的股票，供排程只重試這些股票
+"""
+
+from utils.helpers import setup_logger
+import os
+import json
+import glob
+import secrets
+import threading
+from datetime import datetime, date
+
+logger = setup_logger("update_journal")
+
+JOURNAL_DIR = os.path.join("data", "update_journal")
+JOURNAL_KEEP_RUNS = 30       # 保留最近幾次 run 的日誌
+DONE_STATUS = ("updated", "skipped")
+
+
+class UpdateJournal:
+    """
+    單次更新作業的進度日誌（執行緒安全）
+
+    參數：
+        journal_dir (str): 日誌目錄
+        resume (bool): 是否接續當日未完成的 run
+    """
+
+    def __init__(self, journal_dir: str = JOURNAL_DIR, resume: bool = True):
+        self.journal_dir = journal_dir
+        self._lock = threading.Lock()
+        self.completed = {}
+        self.resumed = False
+
+        unfinished = find_unfinished_run(journal_dir) if resume else None
+        if unfinished:
+            self.run_id = unfinished
+            self.completed = load_completed(self.path)
+            self.resumed = True
+            print(f"♻️ 接續未完成的更新作業 {self.run_id}（已完成 {len(self.completed)} 檔）")
+        else:
+            self.run_id = new_run_id()
+            prune_runs(journal_dir)
+
+    @property
+    def path(self) -> str:
+        """本次 run 的日誌檔路徑"""
+        return os.path.join(self.journal_dir, f"{self.run_id}.jsonl")
+
+    def write(self, record: dict):
+        """
+        附加一筆紀錄並立即 flush（程序中斷時已寫入的紀錄不會遺失）
+
+        參數：
+            record (dict): 紀錄內容
+
+        返回：
+            NA
+        """
+        record = {"run": self.run_id, "ts": datetime.now().isoformat(timespec="seconds"), **record}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def start(self, total: int, mode: str):
+        """
+        記錄 run 開始（接續時記為 resume）
+
+        參數：
+            total (int): 待檢查股票檔數
+            mode (str): 更新模式
+
+        返回：
+            NA
+        """
+        self.write({"event": "resume" if self.resumed else "start", "date": date.today(), "total": total, "mode": mode})
+
+    def is_done(self, stock_id: str) -> bool:
+        """
+        股票是否已於本次 run 完成
+
+        參數：
+            stock_id (str): 股票代碼
+
+        返回：
+            bool
+        """
+        return stock_id in self.completed
+
+    def record(self, result: dict):
+        """
+        記錄單檔股票更新結果
+
+        參數：
+            result (dict): refresh_stock 回傳結果（stock_id, status, rows, attempts, error, last_date, elapsed）
+
+        返回：
+            NA
+        """
+        self.write({key: result.get(key) for key in ("stock_id", "status", "rows", "attempts", "last_date", "elapsed", "error")})
+        if result["status"] in DONE_STATUS:
+            with self._lock:
+                self.completed[result["stock_id"]] = result.get("last_date")
+
+    def finish(self, report: dict):
+        """
+        記錄 run 結束
+
+        參數：
+            report (dict): 更新統計報告
+
+        返回：
+            NA
+        """
+        self.write({"event": "end", "report": {k: v for k, v in report.items() if k != "failures"}})
+
+
+def new_run_id() -> str:
+    """
+    產生新的 run_id：時間至微秒並加上隨機碼（同一秒內啟動的多個 run 不會共用日誌檔），依字串排序即為時間順序
+
+    參數：
+        NA
+
+    返回：
+        run_id (str): 例如 20241018-153000-123456-9f3a
+    """
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{secrets.token_hex(2)}"
+
+
+def read_journal(path: str) -> list:
+    """
+    讀取日誌檔（忽略中斷時寫到一半的最後一行）
+
+    參數：
+        path (str): 日誌檔路徑
+
+    返回：
+        records (list[dict])
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"略過毀損的日誌行：{path}")
+    return records
+
+
+def load_completed(path: str) -> dict:
+    """
+    取得日誌中已完成的股票與最後寫入交易日
+
+    參數：
+        path (str): 日誌檔路徑
+
+    返回：
+        completed (dict): {stock_id: last_date}
+    """
+    return {r["stock_id"]: r.get("last_date") for r in read_journal(path) if r.get("status") in DONE_STATUS}
+
+
+def load_failed(path: str) -> list:
+    """
+    取得日誌中最後狀態為失敗的股票（之後重試成功者不列入）
+
+    參數：
+        path (str): 日誌檔路徑
+
+    返回：
+        stock_ids (list[str])
+    """
+    final = {}
+    for r in read_journal(path):
+        if "stock_id" in r:
+            final[r["stock_id"]] = r["status"]
+    return [stock_id for stock_id, status in final.items() if status == "failed"]
+
+
+def last_run_failures(journal_dir: str = JOURNAL_DIR) -> list:
+    """
+    取得最近一次 run 最後仍失敗的股票
+
+    參數：
+        journal_dir (str): 日誌目錄
+
+    返回：
+        stock_ids (list[str]): 無日誌時回傳空 list
+    """
+    paths = sorted(glob.glob(os.path.join(journal_dir, "*.jsonl")))
+    return load_failed(paths[-1]) if paths else []
+
+
+def find_unfinished_run(journal_dir: str = JOURNAL_DIR):
+    """
+    找出今日最近一次未結束的 run（跨日的 run 不接續，因資料基準日已不同）
+
+    參數：
+        journal_dir (str): 日誌目錄
+
+    返回：
+        run_id (str | None)
+    """
+    paths = sorted(glob.glob(os.path.join(journal_dir, "*.jsonl")))
+    if not paths:
+        return None
+    records = read_journal(paths[-1])
+    if not records or any(r.get("event") == "end" for r in records):
+        return None
+    if str(records[0].get("date")) != str(date.today()):
+        return None
+    return records[0]["run"]
+
+
+def prune_runs(journal_dir: str = JOURNAL_DIR, keep: int = JOURNAL_KEEP_RUNS):
+    """
+    刪除較舊的日誌檔，連同即將建立的新 run 只保留最近 keep 次
+
+    參數：
+        journal_dir (str): 日誌目錄
+        keep (int): 保留次數
+
+    返回：
+        NA
+    """
+    paths = sorted(glob.glob(os.path.join(journal_dir, "*.jsonl")))
+    for path in paths[:max(len(paths) - keep + 1, 0)]:
+        os.remove(path)
+
+
+def summarize_runs(journal_dir: str = JOURNAL_DIR) -> list:
+    """
+    彙整各次 run 的耗時統計（含中斷後接續的多段執行）
+
+    參數：
+        journal_dir (str): 日誌目錄
+
+    返回：
+        stats (list[dict]): run_id, segments, finished, stocks, updated, failed, rows,
+                            wall_sec, stock_sec_avg, stock_sec_p95, stock_sec_max
+    """
+    stats = []
+    for path in sorted(glob.glob(os.path.join(journal_dir, "*.jsonl"))):
+        records = read_journal(path)
+        if not records:
+            continue
+        stocks = [r for r in records if "stock_id" in r]
+        elapsed = sorted(r["elapsed"] for r in stocks if r.get("elapsed") is not None)
+        timestamps = [datetime.fromisoformat(r["ts"]) for r in records]
+        final = {}
+        for r in stocks:
+            final[r["stock_id"]] = r["status"]
+        stats.append({
+            "run_id": records[0]["run"],
+            "segments": sum(r.get("event") in ("start", "resume") for r in records),
+            "finished": any(r.get("event") == "end" for r in records),
+            "stocks": len(final),
+            "updated": sum(s == "updated" for s in final.values()),
+            "failed": sum(s == "failed" for s in final.values()),
+            "rows": sum(r.get("rows") or 0 for r in stocks),
+            "wall_sec": (max(timestamps) - min(timestamps)).total_seconds(),
+            "stock_sec_avg": sum(elapsed) / len(elapsed) if elapsed else 0.0,
+            "stock_sec_p95": elapsed[int(len(elapsed) * 0.95)] if elapsed else 0.0,
+            "stock_sec_max": elapsed[-1] if elapsed else 0.0,
+        })
+    return stats
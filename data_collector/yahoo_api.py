@@ -4,43 +4,143 @@ data_collector/yahoo_api.py
 使用 yfinance 取得股票資料
 """
 
-from utils.helpers import setup_logger
+from utils.helpers import setup_logger, TokenBucket
 import yfinance as yf
+import pandas as pd
+from itertools import repeat
+from database.data_loader import PRICE_COLUMNS
 
 logger = setup_logger("yahoo_api")
 
-def fetch_stock_data(stock_code: str, start_date: str, end_date: str):
+# Yahoo Finance 共用限速器（所有執行緒共用同一組額度）
+YAHOO_RATE_PER_SEC = 4
+YAHOO_BURST = 8
+YAHOO_RATE_LIMITER = TokenBucket(YAHOO_RATE_PER_SEC, YAHOO_BURST)
+
+# 批次下載每個請求包含的股票檔數
+BATCH_CHUNK_SIZE = 50
+
+def fetch_stock_data(stock_code: str, start_date: str, end_date: str, as_rows: bool = False):
     """
     抓取股票歷史資料，回傳 list[dict]
     每筆 dict 包含：stock_id, trade_date, open_price, high_price, low_price, close_price, volume
+    as_rows=True 時改回傳依 PRICE_COLUMNS 排列的 list[tuple]，可直接交給 insert_stock_price
     
     參數：
         stock_code (str): yahoo股票代碼
         start_date (str): 查詢起始日期
         end_date (str): 查詢結束日期
+        as_rows (bool): 是否回傳 tuple 批次格式
     
     返回：
-        data_list (list[dict]): 股價資料
+        data_list (list[dict] | list[tuple]): 股價資料
     """
     
+    YAHOO_RATE_LIMITER.acquire()
     ticker = yf.Ticker(stock_code)
     hist = ticker.history(start=start_date, end=end_date)
 
-    if hist.empty:
+    return history_to_rows(hist, stock_code) if as_rows else history_to_records(hist, stock_code)
+
+def fetch_stock_data_batch(requests_list, chunk_size: int = BATCH_CHUNK_SIZE, as_rows: bool = False):
+    """
+    批次抓取多檔股票歷史資料，以 yf.download 一次下載多檔以減少請求數。
+    相同結束日期的請求依起始日期排序後每 chunk_size 檔合併為一次下載，
+    下載區間取該批最早起始日，再依各檔自己的起始日裁切。
+    
+    參數：
+        requests_list (list[tuple]): [(yahoo股票代碼, 起始日期, 結束日期), ...]
+        chunk_size (int): 每次下載的股票檔數
+        as_rows (bool): 是否回傳 tuple 批次格式
+    
+    返回：
+        results (dict[str, list]): {yahoo股票代碼: 股價資料}，格式同 fetch_stock_data
+    """
+    convert = history_to_rows if as_rows else history_to_records
+    groups = {}
+    for stock_code, start_date, end_date in requests_list:
+        groups.setdefault(str(end_date), []).append((str(start_date), stock_code))
+
+    results = {}
+    for end_date, items in groups.items():
+        items.sort()
+        for i in range(0, len(items), chunk_size):
+            chunk = items[i:i + chunk_size]
+            codes = [code for _, code in chunk]
+            YAHOO_RATE_LIMITER.acquire()
+            try:
+                wide = yf.download(
+                    codes, start=chunk[0][0], end=end_date, group_by="ticker",
+                    auto_adjust=True, threads=True, progress=False
+                )
+            except Exception as e:
+                print(f"⚠️ 批次下載失敗 ({len(codes)} 檔)：{e}")
+                logger.warning(f"fetch_stock_data_batch 失敗 {codes}: {e}")
+                continue
+
+            for start_date, code in chunk:
+                hist = split_batch_frame(wide, code)
+                if not hist.empty:
+                    hist = hist[hist.index.strftime("%Y-%m-%d") >= start_date]
+                results[code] = convert(hist, code)
+
+        print(f"✅ 批次下載完成：{len(items)} 檔，{-(-len(items) // chunk_size)} 次請求")
+    return results
+
+def split_batch_frame(wide, stock_code: str):
+    """
+    自 yf.download 多檔寬表取出單一股票的 OHLCV，並去除無交易的列
+    
+    參數：
+        wide (pd.DataFrame): yf.download(group_by="ticker") 結果
+        stock_code (str): yahoo股票代碼
+    
+    返回：
+        hist (pd.DataFrame): 單一股票歷史資料（欄位同 Ticker.history）
+    """
+    if wide is None or wide.empty:
+        return pd.DataFrame()
+    if wide.columns.nlevels > 1:
+        if stock_code not in wide.columns.get_level_values(0):
+            return pd.DataFrame()
+        hist = wide[stock_code]
+    else:
+        hist = wide
+    return hist.dropna(subset=["Close"])
+
+def history_to_rows(hist, stock_code: str):
+    """
+    以欄位向量化方式將 yfinance 歷史資料轉換為 tuple 批次（依 PRICE_COLUMNS 排列），
+    日期一次格式化、價格與成交量一次轉型，不逐列建立 dict
+    
+    參數：
+        hist (pd.DataFrame): 歷史資料（Open/High/Low/Close/Volume）
+        stock_code (str): yahoo股票代碼
+    
+    返回：
+        rows (list[tuple]): 股價資料
+    """
+    if hist is None or hist.empty:
         return []
 
-    data_list = []
-    for date, row in hist.iterrows():
-        data_list.append({
-            "stock_id": stock_code.split(".")[0],
-            "trade_date": date.strftime("%Y-%m-%d"),
-            "open_price": float(row["Open"]),
-            "high_price": float(row["High"]),
-            "low_price": float(row["Low"]),
-            "close_price": float(row["Close"]),
-            "volume": int(row["Volume"])
-        })
-    return data_list
+    dates = hist.index.strftime("%Y-%m-%d").tolist()
+    # tolist() 轉回 Python float/int，mysql.connector 無法直接處理 numpy 型別
+    prices = hist[["Open", "High", "Low", "Close"]].to_numpy(dtype="float64").T.tolist()
+    volumes = hist["Volume"].fillna(0).to_numpy(dtype="int64").tolist()
+    return list(zip(repeat(stock_code.split(".")[0]), dates, *prices, volumes))
+
+def history_to_records(hist, stock_code: str):
+    """
+    將 yfinance 歷史資料轉換為 stock_price_daily 格式的 list[dict]
+    
+    參數：
+        hist (pd.DataFrame): 歷史資料（Open/High/Low/Close/Volume）
+        stock_code (str): yahoo股票代碼
+    
+    返回：
+        data_list (list[dict]): 股價資料
+    """
+    return [dict(zip(PRICE_COLUMNS, row)) for row in history_to_rows(hist, stock_code)]
 
 def fetch_stock_name(stock_code: str) -> str:
     """
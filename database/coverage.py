@@ -0,0 +1,89 @@
+"""
+database/coverage.py
+-----------
+stock_price_coverage 覆蓋範圍表：每檔股票一列（最早/最新交易日、筆數、更新時間）
+    - 寫入 stock_price_daily 時於同一交易內遞增更新（儲存後端的 record_coverage），只查詢本批資料的鍵值
+    - 資料存在與最新交易日的檢查改為主鍵查詢，不再掃描股價表
+    - rebuild_coverage 依 stock_price_daily 重新計算（初次建表或資料被手動修改後執行）
+"""
+
+from utils.helpers import setup_logger
+from database.storage import get_storage
+
+logger = setup_logger("coverage")
+
+
+def rebuild_coverage(stock_ids=None) -> int:
+    """
+    依 stock_price_daily 重新計算覆蓋範圍
+
+    參數：
+        stock_ids (list[str]): 限定的股票代碼（None 為全部）
+
+    返回：
+        count (int): 更新股票檔數，失敗時回傳 -1
+    """
+    try:
+        count = get_storage().rebuild_coverage(stock_ids)
+    except Exception as e:
+        print("❌ 覆蓋範圍重建失敗：", e)
+        return -1
+
+    print(f"✅ 覆蓋範圍重建完成，共 {count} 檔股票")
+    return count
+
+
+def get_coverage(stock_id: str):
+    """
+    取得單一股票覆蓋範圍（主鍵查詢）
+
+    參數：
+        stock_id (str): 股票代碼
+
+    返回：
+        coverage (dict | None): first_date, last_date, row_count, updated_at；無資料或連線失敗時回傳 None
+    """
+    try:
+        return get_storage().get_coverage(stock_id)
+    except Exception as e:
+        logger.error(f"讀取 {stock_id} 覆蓋範圍失敗：{e}")
+        return None
+
+
+def get_all_last_dates() -> dict:
+    """
+    取得所有股票的最新交易日（讀取覆蓋範圍表，筆數等於股票檔數）
+
+    參數：
+        NA
+
+    返回：
+        last_dates (dict[str, date] | None): {stock_id: 最新交易日}，連線失敗時回傳 None
+    """
+    try:
+        return get_storage().get_all_last_dates()
+    except Exception as e:
+        logger.error(f"讀取覆蓋範圍失敗：{e}")
+        return None
+
+
+def get_all_coverage() -> dict:
+    """
+    取得所有股票的覆蓋範圍
+
+    參數：
+        NA
+
+    返回：
+        coverage (dict[str, dict] | None): {stock_id: {first_date, last_date, row_count}}，連線失敗時回傳 None
+    """
+    try:
+        return get_storage().get_all_coverage()
+    except Exception as e:
+        logger.error(f"讀取覆蓋範圍失敗：{e}")
+        return None
+
+
+# ========== 便利測試區（本檔直接執行時） ==========
+if __name__ == "__main__":
+    rebuild_coverage()
@@ -2,65 +2,133 @@
 """
 database/data_loder.py
 -----------
-股價資料寫入
+股價資料寫入（經由 database/storage 的儲存後端，MySQL 或 SQLite）
 """
 
 from utils.helpers import setup_logger
-from database.db_connection import get_connection, close_connection
-from database.stock_info_manager import ensure_stock_exists
-from utils.stock_info_map import get_stock_name, get_stock_type
-from data_collector.twse_crawler import fetch_twse_stock_list
+import time
+from database.stock_info_manager import ensure_stocks_exist, is_known_stock
+from database.storage import get_storage, PRICE_COLUMNS
+from database.price_cache import invalidate_partitions
+from utils.stock_info_map import resolve_stock_name, get_stock_type
 
 logger = setup_logger("data_loder")
 
+# 大量寫入設定
+BULK_THRESHOLD = 5000        # insert_stock_price 筆數達此值時改用 bulk_insert_stock_price
+BULK_CHUNK_SIZE = 5000       # 每個多列 VALUES 語句的筆數（需小於 max_allowed_packet）
+BULK_METHOD = "values"       # values: 多列 VALUES；infile: LOAD DATA LOCAL INFILE 暫存表後合併
+
+def to_price_rows(data) -> list:
+    """
+    將 list[dict] 股價資料轉為依 PRICE_COLUMNS 排列的 tuple（已是 tuple 時原樣返回）
+    
+    參數：
+        data (list[dict] | list[tuple]): 股價資訊
+    
+    返回：
+        rows (list[tuple])
+    """
+    if isinstance(data[0], dict):
+        return [tuple(row[col] for col in PRICE_COLUMNS) for row in data]
+    return data
+
+def ensure_price_stocks(stock_ids):
+    """
+    確保批次內所有股票存在於 stock_info（外鍵需求）；
+    已登錄的代碼只查程序內快取，未登錄的代碼以單一批次寫入
+    
+    參數：
+        stock_ids (Iterable[str]): 股票代碼
+    
+    返回：
+        NA
+    """
+    rows = []
+    for stock_id in stock_ids:
+        if is_known_stock(stock_id):
+            continue
+        # 查無名稱時最多觸發一次清單重抓（single-flight + 負向快取）
+        stock_name = resolve_stock_name(stock_id) or stock_id
+        rows.append((stock_id, stock_name, "未知", get_stock_type(stock_id), None))
+    ensure_stocks_exist(rows)
+
 def insert_stock_price(data):
     """
     將股價資料寫入 stock_price_daily
-    每筆 dict 需包含：
-    ['stock_id', 'trade_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+    可接受兩種格式：
+    - list[dict]：每筆 dict 需包含 PRICE_COLUMNS 所列欄位
+    - list[tuple]：每筆 tuple 依 PRICE_COLUMNS 順序排列（yahoo_api 欄位式轉換結果，免建 dict）
+    同一批可包含多檔股票（例如全市場每日行情）
+    寫入時於同一交易內更新 stock_price_coverage，寫入後使受影響的 Parquet 快取分區失效
     
     參數：
-        data (dict): 股價資訊
+        data (list[dict] | list[tuple]): 股價資訊
     
     返回：
-        df_summary (pd.Dataframe): 股價摘要
+        success (bool): 寫入成功與否
     """
     if not data:
         print("⚠️ 無資料可寫入。")
-        return
+        return False
 
-    stock_id = data[0]["stock_id"]
-    stock_name = get_stock_name(stock_id)
-    if not stock_name:
-        fetch_twse_stock_list()  # 自動抓取最新中文名稱表   
-    stock_type = get_stock_type(stock_id)
+    if len(data) >= BULK_THRESHOLD:
+        return bool(bulk_insert_stock_price(data))
 
-    # 確保股票存在於 stock_info
-    ensure_stock_exists(stock_id, stock_name=stock_name, market_type=stock_type)
+    data = to_price_rows(data)
+    stock_ids = list(dict.fromkeys(row[0] for row in data))
+    stock_id = stock_ids[0] if len(stock_ids) == 1 else f"{len(stock_ids)} 檔股票"
 
-    conn = get_connection()
-    if not conn:
-        return
+    try:
+        ensure_price_stocks(stock_ids)
+        get_storage().upsert_prices(data)
+    except Exception as e:
+        print("❌ 寫入失敗：", e)
+        return False
+    invalidate_partitions(data)
+    print(f"✅ 已成功寫入 {len(data)} 筆 {stock_id} 資料")
+    return True
 
-    cursor = conn.cursor()
-    insert_query = """
-        INSERT INTO stock_price_daily
-        (stock_id, trade_date, open_price, high_price, low_price, close_price, volume)
-        VALUES (%(stock_id)s, %(trade_date)s, %(open_price)s, %(high_price)s, %(low_price)s, %(close_price)s, %(volume)s)
-        ON DUPLICATE KEY UPDATE
-            open_price = VALUES(open_price),
-            high_price = VALUES(high_price),
-            low_price = VALUES(low_price),
-            close_price = VALUES(close_price),
-            volume = VALUES(volume);
+def bulk_insert_stock_price(data, chunk_size: int = BULK_CHUNK_SIZE, method: str = BULK_METHOD) -> dict:
+    """
+    大量寫入 stock_price_daily（全市場、多年度回補用）
+    - values：每 chunk_size 筆組成一個多列 VALUES upsert，一次往返寫入整批
+    - infile：寫成暫存檔以 LOAD DATA LOCAL INFILE 載入暫存表，再以 INSERT ... SELECT 合併
+      （需 MySQL 開啟 local_infile，且 DB_CONFIG 設定 allow_local_infile=True）
+    兩種方式皆於同一交易內更新 stock_price_coverage；SQLite 後端不區分方式，整批於單一交易寫入
+    
+    參數：
+        data (list[dict] | list[tuple]): 股價資訊（格式同 insert_stock_price）
+        chunk_size (int): 每批筆數
+        method (str): values / infile
+    
+    返回：
+        report (dict | None): rows, chunks, elapsed, rows_per_sec, method；失敗時回傳 None
     """
+    if not data:
+        print("⚠️ 無資料可寫入。")
+        return None
+
+    data = to_price_rows(data)
+
     try:
-        cursor.executemany(insert_query, data)
-        conn.commit()
-        print(f"✅ 已成功寫入 {len(data)} 筆 {stock_id} 資料")
+        ensure_price_stocks(dict.fromkeys(row[0] for row in data))
+        started = time.monotonic()
+        chunks = get_storage().bulk_upsert_prices(data, chunk_size, method)
     except Exception as e:
-        print("❌ 寫入失敗：", e)
-        conn.rollback()
-    finally:
-        cursor.close()
-        close_connection(conn)
+        print(f"❌ 大量寫入失敗（{method}）：", e)
+        logger.error(f"bulk_insert_stock_price 失敗：{e}")
+        return None
+
+    elapsed = time.monotonic() - started
+    invalidate_partitions(data)
+    report = {
+        "rows": len(data),
+        "chunks": chunks,
+        "elapsed": elapsed,
+        "rows_per_sec": len(data) / elapsed if elapsed > 0 else float("inf"),
+        "method": method,
+    }
+    print(f"✅ 大量寫入 {report['rows']} 筆（{method}，{chunks} 批）：{elapsed:.2f} 秒，{report['rows_per_sec']:,.0f} 筆/秒")
+    logger.info(f"bulk_insert_stock_price report: {report}")
+    return report
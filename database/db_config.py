@@ -1,9 +1,15 @@
 """
 database/db_config.py
 -----------
-MySQL 資料庫連線設定
+資料庫連線設定
 """
 
+import os
+
+# 儲存後端：mysql（預設）或 sqlite（內嵌單檔，免架設資料庫伺服器）；可由環境變數 TWSE_STORAGE 覆寫
+STORAGE_BACKEND = os.environ.get("TWSE_STORAGE", "mysql")
+SQLITE_PATH = os.environ.get("TWSE_SQLITE_PATH", os.path.join("data", "twse.sqlite"))
+
 DB_CONFIG = {
     "host": "localhost",          # 或雲端資料庫 IP
     "port": 3306,
@@ -12,3 +18,11 @@ DB_CONFIG = {
     "database": "twse",  # 資料庫名稱
     "charset": "utf8mb4"
 }
+
+# 連線池設定（database/db_connection 共用）
+POOL_CONFIG = {
+    "pool_size": 10,             # 同時借出的連線上限
+    "checkout_timeout": 30,      # 連線皆被借出時的最長等待秒數
+    "ping_after": 30,            # 閒置超過此秒數的連線借出前先 ping 檢查
+    "recycle": 3600,             # 連線使用超過此秒數即重建（避開 MySQL wait_timeout）
+}
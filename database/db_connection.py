@@ -1,45 +1,284 @@
 """
 database/db_connection.py
 -----------
-建立 MySQL 連線物件
+MySQL 連線池（整個程序共用）：
+    - get_connection() 自連線池借出連線，close_connection() / conn.close() 歸還而非斷線
+    - 閒置過久的連線借出前先 ping 檢查，失效或超過 recycle 秒數的連線自動重建
+    - pooled_connection() 提供 with 語法借還連線（storage.MySQLStorage 的查詢與交易皆經由此借出）
+    - get_pool_stats() 回傳借出次數、等待時間、使用中連線數等統計
 """
 
 from utils.helpers import setup_logger
+import time
+import threading
+from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error
-from database.db_config import DB_CONFIG
+from database.db_config import DB_CONFIG, POOL_CONFIG
 
 logger = setup_logger("db_connection")
 
+
+class PooledConnection:
+    """
+    借出的連線代理物件：介面同 mysql.connector 連線，close() 時歸還連線池
+
+    參數：
+        pool (ConnectionPool): 所屬連線池
+        raw: mysql.connector 連線
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise Error("連線已歸還連線池")
+        return getattr(self._raw, name)
+
+    def is_connected(self) -> bool:
+        """連線是否仍借出中且有效"""
+        return self._raw is not None and self._raw.is_connected()
+
+    def close(self):
+        """歸還連線（重複呼叫無作用）"""
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    執行緒安全的 MySQL 連線池（閒置連線後進先出，優先重用剛歸還的連線）
+
+    參數：
+        config (dict): mysql.connector.connect 參數
+        pool_size (int): 同時借出的連線上限
+        checkout_timeout (float): 等待可用連線的最長秒數
+        ping_after (float): 閒置超過此秒數時借出前先 ping
+        recycle (float): 連線建立超過此秒數即重建
+    """
+
+    def __init__(self, config, pool_size=10, checkout_timeout=30, ping_after=30, recycle=3600):
+        self.config = config
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self.recycle = recycle
+        self._cond = threading.Condition()
+        self._idle = []          # [(raw, returned_at)]
+        self._created_at = {}    # id(raw) -> 建立時間
+        self._active = 0
+        self.stats = {"checkouts": 0, "created": 0, "discarded": 0, "timeouts": 0,
+                      "wait_total": 0.0, "wait_max": 0.0, "active_peak": 0}
+
+    def checkout(self, timeout=None) -> PooledConnection:
+        """
+        借出連線，連線皆被借出時等待至 timeout
+
+        參數：
+            timeout (float): 最長等待秒數（預設 checkout_timeout）
+
+        返回：
+            connection (PooledConnection)
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        with self._cond:
+            while self._active >= self.pool_size:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise Error(f"連線池已滿（{self.pool_size}），等待逾時 {timeout} 秒")
+                self._cond.wait(remaining)
+            self._active += 1
+            self.stats["active_peak"] = max(self.stats["active_peak"], self._active)
+            idle = self._idle.pop() if self._idle else None
+
+        try:
+            raw = self._validate(idle) if idle else None
+            if raw is None:
+                raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self.stats["checkouts"] += 1
+            self.stats["wait_total"] += waited
+            self.stats["wait_max"] = max(self.stats["wait_max"], waited)
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """
+        歸還連線：回滾未提交的交易後放回閒置清單，失效連線直接捨棄
+
+        參數：
+            raw: mysql.connector 連線
+
+        返回：
+            NA
+        """
+        try:
+            if raw.is_connected() and raw.in_transaction:
+                raw.rollback()
+            healthy = raw.is_connected()
+        except Error:
+            healthy = False
+
+        with self._cond:
+            self._active -= 1
+            if healthy:
+                self._idle.append((raw, time.monotonic()))
+            else:
+                self._discard(raw)
+            self._cond.notify()
+
+    def _connect(self):
+        """建立新連線"""
+        raw = mysql.connector.connect(**self.config)
+        with self._cond:
+            self._created_at[id(raw)] = time.monotonic()
+            self.stats["created"] += 1
+        logger.debug("MySQL 新連線建立")
+        return raw
+
+    def _validate(self, idle):
+        """檢查閒置連線，過舊或失效時捨棄並回傳 None"""
+        raw, returned_at = idle
+        now = time.monotonic()
+        if now - self._created_at.get(id(raw), now) > self.recycle:
+            self._close_raw(raw)
+            return None
+        if now - returned_at > self.ping_after:
+            try:
+                raw.ping(reconnect=False)
+            except Error:
+                self._close_raw(raw)
+                return None
+        return raw
+
+    def _discard(self, raw):
+        """移除連線紀錄（呼叫端需持有 _cond）"""
+        self._created_at.pop(id(raw), None)
+        self.stats["discarded"] += 1
+
+    def _close_raw(self, raw):
+        """關閉並捨棄連線"""
+        with self._cond:
+            self._discard(raw)
+        try:
+            raw.close()
+        except Error:
+            pass
+
+    def close_idle(self):
+        """關閉所有閒置連線（程序結束或設定變更時使用）"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for raw, _ in idle:
+            self._close_raw(raw)
+
+    def get_stats(self) -> dict:
+        """
+        連線池統計
+
+        參數：
+            NA
+
+        返回：
+            stats (dict): size, active, idle, checkouts, created, discarded, timeouts,
+                          wait_avg, wait_max, active_peak
+        """
+        with self._cond:
+            stats = dict(self.stats, size=self.pool_size, active=self._active, idle=len(self._idle))
+        stats["wait_avg"] = stats["wait_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """
+    取得程序共用的連線池（第一次呼叫時依 POOL_CONFIG 建立）
+
+    參數：
+        NA
+
+    返回：
+        pool (ConnectionPool)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+        return _pool
+
 def get_connection():
     """
-    建立資料庫連線
-    
+    自連線池借出資料庫連線
+
     參數：
         NA
-    
+
     返回：
-        connection (mysql.connector.connect())
+        connection (PooledConnection)：失敗時回傳 None
     """
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            print("✅ MySQL 連線成功")
-            return connection
+        return get_pool().checkout()
     except Error as e:
         print("❌ MySQL 連線失敗：", e)
         return None
 
 def close_connection(connection):
     """
-    關閉資料庫連線
-    
+    歸還資料庫連線至連線池
+
     參數：
-        connection (mysql.connector.connect())
-    
+        connection (PooledConnection)
+
     返回：
         NA
     """
-    if connection and connection.is_connected():
+    if connection:
         connection.close()
-        print("🔌 資料庫連線已關閉")
+
+@contextmanager
+def pooled_connection():
+    """
+    以 with 語法借出連線，離開區塊時自動歸還；無法取得連線時丟出 mysql.connector.Error
+
+    參數：
+        NA
+
+    返回：
+        connection (PooledConnection)
+    """
+    conn = get_pool().checkout()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def get_pool_stats() -> dict:
+    """
+    連線池統計（尚未建立連線池時回傳空 dict）
+
+    參數：
+        NA
+
+    返回：
+        stats (dict)
+    """
+    return _pool.get_stats() if _pool else {}
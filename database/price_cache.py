@@ -0,0 +1,323 @@
+"""
+database/price_cache.py
+-----------
+stock_price_daily 的本地 Parquet 讀取快取（read-through），依股票與年度分區：
+    data/price_cache/<stock_id>/<year>.parquet       已結束年度（年度結束後寫入），內容不再變動，讀取時不查資料庫
+    data/price_cache/<stock_id>/<year>.open.parquet  尚未結束的年度，讀取時只向資料庫查詢最後快取日之後的資料並附加
+    - 缺少的分區整年度自資料庫讀取後寫入（同一年度多檔股票合併為一次查詢）
+    - data_loader 寫入股價後呼叫 invalidate_partitions：已結束年度或改寫到已快取日期的分區直接刪除，
+      只附加新交易日的寫入則保留分區，由下次讀取增量補上
+需安裝 pyarrow；未安裝時 CACHE_ENABLED 為 False，改直接查詢資料庫。
+"""
+
+from utils.helpers import setup_logger
+import os
+import shutil
+import threading
+from datetime import date, timedelta
+from importlib.util import find_spec
+import numpy as np
+import pandas as pd
+from database.storage import get_storage, PRICE_FIELDS
+from utils.trading_calendar import to_date
+
+logger = setup_logger("price_cache")
+
+CACHE_DIR = os.path.join("data", "price_cache")
+CACHE_ENABLED = find_spec("pyarrow") is not None
+PARTITION_COLUMNS = ("trade_date",) + PRICE_FIELDS + ("volume",)
+
+_write_lock = threading.Lock()
+
+
+# ---------------------
+# 股價資料表
+# ---------------------
+def rows_to_price_frame(rows, float_dtype=np.float64) -> pd.DataFrame:
+    """
+    將查詢結果 tuple 列轉為欄位式 DataFrame
+
+    參數：
+        rows (list[tuple]): (stock_id, trade_date, open, high, low, close, volume)
+        float_dtype: 價格欄位型別
+
+    返回：
+        df (pd.Dataframe)
+    """
+    if not rows:
+        return pd.DataFrame()
+    stock_col, date_col, *price_cols, volume_col = zip(*rows)
+    data = {
+        "stock_id": np.array(stock_col, dtype=object),
+        "trade_date": pd.to_datetime(np.array(date_col, dtype="datetime64[D]")),
+    }
+    for name, values in zip(PRICE_FIELDS, price_cols):
+        data[name] = np.array(values, dtype=float_dtype)
+    data["volume"] = np.array(volume_col, dtype=np.int64)
+    return pd.DataFrame(data)
+
+
+def split_price_frame(df: pd.DataFrame) -> dict:
+    """
+    依 stock_id 切分已排序的股價資料（以邊界位置切片，不做 groupby）
+
+    參數：
+        df (pd.Dataframe): 依 stock_id、trade_date 排序的股價資料
+
+    返回：
+        frames (dict[str, pd.Dataframe])
+    """
+    if df.empty:
+        return {}
+    ids = df["stock_id"].to_numpy()
+    bounds = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(ids)]))
+    return {ids[a]: df.iloc[a:b].reset_index(drop=True) for a, b in zip(starts, ends)}
+
+
+# ---------------------
+# 分區檔案
+# ---------------------
+def partition_path(stock_id: str, year: int, closed: bool) -> str:
+    """分區檔案路徑"""
+    return os.path.join(CACHE_DIR, stock_id, f"{year}.parquet" if closed else f"{year}.open.parquet")
+
+
+def read_partition(stock_id: str, year: int):
+    """
+    讀取分區（優先已結束的分區）
+
+    參數：
+        stock_id (str): 股票代碼
+        year (int): 年度
+
+    返回：
+        (df, closed) (tuple[pd.Dataframe, bool] | None): 分區資料與是否為已結束分區；無快取或檔案損毀時回傳 None
+    """
+    for closed in (True, False):
+        path = partition_path(stock_id, year, closed)
+        if os.path.exists(path):
+            try:
+                return pd.read_parquet(path), closed
+            except Exception as e:
+                logger.warning(f"快取分區讀取失敗，改由資料庫重建：{path}（{e}）")
+                remove_partition(stock_id, year)
+                return None
+    return None
+
+
+def write_partition(stock_id: str, year: int, df: pd.DataFrame, closed: bool):
+    """
+    寫入分區（先寫暫存檔再以 os.replace 取代，讀取端不會看到寫到一半的檔案）
+
+    參數：
+        stock_id (str): 股票代碼
+        year (int): 年度
+        df (pd.Dataframe): 分區資料（PARTITION_COLUMNS，空表代表該年度無資料）
+        closed (bool): 是否為已結束年度
+
+    返回：
+        NA
+    """
+    path = partition_path(stock_id, year, closed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with _write_lock:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        if closed:
+            open_path = partition_path(stock_id, year, closed=False)
+            if os.path.exists(open_path):
+                os.remove(open_path)
+
+
+def remove_partition(stock_id: str, year: int):
+    """刪除分區（已結束與未結束的檔案皆刪除）"""
+    with _write_lock:
+        for closed in (True, False):
+            path = partition_path(stock_id, year, closed)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def to_partition_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """將股價資料整理為分區欄位（去除 stock_id，價格固定存為 float64）"""
+    if df.empty:
+        return pd.DataFrame({
+            "trade_date": pd.Series(dtype="datetime64[ns]"),
+            **{col: pd.Series(dtype=np.float64) for col in PRICE_FIELDS},
+            "volume": pd.Series(dtype=np.int64),
+        })
+    return df[list(PARTITION_COLUMNS)].astype({col: np.float64 for col in PRICE_FIELDS}).reset_index(drop=True)
+
+
+# ---------------------
+# 讀取
+# ---------------------
+def load_price_history(stock_ids, start_date, end_date, float_dtype=np.float64) -> dict:
+    """
+    經由 Parquet 快取讀取多檔股票股價：已結束年度直接讀本地檔案，
+    缺少的分區與未結束年度的新資料才查詢資料庫
+
+    參數：
+        stock_ids (list[str]): 股票代碼
+        start_date (str | date): 查詢起始日期
+        end_date (str | date): 查詢結束日期
+        float_dtype: 價格欄位型別（np.float64 或 np.float32）
+
+    返回：
+        frames (dict[str, pd.Dataframe]): {stock_id: 股價資料}，查無資料的股票不列入
+    """
+    start, end = to_date(start_date), to_date(end_date)
+    today = date.today()
+    years = range(start.year, min(end, today).year + 1)
+
+    parts = {}      # (stock_id, year) -> 分區資料
+    missing = {}    # year -> [stock_id]
+    stale = {}      # (stock_id, year) -> 未結束分區
+    for stock_id in stock_ids:
+        for year in years:
+            cached = read_partition(stock_id, year)
+            if cached is None:
+                missing.setdefault(year, []).append(stock_id)
+                continue
+            df, closed = cached
+            parts[(stock_id, year)] = df
+            if not closed:
+                stale[(stock_id, year)] = df
+
+    for year, ids in missing.items():
+        parts.update(fill_partitions(ids, year, today))
+    if stale:
+        parts.update(refresh_open_partitions(stale, today))
+
+    frames = {}
+    lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+    for stock_id in stock_ids:
+        pieces = [parts[(stock_id, year)] for year in years if not parts.get((stock_id, year), pd.DataFrame()).empty]
+        if not pieces:
+            continue
+        df = pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0]
+        df = df[(df["trade_date"] >= lo) & (df["trade_date"] <= hi)]
+        if df.empty:
+            continue
+        df = df.astype({col: float_dtype for col in PRICE_FIELDS})
+        df.insert(0, "stock_id", stock_id)
+        frames[stock_id] = df.reset_index(drop=True)
+    return frames
+
+
+def fill_partitions(stock_ids, year: int, today: date) -> dict:
+    """
+    自資料庫讀取整年度資料建立缺少的分區（同年度多檔股票一次查詢）
+
+    參數：
+        stock_ids (list[str]): 缺少該年度分區的股票
+        year (int): 年度
+        today (date): 今日（判斷年度是否已結束）
+
+    返回：
+        parts (dict[tuple[str, int], pd.Dataframe])
+    """
+    rows = get_storage().read_prices(stock_ids, date(year, 1, 1), date(year, 12, 31))
+    frames = split_price_frame(rows_to_price_frame(rows))
+    closed = year < today.year
+    parts = {}
+    for stock_id in stock_ids:
+        df = to_partition_frame(frames.get(stock_id, pd.DataFrame()))
+        write_partition(stock_id, year, df, closed)
+        parts[(stock_id, year)] = df
+    logger.info(f"快取 {year} 年度分區：{len(stock_ids)} 檔股票，{len(rows)} 筆")
+    return parts
+
+
+def refresh_open_partitions(stale: dict, today: date) -> dict:
+    """
+    未結束分區只查詢最後快取日之後的資料並附加；年度已結束者改存為已結束分區
+
+    參數：
+        stale (dict[tuple[str, int], pd.Dataframe]): 未結束分區
+        today (date): 今日
+
+    返回：
+        parts (dict[tuple[str, int], pd.Dataframe]): 更新後的分區
+    """
+    by_year = {}
+    for (stock_id, year), df in stale.items():
+        last = df["trade_date"].max().date() if not df.empty else date(year, 1, 1) - timedelta(days=1)
+        by_year.setdefault(year, {})[stock_id] = last
+
+    parts = {}
+    for year, last_dates in by_year.items():
+        since = min(last_dates.values()) + timedelta(days=1)
+        rows = get_storage().read_prices(list(last_dates), since, date(year, 12, 31))
+        frames = split_price_frame(rows_to_price_frame(rows))
+        closed = year < today.year
+        for stock_id, last in last_dates.items():
+            df = stale[(stock_id, year)]
+            new = frames.get(stock_id)
+            if new is not None:
+                new = new[new["trade_date"] > pd.Timestamp(last)]
+            if new is not None and not new.empty:
+                df = pd.concat([df, to_partition_frame(new)], ignore_index=True)
+            elif not closed:
+                parts[(stock_id, year)] = df
+                continue
+            write_partition(stock_id, year, df, closed)
+            parts[(stock_id, year)] = df
+    return parts
+
+
+# ---------------------
+# 寫入失效
+# ---------------------
+def invalidate_partitions(data):
+    """
+    股價寫入後使受影響的分區失效：已結束年度或寫入日期不晚於快取最後日的分區刪除，
+    只附加新交易日的未結束分區保留（下次讀取增量補上）
+
+    參數：
+        data (list[tuple]): 依 PRICE_COLUMNS 排列的已寫入資料
+
+    返回：
+        NA
+    """
+    if not CACHE_ENABLED or not os.path.isdir(CACHE_DIR):
+        return
+    earliest = {}
+    for row in data:
+        day = str(row[1])[:10]
+        key = (row[0], int(day[:4]))
+        if key not in earliest or day < earliest[key]:
+            earliest[key] = day
+
+    for (stock_id, year), day in earliest.items():
+        if os.path.exists(partition_path(stock_id, year, closed=True)):
+            remove_partition(stock_id, year)
+            continue
+        open_path = partition_path(stock_id, year, closed=False)
+        if not os.path.exists(open_path):
+            continue
+        try:
+            cached = pd.read_parquet(open_path, columns=["trade_date"])["trade_date"]
+        except Exception:
+            cached = None
+        if cached is None or (not cached.empty and pd.Timestamp(day) <= cached.max()):
+            remove_partition(stock_id, year)
+
+
+def clear_cache(stock_ids=None):
+    """
+    清除快取（None 為全部）
+
+    參數：
+        stock_ids (list[str]): 股票代碼
+
+    返回：
+        NA
+    """
+    with _write_lock:
+        targets = [os.path.join(CACHE_DIR, s) for s in stock_ids] if stock_ids else [CACHE_DIR]
+        for path in targets:
+            shutil.rmtree(path, ignore_errors=True)
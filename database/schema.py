@@ -0,0 +1,413 @@
+"""
+database/schema.py
+-----------
+MySQL 資料表版本管理（schema_version 記錄已套用的版本）：
+    - migrate：依序套用尚未執行的 MIGRATIONS（舊版以 table.sql 建立的資料庫同樣適用）
+    - stock_price_daily 以 (stock_id, trade_date) 為叢集主鍵（同一檔股票依日期連續存放），
+      價格為 DECIMAL(8,2)、股票代碼為 ascii，並依 trade_date 年度 RANGE 分區（區間查詢只掃描相關年度）
+    - ensure_year_partitions：自 p_future 分出新年度分區（每年執行一次，migrate 時自動檢查）
+    - explain_queries：以 EXPLAIN 檢查區間讀取、最新交易日等查詢，回報退化為全表掃描者
+SQLite 後端的資料表由 storage.SQLiteStorage 建立，不經此模組。
+
+執行: python -m database.schema [migrate|status|explain|partitions]
+"""
+
+from utils.helpers import setup_logger
+import sys
+from datetime import date, timedelta
+from database.db_connection import get_connection, close_connection
+from database.db_config import STORAGE_BACKEND
+from database.storage import MySQLStorage, MYSQL_TRADE_DATES_QUERY, MYSQL_COVERAGE_QUERY
+
+logger = setup_logger("schema")
+
+FIRST_PARTITION_YEAR = 2000      # 第一個年度分區（更早的資料放在 p_before）
+PARTITION_YEARS_AHEAD = 1        # 預先建立的未來年度分區數
+PRICE_TABLE = "stock_price_daily"
+
+STOCK_INFO_DDL = """
+CREATE TABLE IF NOT EXISTS stock_info (
+    stock_id VARCHAR(10) PRIMARY KEY,
+    stock_name VARCHAR(50),
+    industry VARCHAR(50),
+    market_type VARCHAR(20),
+    listing_date DATE
+)
+"""
+
+COVERAGE_DDL = """
+CREATE TABLE IF NOT EXISTS stock_price_coverage (
+    stock_id VARCHAR(10) PRIMARY KEY,
+    first_date DATE,
+    last_date DATE,
+    row_count INT,
+    updated_at DATETIME
+)
+"""
+
+INDICATOR_DDL = """
+CREATE TABLE IF NOT EXISTS stock_indicator_daily (
+    stock_id VARCHAR(10) CHARACTER SET ascii NOT NULL,
+    trade_date DATE NOT NULL,
+    ma_5 DOUBLE, ma_20 DOUBLE, rsi DOUBLE, macd DOUBLE, macd_signal DOUBLE,
+    bb_middle DOUBLE, bb_upper DOUBLE, bb_lower DOUBLE, volume_ma5 DOUBLE,
+    PRIMARY KEY (stock_id, trade_date)
+) ENGINE=InnoDB
+"""
+
+INDICATOR_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS stock_indicator_state (
+    stock_id VARCHAR(10) CHARACTER SET ascii PRIMARY KEY,
+    params_hash CHAR(16),
+    last_date DATE,
+    row_count INT,
+    state TEXT,
+    updated_at DATETIME
+) ENGINE=InnoDB
+"""
+
+EMPTY_INTERVAL_DDL = """
+CREATE TABLE IF NOT EXISTS stock_price_empty_interval (
+    stock_id VARCHAR(10) CHARACTER SET ascii NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    checked_at DATETIME,
+    PRIMARY KEY (stock_id, start_date, end_date)
+) ENGINE=InnoDB
+"""
+
+
+def price_table_ddl(table: str = PRICE_TABLE, last_year: int = None) -> str:
+    """
+    產生 stock_price_daily 建表語法（叢集主鍵、精簡欄位型別、年度分區）
+    分區表不支援外鍵，股票是否存在改由 data_loader.ensure_price_stocks 確保
+
+    參數：
+        table (str): 資料表名稱
+        last_year (int): 最後一個年度分區（預設今年 + PARTITION_YEARS_AHEAD）
+
+    返回：
+        ddl (str)
+    """
+    last_year = last_year or date.today().year + PARTITION_YEARS_AHEAD
+    partitions = [f"PARTITION p_before VALUES LESS THAN ('{FIRST_PARTITION_YEAR}-01-01')"]
+    partitions += [partition_clause(year) for year in range(FIRST_PARTITION_YEAR, last_year + 1)]
+    partitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+    separator = ",\n    "
+    return f"""
+CREATE TABLE {table} (
+    stock_id VARCHAR(10) CHARACTER SET ascii NOT NULL,
+    trade_date DATE NOT NULL,
+    open_price DECIMAL(8,2),
+    high_price DECIMAL(8,2),
+    low_price DECIMAL(8,2),
+    close_price DECIMAL(8,2),
+    volume BIGINT UNSIGNED,
+    PRIMARY KEY (stock_id, trade_date),
+    KEY idx_trade_date (trade_date)
+) ENGINE=InnoDB
+PARTITION BY RANGE COLUMNS (trade_date) (
+    {separator.join(partitions)}
+)
+"""
+
+
+def partition_clause(year: int) -> str:
+    """單一年度分區定義"""
+    return f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')"
+
+
+# ---------------------
+# 版本遷移
+# ---------------------
+def migration_base_tables(cursor):
+    """v1：stock_info 與 stock_price_coverage（與舊版 table.sql 相同，已存在則略過）"""
+    cursor.execute(STOCK_INFO_DDL)
+    cursor.execute(COVERAGE_DDL)
+
+
+def migration_partitioned_prices(cursor):
+    """
+    v2：以分區表重建 stock_price_daily
+    舊表（自增 id 主鍵 + 唯一鍵 + 外鍵）的資料複製到新表後以 RENAME 原子交換，再刪除舊表
+    """
+    if not table_exists(cursor, PRICE_TABLE):
+        cursor.execute(price_table_ddl())
+        return
+    if is_partitioned(cursor, PRICE_TABLE):
+        return
+
+    columns = "stock_id, trade_date, open_price, high_price, low_price, close_price, volume"
+    cursor.execute(f"DROP TABLE IF EXISTS {PRICE_TABLE}_new")
+    cursor.execute(price_table_ddl(f"{PRICE_TABLE}_new"))
+    print("🔄 複製 stock_price_daily 至分區表...")
+    cursor.execute(f"""
+        INSERT IGNORE INTO {PRICE_TABLE}_new ({columns})
+        SELECT {columns} FROM {PRICE_TABLE}
+        WHERE stock_id IS NOT NULL AND trade_date IS NOT NULL
+    """)
+    print(f"✅ 已複製 {cursor.rowcount} 筆")
+    cursor.execute(f"RENAME TABLE {PRICE_TABLE} TO {PRICE_TABLE}_old, {PRICE_TABLE}_new TO {PRICE_TABLE}")
+    cursor.execute(f"DROP TABLE {PRICE_TABLE}_old")
+
+
+def migration_coverage_index(cursor):
+    """v3：覆蓋範圍表加上 last_date 索引（查詢落後的股票時不掃描整表）"""
+    if not index_exists(cursor, "stock_price_coverage", "idx_last_date"):
+        cursor.execute("ALTER TABLE stock_price_coverage ADD KEY idx_last_date (last_date)")
+
+
+def migration_indicator_tables(cursor):
+    """v4：預先計算的技術指標表與增量計算狀態表（analytics/indicator_store）"""
+    cursor.execute(INDICATOR_DDL)
+    cursor.execute(INDICATOR_STATE_DDL)
+
+
+def migration_empty_intervals(cursor):
+    """v5：已確認 Yahoo 無資料的區間（data_updater 補抓缺口時略過，跨程序保留）"""
+    cursor.execute(EMPTY_INTERVAL_DDL)
+
+
+# (版本, 說明, 執行函式)；只能附加新版本，不可修改已發佈的版本
+MIGRATIONS = [
+    (1, "stock_info / stock_price_coverage", migration_base_tables),
+    (2, "stock_price_daily 叢集主鍵 + 年度分區", migration_partitioned_prices),
+    (3, "stock_price_coverage last_date 索引", migration_coverage_index),
+    (4, "stock_indicator_daily / stock_indicator_state", migration_indicator_tables),
+    (5, "stock_price_empty_interval", migration_empty_intervals),
+]
+
+
+def table_exists(cursor, table: str) -> bool:
+    """資料表是否存在"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    """資料表是否已分區"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+        (table,),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def index_exists(cursor, table: str, index: str) -> bool:
+    """索引是否存在"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def get_schema_version(cursor) -> int:
+    """目前已套用的最新版本（尚未建立 schema_version 時為 0）"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(100),
+            applied_at DATETIME
+        )
+    """)
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def migrate() -> int:
+    """
+    依序套用尚未執行的版本遷移，並補齊未來年度分區
+    （MySQL 的 DDL 會自動提交，每個版本完成後即寫入 schema_version，中斷後重跑從下一版繼續）
+
+    參數：
+        NA
+
+    返回：
+        version (int): 目前版本，失敗時回傳 -1
+    """
+    if STORAGE_BACKEND != "mysql":
+        print(f"ℹ️ 儲存後端為 {STORAGE_BACKEND}，資料表由 storage 自動建立")
+        return 0
+
+    conn = get_connection()
+    if not conn:
+        return -1
+    cursor = conn.cursor()
+    try:
+        version = get_schema_version(cursor)
+        for target, description, apply in MIGRATIONS:
+            if target <= version:
+                continue
+            print(f"🔄 套用 schema v{target}：{description}")
+            apply(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (%s, %s, NOW())",
+                (target, description),
+            )
+            conn.commit()
+            version = target
+            logger.info(f"schema v{target} 已套用：{description}")
+        ensure_year_partitions(cursor)
+        conn.commit()
+    except Exception as e:
+        print("❌ schema 遷移失敗：", e)
+        logger.error(f"schema 遷移失敗：{e}")
+        conn.rollback()
+        return -1
+    finally:
+        cursor.close()
+        close_connection(conn)
+
+    print(f"✅ schema 為最新版本 v{version}")
+    return version
+
+
+# ---------------------
+# 分區維護
+# ---------------------
+def ensure_year_partitions(cursor, years_ahead: int = PARTITION_YEARS_AHEAD) -> list:
+    """
+    確保未來年度分區存在：自 p_future 以 REORGANIZE 分出缺少的年度（p_future 通常為空，不搬移資料）
+
+    參數：
+        cursor: 資料庫游標
+        years_ahead (int): 預先建立的年度數
+
+    返回：
+        added (list[int]): 新增的年度
+    """
+    cursor.execute(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+        (PRICE_TABLE,),
+    )
+    names = {row[0] for row in cursor.fetchall()}
+    if "p_future" not in names:
+        return []
+    years = [int(name[1:]) for name in names if name[1:].isdigit()]
+    last = max(years) if years else FIRST_PARTITION_YEAR - 1
+    added = list(range(last + 1, date.today().year + years_ahead + 1))
+    if added:
+        clauses = ", ".join([partition_clause(year) for year in added] + ["PARTITION p_future VALUES LESS THAN (MAXVALUE)"])
+        cursor.execute(f"ALTER TABLE {PRICE_TABLE} REORGANIZE PARTITION p_future INTO ({clauses})")
+        print(f"✅ 新增年度分區：{added}")
+    return added
+
+
+# ---------------------
+# 執行計畫檢查
+# ---------------------
+def build_check_queries(stock_id: str = "2330") -> dict:
+    """
+    需要走索引的查詢（與 storage.MySQLStorage 實際使用的語法相同）
+
+    參數：
+        stock_id (str): 範例股票代碼
+
+    返回：
+        queries (dict[str, tuple[str, tuple]]): {名稱: (SQL, 參數)}
+    """
+    today = date.today()
+    year_ago = today - timedelta(days=365)
+    storage = MySQLStorage()
+    range_sql, range_params = storage.price_query([stock_id], year_ago, today)
+    multi_sql, multi_params = storage.price_query([stock_id, "2317", "0050"], year_ago, today)
+    slice_sql, slice_params = storage.price_query([stock_id], intervals=[(year_ago, year_ago + timedelta(days=30)), (today - timedelta(days=30), today)])
+    return {
+        "單檔區間讀取": (range_sql, tuple(range_params)),
+        "多檔區間讀取": (multi_sql, tuple(multi_params)),
+        "缺口區段讀取": (slice_sql, tuple(slice_params)),
+        "已有交易日": (MYSQL_TRADE_DATES_QUERY, (stock_id, year_ago, today)),
+        "覆蓋範圍（最新交易日）": (MYSQL_COVERAGE_QUERY, (stock_id,)),
+        "單日全市場": ("SELECT stock_id, close_price FROM stock_price_daily WHERE trade_date = %s", (today,)),
+        "落後股票": ("SELECT stock_id FROM stock_price_coverage WHERE last_date < %s", (year_ago,)),
+    }
+
+
+def explain_queries(stock_id: str = "2330") -> list:
+    """
+    以 EXPLAIN 檢查查詢執行計畫，type 為 ALL（全表掃描）或未使用索引者標記為問題
+
+    參數：
+        stock_id (str): 範例股票代碼
+
+    返回：
+        report (list[dict]): name, table, type, key, rows, partitions, full_scan；連線失敗時回傳 None
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor(dictionary=True)
+    report = []
+    try:
+        for name, (sql, params) in build_check_queries(stock_id).items():
+            cursor.execute(f"EXPLAIN {sql}", params)
+            for plan in cursor.fetchall():
+                report.append({
+                    "name": name,
+                    "table": plan.get("table"),
+                    "type": plan.get("type"),
+                    "key": plan.get("key"),
+                    "rows": plan.get("rows"),
+                    "partitions": plan.get("partitions"),
+                    "full_scan": plan.get("type") == "ALL" or plan.get("key") is None,
+                })
+    finally:
+        cursor.close()
+        close_connection(conn)
+
+    for item in report:
+        mark = "❌" if item["full_scan"] else "✅"
+        print(f"{mark} {item['name']}: {item['table']} type={item['type']} key={item['key']} "
+              f"rows={item['rows']} partitions={item['partitions']}")
+    full_scans = [item["name"] for item in report if item["full_scan"]]
+    if full_scans:
+        print(f"⚠️ 共 {len(full_scans)} 個查詢退化為全表掃描：{full_scans}")
+    return report
+
+
+def print_status():
+    """顯示目前版本與分區"""
+    conn = get_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    try:
+        version = get_schema_version(cursor)
+        pending = [target for target, _, _ in MIGRATIONS if target > version]
+        print(f"📋 schema v{version}，待套用：{pending or '無'}")
+        cursor.execute(
+            "SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            (PRICE_TABLE,),
+        )
+        for name, rows in cursor.fetchall():
+            print(f"   {name}: 約 {rows} 筆")
+    finally:
+        cursor.close()
+        close_connection(conn)
+
+
+# ========== 便利測試區（本檔直接執行時） ==========
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command == "status":
+        print_status()
+    elif command == "explain":
+        explain_queries()
+    elif command == "partitions":
+        conn = get_connection()
+        if conn:
+            cur = conn.cursor()
+            ensure_year_partitions(cur)
+            cur.close()
+            close_connection(conn)
+    else:
+        migrate()
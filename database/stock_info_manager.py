@@ -2,51 +2,141 @@
 database/stock_info_manager.py
 -----------
 處理 stock_info 表的管理邏輯
+    - sync_stock_info：整份股票清單以單一交易批次 upsert 至 stock_info
+    - 已登錄的股票代碼快取於程序內（_known_ids），寫入股價前的存在檢查只需查記憶體
 """
 
 from utils.helpers import setup_logger
-from database.db_connection import get_connection, close_connection
+import threading
+import pandas as pd
+from database.storage import get_storage, STOCK_INFO_COLUMNS
 
 logger = setup_logger("stock_info_manager")
 
+STOCK_LIST_PATH = "data/tw_stock_list.csv"
+
+_known_ids = None
+_known_lock = threading.Lock()
+
+def load_known_stock_ids(force: bool = False) -> set:
+    """
+    載入 stock_info 已有的股票代碼（程序內快取，只查詢一次）
+
+    參數：
+        force (bool): 是否強制重新查詢
+
+    返回：
+        known_ids (set[str])：連線失敗時回傳空集合（不快取）
+    """
+    global _known_ids
+    with _known_lock:
+        if _known_ids is not None and not force:
+            return _known_ids
+
+        try:
+            _known_ids = get_storage().load_stock_ids()
+        except Exception as e:
+            logger.error(f"讀取 stock_info 失敗：{e}")
+            return set()
+        logger.info(f"stock_info 已登錄 {len(_known_ids)} 檔股票")
+        return _known_ids
+
+def is_known_stock(stock_id: str) -> bool:
+    """
+    股票代碼是否已存在於 stock_info（查詢程序內快取）
+
+    參數：
+        stock_id (str): 股票代碼
+
+    返回：
+        bool
+    """
+    return stock_id in load_known_stock_ids()
+
+def upsert_stock_info(rows, overwrite: bool = True) -> int:
+    """
+    以單一交易批次寫入 stock_info，並更新程序內快取
+
+    參數：
+        rows (list[tuple]): 依 STOCK_INFO_COLUMNS 排列的股票資料
+        overwrite (bool): 已存在的股票是否以新資料覆蓋（False 時保留原資料）
+
+    返回：
+        count (int): 寫入筆數，失敗時回傳 -1
+    """
+    if not rows:
+        return 0
+    try:
+        get_storage().upsert_stock_info(rows, overwrite)
+    except Exception as e:
+        print("❌ stock_info 寫入失敗：", e)
+        return -1
+
+    known = load_known_stock_ids()
+    with _known_lock:
+        known.update(row[0] for row in rows)
+    return len(rows)
+
+def sync_stock_info(stock_list: pd.DataFrame = None) -> int:
+    """
+    將整份股票清單同步至 stock_info（單一交易批次 upsert，已存在者更新名稱、產業、市場與上市日）
+
+    參數：
+        stock_list (pd.DataFrame): fetch_twse_stock_list 的結果（stock_id, stock_name, stock_type, industry, listing_date），
+                                   None 時讀取 data/tw_stock_list.csv
+
+    返回：
+        count (int): 同步筆數，失敗時回傳 -1
+    """
+    if stock_list is None:
+        stock_list = pd.read_csv(STOCK_LIST_PATH, dtype=str)
+
+    df = stock_list.rename(columns={"stock_type": "market_type"}).astype(object)
+    for col in STOCK_INFO_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df = df[list(STOCK_INFO_COLUMNS)].drop_duplicates(subset="stock_id", keep="last")
+    df = df.where(pd.notna(df) & (df != ""), None)
+
+    count = upsert_stock_info(list(df.itertuples(index=False, name=None)))
+    if count >= 0:
+        print(f"✅ stock_info 同步完成，共 {count} 檔股票")
+    return count
+
 def ensure_stock_exists(stock_id: str, stock_name: str, industry: str = "未知", market_type: str = "TWSE", listing_date: str = None):
     """
     確保指定股票代號存在於 stock_info 表中
-    若不存在，則自動插入一筆基本資料
-    
+    若不存在，則自動插入一筆基本資料（已知代碼只查程序內快取，不連資料庫）
+
     參數：
         stock_id (str): : 股票代碼
         stock_name (str): 股票名稱
         industry (str): 產業別
         market_type (str): 市場類型
         listing_date (str): 上市日期
-    
+
     返回：
         True
     """
-    
-    conn = get_connection()
-    if not conn:
-        return False
+    if is_known_stock(stock_id):
+        return True
+    return ensure_stocks_exist([(stock_id, stock_name, industry, market_type, listing_date)])
+
+def ensure_stocks_exist(rows) -> bool:
+    """
+    批次確保多檔股票存在於 stock_info，只寫入快取中沒有的代碼且不覆蓋既有資料
 
-    cursor = conn.cursor()
-
-    # 檢查是否已存在
-    check_query = "SELECT COUNT(*) FROM stock_info WHERE stock_id = %s"
-    cursor.execute(check_query, (stock_id,))
-    exists = cursor.fetchone()[0] > 0
-
-    if not exists:
-        insert_query = """
-            INSERT INTO stock_info (stock_id, stock_name, industry, market_type, listing_date)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (stock_id, stock_name, industry, market_type, listing_date))
-        conn.commit()
-        print(f"✅ 股票 {stock_id} ({stock_name}) 已新增至 stock_info")
-    else:
-        print(f"ℹ️ 股票 {stock_id} 已存在於 stock_info")
-
-    cursor.close()
-    close_connection(conn)
+    參數：
+        rows (list[tuple]): 依 STOCK_INFO_COLUMNS 排列的股票資料
+
+    返回：
+        success (bool)
+    """
+    missing = [row for row in rows if not is_known_stock(row[0])]
+    if not missing:
+        return True
+    if upsert_stock_info(missing, overwrite=False) < 0:
+        return False
+    for row in missing:
+        print(f"✅ 股票 {row[0]} ({row[1]}) 已新增至 stock_info")
     return True
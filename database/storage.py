@@ -0,0 +1,814 @@
+"""
+database/storage.py
+-----------
+資料儲存後端：data_loader / coverage / stock_info_manager / data_updater 皆經由 get_storage() 存取
+    - MySQLStorage：預設後端，經由 db_connection 連線池
+    - SQLiteStorage：內嵌單檔資料庫（data/twse.sqlite），免架設資料庫伺服器，適合單機部署與測試；
+      股價表以 (stock_id, trade_date) 為叢集主鍵，同一檔股票的資料連續存放
+後端由 db_config.STORAGE_BACKEND（或環境變數 TWSE_STORAGE）選擇，兩者支援相同的
+upsert、覆蓋範圍 (coverage) 與區間讀取操作。
+"""
+
+from utils.helpers import setup_logger
+import os
+import math
+import sqlite3
+import tempfile
+import threading
+from datetime import date, datetime
+from database.db_connection import pooled_connection
+from database.db_config import STORAGE_BACKEND, SQLITE_PATH
+
+logger = setup_logger("storage")
+
+# stock_price_daily 欄位順序（tuple 批次格式依此順序排列）
+PRICE_COLUMNS = ("stock_id", "trade_date", "open_price", "high_price", "low_price", "close_price", "volume")
+PRICE_FIELDS = PRICE_COLUMNS[2:6]
+STOCK_INFO_COLUMNS = ("stock_id", "stock_name", "industry", "market_type", "listing_date")
+# stock_indicator_daily 指標欄位（analytics/indicator_store 對應 calculate_all_indicators 的欄位名稱）
+INDICATOR_COLUMNS = ("ma_5", "ma_20", "rsi", "macd", "macd_signal", "bb_middle", "bb_upper", "bb_lower", "volume_ma5")
+INDICATOR_STATE_COLUMNS = ("stock_id", "params_hash", "last_date", "row_count", "state")
+STAGING_TABLE = "stock_price_staging"
+EXISTING_KEYS_CHUNK = 1000   # 查詢既有鍵值時每次的筆數
+
+
+# ---------------------
+# 共用工具
+# ---------------------
+def summarize_batch(data) -> dict:
+    """
+    彙整寫入批次中各股票的交易日
+
+    參數：
+        data (list[tuple]): 依 PRICE_COLUMNS 排列的股價資料
+
+    返回：
+        summary (dict): {stock_id: set[交易日字串 YYYY-MM-DD]}
+    """
+    summary = {}
+    for row in data:
+        summary.setdefault(row[0], set()).add(str(row[1])[:10])
+    return summary
+
+
+def coverage_increments(summary: dict, existing: dict) -> list:
+    """
+    計算覆蓋範圍的遞增量：(stock_id, 本批最早日, 本批最新日, 新增筆數)
+
+    參數：
+        summary (dict): summarize_batch 結果
+        existing (dict): {stock_id: 本批中已存在的筆數}
+
+    返回：
+        rows (list[tuple])
+    """
+    return [
+        (stock_id, min(days), max(days), len(days) - existing.get(stock_id, 0))
+        for stock_id, days in summary.items()
+    ]
+
+
+def build_price_filter(placeholder: str, stock_ids, start_date=None, end_date=None, intervals=None):
+    """
+    產生股價區間讀取的 WHERE 條件
+
+    參數：
+        placeholder (str): 參數佔位符（MySQL 為 %s，SQLite 為 ?）
+        stock_ids (list[str]): 股票代碼
+        start_date / end_date: 查詢區間
+        intervals (list[tuple]): 多個日期區間（與 start/end 擇一）
+
+    返回：
+        where (str), params (list)
+    """
+    where = f"stock_id IN ({', '.join([placeholder] * len(stock_ids))})"
+    params = list(stock_ids)
+    if start_date and end_date:
+        where += f" AND trade_date BETWEEN {placeholder} AND {placeholder}"
+        params.extend([start_date, end_date])
+    if intervals:
+        ranges = " OR ".join([f"trade_date BETWEEN {placeholder} AND {placeholder}"] * len(intervals))
+        where += f" AND ({ranges})"
+        params.extend(day for interval in intervals for day in interval)
+    return where, params
+
+
+def build_upsert_query(named: bool = True, rows: int = 1) -> str:
+    """
+    產生 MySQL stock_price_daily 的 upsert 語法
+
+    參數：
+        named (bool): True 為 dict 具名參數，False 為 tuple 位置參數
+        rows (int): VALUES 列數（多列 VALUES 僅支援位置參數）
+
+    返回：
+        query (str): SQL 語法
+    """
+    if named:
+        values = ", ".join(f"%({col})s" for col in PRICE_COLUMNS)
+    else:
+        values = ", ".join(["%s"] * len(PRICE_COLUMNS))
+    values = ", ".join([f"({values})"] * rows)
+    return f"""
+        INSERT INTO stock_price_daily
+        ({", ".join(PRICE_COLUMNS)})
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE
+            {build_update_clause()};
+    """
+
+
+def build_update_clause() -> str:
+    """MySQL ON DUPLICATE KEY UPDATE 的欄位更新語法（價量欄位以新值覆蓋）"""
+    return ",\n            ".join(f"{col} = VALUES({col})" for col in PRICE_COLUMNS[2:])
+
+
+def format_infile_value(value) -> str:
+    """LOAD DATA 欄位值格式（None/NaN 寫為 \\N）"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "\\N"
+    return str(value)
+
+
+class StorageBackend:
+    """
+    儲存後端介面；寫入失敗時丟出例外，由 data_loader 等呼叫端處理
+
+    參數：
+        NA
+    """
+    name = ""
+
+    def upsert_prices(self, rows):
+        """以單一交易寫入股價（list[tuple]，依 PRICE_COLUMNS 排列）並更新覆蓋範圍"""
+        raise NotImplementedError
+
+    def bulk_upsert_prices(self, rows, chunk_size: int, method: str) -> int:
+        """大量寫入股價並更新覆蓋範圍，回傳批數"""
+        raise NotImplementedError
+
+    def read_prices(self, stock_ids, start_date=None, end_date=None, intervals=None) -> list:
+        """讀取股價 tuple 列（依 stock_id、trade_date 排序；價格為 float，成交量空值為 0）"""
+        raise NotImplementedError
+
+    def read_trade_dates(self, stock_id, start_date, end_date) -> list:
+        """讀取區間內已有的交易日"""
+        raise NotImplementedError
+
+    def get_coverage(self, stock_id):
+        """單一股票覆蓋範圍 dict（first_date, last_date, row_count, updated_at），無資料時回傳 None"""
+        raise NotImplementedError
+
+    def get_all_last_dates(self) -> dict:
+        """所有股票最新交易日 {stock_id: date}"""
+        raise NotImplementedError
+
+    def rebuild_coverage(self, stock_ids=None) -> int:
+        """依股價表重新計算覆蓋範圍，回傳股票檔數"""
+        raise NotImplementedError
+
+    def load_stock_ids(self) -> set:
+        """stock_info 已有的股票代碼"""
+        raise NotImplementedError
+
+    def upsert_stock_info(self, rows, overwrite: bool = True):
+        """以單一交易寫入 stock_info（list[tuple]，依 STOCK_INFO_COLUMNS 排列）"""
+        raise NotImplementedError
+
+    def list_stocks(self) -> list:
+        """stock_info 所有股票 [{"stock_id", "stock_name"}]"""
+        raise NotImplementedError
+
+    def get_all_coverage(self) -> dict:
+        """所有股票覆蓋範圍 {stock_id: {"first_date", "last_date", "row_count"}}"""
+        raise NotImplementedError
+
+    def get_empty_intervals(self, stock_id) -> list:
+        """已確認無資料的區間 [(start_date, end_date)]"""
+        raise NotImplementedError
+
+    def add_empty_interval(self, stock_id, start_date, end_date):
+        """記錄已確認無資料的區間"""
+        raise NotImplementedError
+
+    def write_indicators(self, rows, states, reset_ids=()):
+        """
+        以單一交易寫入指標：先刪除 reset_ids 的既有指標（重新計算），再 upsert 指標列與計算狀態
+        rows 依 ("stock_id", "trade_date") + INDICATOR_COLUMNS 排列，states 依 INDICATOR_STATE_COLUMNS 排列
+        """
+        raise NotImplementedError
+
+    def read_indicators(self, stock_ids, start_date, end_date) -> list:
+        """讀取指標 tuple 列（依 stock_id、trade_date 排序）"""
+        raise NotImplementedError
+
+    def get_indicator_states(self, stock_ids=None) -> dict:
+        """指標計算狀態 {stock_id: {"params_hash", "last_date", "row_count", "state"}}"""
+        raise NotImplementedError
+
+
+# ---------------------
+# MySQL
+# ---------------------
+MYSQL_TRADE_DATES_QUERY = "SELECT trade_date FROM stock_price_daily WHERE stock_id = %s AND trade_date BETWEEN %s AND %s"
+MYSQL_COVERAGE_QUERY = "SELECT first_date, last_date, row_count, updated_at FROM stock_price_coverage WHERE stock_id = %s"
+
+class MySQLStorage(StorageBackend):
+    """
+    MySQL 後端（經由 db_connection 連線池）
+
+    參數：
+        NA
+    """
+    name = "mysql"
+    # 價格於 SQL 轉為 DOUBLE（避免 Decimal 物件），成交量以 0 補空值
+    price_select = ", ".join(
+        ["stock_id", "trade_date"] + [f"CAST({col} AS DOUBLE)" for col in PRICE_FIELDS] + ["COALESCE(volume, 0)"]
+    )
+
+    def connect(self):
+        """以 with 語法借出連線（離開區塊時歸還連線池），無法取得連線時丟出 mysql.connector.Error"""
+        return pooled_connection()
+
+    def query(self, sql: str, params=(), dictionary: bool = False, fetch: str = "all"):
+        """執行查詢並回傳 fetchall / fetchone 結果"""
+        with self.connect() as conn:
+            cursor = conn.cursor(dictionary=dictionary)
+            try:
+                cursor.execute(sql, tuple(params))
+                return cursor.fetchone() if fetch == "one" else cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def transaction(self, work):
+        """於單一交易中執行 work(cursor, conn)，失敗時回滾並丟出例外"""
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            try:
+                result = work(cursor, conn)
+                conn.commit()
+                return result
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def lock_coverage(self, cursor, data):
+        """
+        鎖定批次內各股票的覆蓋範圍列（SELECT ... FOR UPDATE，不存在時先建立 row_count 為 0 的列並取得鎖），
+        同一股票的並行寫入者因此依序進入，record_coverage 讀取既有筆數再遞增時不會重複或遺漏計數。
+        須在交易中第一個一般 SELECT 之前呼叫，之後的讀取才看得到前一個寫入者已提交的資料
+        """
+        summary = summarize_batch(data)
+        stock_ids = sorted(summary)
+        locked = set()
+        for i in range(0, len(stock_ids), EXISTING_KEYS_CHUNK):
+            chunk = stock_ids[i:i + EXISTING_KEYS_CHUNK]
+            cursor.execute(
+                f"""
+                SELECT stock_id FROM stock_price_coverage
+                WHERE stock_id IN ({", ".join(["%s"] * len(chunk))})
+                ORDER BY stock_id
+                FOR UPDATE
+                """,
+                chunk,
+            )
+            locked.update(row[0] for row in cursor.fetchall())
+        missing = [(sid, min(summary[sid]), max(summary[sid])) for sid in stock_ids if sid not in locked]
+        if missing:
+            # 其他寫入者同時建立同一列時，ON DUPLICATE KEY UPDATE 會等待對方提交後再鎖定該列
+            cursor.executemany(
+                """
+                INSERT INTO stock_price_coverage (stock_id, first_date, last_date, row_count, updated_at)
+                VALUES (%s, %s, %s, 0, NOW())
+                ON DUPLICATE KEY UPDATE updated_at = NOW()
+                """,
+                missing,
+            )
+
+    def record_coverage(self, cursor, data):
+        """於寫入股價的同一交易內遞增更新覆蓋範圍（須先以 lock_coverage 鎖定，並在 upsert 之前呼叫，以區分新增與覆蓋的筆數）"""
+        summary = summarize_batch(data)
+        keys = [(stock_id, day) for stock_id, days in summary.items() for day in days]
+        existing = {}
+        for i in range(0, len(keys), EXISTING_KEYS_CHUNK):
+            chunk = keys[i:i + EXISTING_KEYS_CHUNK]
+            cursor.execute(
+                f"""
+                SELECT stock_id, COUNT(*) FROM stock_price_daily
+                WHERE (stock_id, trade_date) IN ({", ".join(["(%s, %s)"] * len(chunk))})
+                GROUP BY stock_id
+                """,
+                [value for key in chunk for value in key],
+            )
+            for stock_id, count in cursor.fetchall():
+                existing[stock_id] = existing.get(stock_id, 0) + count
+        cursor.executemany(
+            """
+            INSERT INTO stock_price_coverage (stock_id, first_date, last_date, row_count, updated_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                first_date = LEAST(first_date, VALUES(first_date)),
+                last_date = GREATEST(last_date, VALUES(last_date)),
+                row_count = row_count + VALUES(row_count),
+                updated_at = NOW()
+            """,
+            coverage_increments(summary, existing),
+        )
+
+    def upsert_prices(self, rows):
+        def work(cursor, conn):
+            self.lock_coverage(cursor, rows)
+            self.record_coverage(cursor, rows)
+            cursor.executemany(build_upsert_query(named=False), rows)
+        self.transaction(work)
+
+    def bulk_upsert_prices(self, rows, chunk_size: int, method: str) -> int:
+        if method == "infile":
+            return self.transaction(lambda cursor, conn: self.load_price_infile(cursor, rows, chunk_size))
+        return self.transaction(lambda cursor, conn: self.load_price_values(cursor, rows, chunk_size))
+
+    def load_price_values(self, cursor, data, chunk_size: int) -> int:
+        """以多列 VALUES upsert 分批寫入，全部批次於同一交易提交（失敗時整批回滾，不留下部分寫入的資料）"""
+        full_query = build_upsert_query(named=False, rows=chunk_size)
+        self.lock_coverage(cursor, data)
+        chunks = 0
+        for i in range(0, len(data), chunk_size):
+            chunk = data[i:i + chunk_size]
+            query = full_query if len(chunk) == chunk_size else build_upsert_query(named=False, rows=len(chunk))
+            self.record_coverage(cursor, chunk)
+            cursor.execute(query, [value for row in chunk for value in row])
+            chunks += 1
+        return chunks
+
+    def load_price_infile(self, cursor, data, chunk_size: int) -> int:
+        """以 LOAD DATA LOCAL INFILE 載入連線專屬的暫存表，再合併至 stock_price_daily"""
+        columns = ", ".join(PRICE_COLUMNS)
+        self.lock_coverage(cursor, data)
+        # 分區表無法以 LIKE 建立暫存表，改以 CREATE ... SELECT 複製欄位定義
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} SELECT {columns} FROM stock_price_daily WHERE 1 = 0")
+        cursor.execute(f"TRUNCATE TABLE {STAGING_TABLE}")
+
+        chunks = 0
+        for i in range(0, len(data), chunk_size):
+            fd, path = tempfile.mkstemp(prefix="stock_price_", suffix=".tsv")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                    f.writelines("\t".join(format_infile_value(v) for v in row) + "\n" for row in data[i:i + chunk_size])
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {STAGING_TABLE} "
+                    f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({columns})",
+                    (path,),
+                )
+            finally:
+                os.remove(path)
+            chunks += 1
+
+        self.record_coverage(cursor, data)
+        cursor.execute(f"""
+            INSERT INTO stock_price_daily ({columns})
+            SELECT {columns} FROM {STAGING_TABLE}
+            ON DUPLICATE KEY UPDATE
+                {build_update_clause()}
+        """)
+        cursor.execute(f"TRUNCATE TABLE {STAGING_TABLE}")
+        return chunks
+
+    def price_query(self, stock_ids, start_date=None, end_date=None, intervals=None):
+        """股價區間讀取語法與參數（schema.explain_queries 亦以此檢查執行計畫）"""
+        where, params = build_price_filter("%s", stock_ids, start_date, end_date, intervals)
+        return f"SELECT {self.price_select} FROM stock_price_daily WHERE {where} ORDER BY stock_id, trade_date", params
+
+    def read_prices(self, stock_ids, start_date=None, end_date=None, intervals=None) -> list:
+        return self.query(*self.price_query(stock_ids, start_date, end_date, intervals))
+
+    def read_trade_dates(self, stock_id, start_date, end_date) -> list:
+        rows = self.query(MYSQL_TRADE_DATES_QUERY, (stock_id, start_date, end_date))
+        return [row[0] for row in rows]
+
+    def get_coverage(self, stock_id):
+        return self.query(MYSQL_COVERAGE_QUERY, (stock_id,), dictionary=True, fetch="one")
+
+    def get_all_last_dates(self) -> dict:
+        return dict(self.query("SELECT stock_id, last_date FROM stock_price_coverage"))
+
+    def rebuild_coverage(self, stock_ids=None) -> int:
+        where, params = "", ()
+        if stock_ids:
+            where = f"WHERE stock_id IN ({', '.join(['%s'] * len(stock_ids))})"
+            params = tuple(stock_ids)
+
+        def work(cursor, conn):
+            cursor.execute(f"DELETE FROM stock_price_coverage {where}", params)
+            cursor.execute(
+                f"""
+                INSERT INTO stock_price_coverage (stock_id, first_date, last_date, row_count, updated_at)
+                SELECT stock_id, MIN(trade_date), MAX(trade_date), COUNT(*), NOW()
+                FROM stock_price_daily {where}
+                GROUP BY stock_id
+                """,
+                params,
+            )
+            return cursor.rowcount
+        return self.transaction(work)
+
+    def load_stock_ids(self) -> set:
+        return {row[0] for row in self.query("SELECT stock_id FROM stock_info")}
+
+    def upsert_stock_info(self, rows, overwrite: bool = True):
+        if overwrite:
+            updates = ", ".join(f"{col} = VALUES({col})" for col in STOCK_INFO_COLUMNS[1:])
+        else:
+            updates = "stock_id = stock_id"
+        query = f"""
+            INSERT INTO stock_info ({", ".join(STOCK_INFO_COLUMNS)})
+            VALUES ({", ".join(["%s"] * len(STOCK_INFO_COLUMNS))})
+            ON DUPLICATE KEY UPDATE {updates}
+        """
+        self.transaction(lambda cursor, conn: cursor.executemany(query, rows))
+
+    def list_stocks(self) -> list:
+        return self.query("SELECT stock_id, stock_name FROM stock_info", dictionary=True)
+
+    def get_all_coverage(self) -> dict:
+        rows = self.query("SELECT stock_id, first_date, last_date, row_count FROM stock_price_coverage")
+        return {row[0]: {"first_date": row[1], "last_date": row[2], "row_count": row[3]} for row in rows}
+
+    def get_empty_intervals(self, stock_id) -> list:
+        rows = self.query("SELECT start_date, end_date FROM stock_price_empty_interval WHERE stock_id = %s", (stock_id,))
+        return [(row[0], row[1]) for row in rows]
+
+    def add_empty_interval(self, stock_id, start_date, end_date):
+        query = """
+            INSERT INTO stock_price_empty_interval (stock_id, start_date, end_date, checked_at)
+            VALUES (%s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE checked_at = NOW()
+        """
+        self.transaction(lambda cursor, conn: cursor.execute(query, (stock_id, start_date, end_date)))
+
+    def write_indicators(self, rows, states, reset_ids=()):
+        columns = ("stock_id", "trade_date") + INDICATOR_COLUMNS
+        indicator_query = f"""
+            INSERT INTO stock_indicator_daily ({", ".join(columns)})
+            VALUES ({", ".join(["%s"] * len(columns))})
+            ON DUPLICATE KEY UPDATE {", ".join(f"{col} = VALUES({col})" for col in INDICATOR_COLUMNS)}
+        """
+        state_query = f"""
+            INSERT INTO stock_indicator_state ({", ".join(INDICATOR_STATE_COLUMNS)}, updated_at)
+            VALUES ({", ".join(["%s"] * len(INDICATOR_STATE_COLUMNS))}, NOW())
+            ON DUPLICATE KEY UPDATE {", ".join(f"{col} = VALUES({col})" for col in INDICATOR_STATE_COLUMNS[1:])}, updated_at = NOW()
+        """
+
+        def work(cursor, conn):
+            if reset_ids:
+                cursor.execute(
+                    f"DELETE FROM stock_indicator_daily WHERE stock_id IN ({', '.join(['%s'] * len(reset_ids))})",
+                    tuple(reset_ids),
+                )
+            if rows:
+                cursor.executemany(indicator_query, rows)
+            if states:
+                cursor.executemany(state_query, states)
+        self.transaction(work)
+
+    def read_indicators(self, stock_ids, start_date, end_date) -> list:
+        where, params = build_price_filter("%s", stock_ids, start_date, end_date)
+        return self.query(
+            f"SELECT stock_id, trade_date, {', '.join(INDICATOR_COLUMNS)} FROM stock_indicator_daily "
+            f"WHERE {where} ORDER BY stock_id, trade_date",
+            params,
+        )
+
+    def get_indicator_states(self, stock_ids=None) -> dict:
+        sql, params = f"SELECT {', '.join(INDICATOR_STATE_COLUMNS)} FROM stock_indicator_state", ()
+        if stock_ids:
+            sql += f" WHERE stock_id IN ({', '.join(['%s'] * len(stock_ids))})"
+            params = tuple(stock_ids)
+        return {row["stock_id"]: row for row in self.query(sql, params, dictionary=True)}
+
+
+# ---------------------
+# SQLite
+# ---------------------
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_info (
+    stock_id TEXT PRIMARY KEY,
+    stock_name TEXT,
+    industry TEXT,
+    market_type TEXT,
+    listing_date TEXT
+);
+CREATE TABLE IF NOT EXISTS stock_price_daily (
+    stock_id TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    open_price REAL,
+    high_price REAL,
+    low_price REAL,
+    close_price REAL,
+    volume INTEGER,
+    PRIMARY KEY (stock_id, trade_date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stock_price_coverage (
+    stock_id TEXT PRIMARY KEY,
+    first_date TEXT,
+    last_date TEXT,
+    row_count INTEGER,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS stock_price_empty_interval (
+    stock_id TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    checked_at TEXT,
+    PRIMARY KEY (stock_id, start_date, end_date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stock_indicator_daily (
+    stock_id TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    ma_5 REAL, ma_20 REAL, rsi REAL, macd REAL, macd_signal REAL,
+    bb_middle REAL, bb_upper REAL, bb_lower REAL, volume_ma5 REAL,
+    PRIMARY KEY (stock_id, trade_date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stock_indicator_state (
+    stock_id TEXT PRIMARY KEY,
+    params_hash TEXT,
+    last_date TEXT,
+    row_count INTEGER,
+    state TEXT,
+    updated_at TEXT
+);
+"""
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    SQLite 內嵌後端：每個執行緒各自一條連線（WAL 模式可同時讀取），寫入以鎖序列化
+
+    參數：
+        path (str): 資料庫檔案路徑（":memory:" 為記憶體資料庫，僅限單執行緒）
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._memory = None
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connect().executescript(SQLITE_SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        """取得目前執行緒的連線"""
+        if self.path == ":memory:":
+            if self._memory is None:
+                self._memory = sqlite3.connect(self.path, check_same_thread=False)
+            return self._memory
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def write(self, work):
+        """於單一交易中執行 work(conn)，失敗時回滾並丟出例外"""
+        with self._write_lock:
+            conn = self.connect()
+            try:
+                result = work(conn)
+                conn.commit()
+                return result
+            except Exception:
+                conn.rollback()
+                raise
+
+    def record_coverage(self, conn, data):
+        """於寫入股價的同一交易內遞增更新覆蓋範圍（須在 upsert 之前呼叫）"""
+        summary = summarize_batch(data)
+        keys = [(stock_id, day) for stock_id, days in summary.items() for day in days]
+        existing = {}
+        for i in range(0, len(keys), EXISTING_KEYS_CHUNK):
+            chunk = keys[i:i + EXISTING_KEYS_CHUNK]
+            cursor = conn.execute(
+                f"""
+                SELECT stock_id, COUNT(*) FROM stock_price_daily
+                WHERE (stock_id, trade_date) IN (VALUES {", ".join(["(?, ?)"] * len(chunk))})
+                GROUP BY stock_id
+                """,
+                [value for key in chunk for value in key],
+            )
+            for stock_id, count in cursor.fetchall():
+                existing[stock_id] = existing.get(stock_id, 0) + count
+        now = datetime.now().isoformat(sep=" ", timespec="seconds")
+        conn.executemany(
+            """
+            INSERT INTO stock_price_coverage (stock_id, first_date, last_date, row_count, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(stock_id) DO UPDATE SET
+                first_date = min(first_date, excluded.first_date),
+                last_date = max(last_date, excluded.last_date),
+                row_count = row_count + excluded.row_count,
+                updated_at = excluded.updated_at
+            """,
+            [row + (now,) for row in coverage_increments(summary, existing)],
+        )
+
+    def upsert_prices(self, rows):
+        rows = [(row[0], str(row[1])[:10]) + tuple(row[2:]) for row in rows]
+        updates = ", ".join(f"{col} = excluded.{col}" for col in PRICE_COLUMNS[2:])
+        query = f"""
+            INSERT INTO stock_price_daily ({", ".join(PRICE_COLUMNS)})
+            VALUES ({", ".join(["?"] * len(PRICE_COLUMNS))})
+            ON CONFLICT(stock_id, trade_date) DO UPDATE SET {updates}
+        """
+
+        def work(conn):
+            self.record_coverage(conn, rows)
+            conn.executemany(query, rows)
+        self.write(work)
+
+    def bulk_upsert_prices(self, rows, chunk_size: int, method: str) -> int:
+        # 同程序內寫入沒有網路往返，整批於單一交易完成
+        self.upsert_prices(rows)
+        return 1
+
+    def read_prices(self, stock_ids, start_date=None, end_date=None, intervals=None) -> list:
+        start_date = str(start_date)[:10] if start_date else None
+        end_date = str(end_date)[:10] if end_date else None
+        intervals = [(str(a)[:10], str(b)[:10]) for a, b in intervals] if intervals else None
+        where, params = build_price_filter("?", stock_ids, start_date, end_date, intervals)
+        columns = ", ".join(["stock_id", "trade_date", *PRICE_FIELDS, "COALESCE(volume, 0)"])
+        return self.connect().execute(
+            f"SELECT {columns} FROM stock_price_daily WHERE {where} ORDER BY stock_id, trade_date", params
+        ).fetchall()
+
+    def read_trade_dates(self, stock_id, start_date, end_date) -> list:
+        rows = self.connect().execute(
+            "SELECT trade_date FROM stock_price_daily WHERE stock_id = ? AND trade_date BETWEEN ? AND ?",
+            (stock_id, str(start_date)[:10], str(end_date)[:10]),
+        ).fetchall()
+        return [date.fromisoformat(row[0]) for row in rows]
+
+    def get_coverage(self, stock_id):
+        row = self.connect().execute(
+            "SELECT first_date, last_date, row_count, updated_at FROM stock_price_coverage WHERE stock_id = ?",
+            (stock_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "first_date": date.fromisoformat(row[0]),
+            "last_date": date.fromisoformat(row[1]),
+            "row_count": row[2],
+            "updated_at": datetime.fromisoformat(row[3]),
+        }
+
+    def get_all_last_dates(self) -> dict:
+        rows = self.connect().execute("SELECT stock_id, last_date FROM stock_price_coverage").fetchall()
+        return {stock_id: date.fromisoformat(last_date) for stock_id, last_date in rows}
+
+    def rebuild_coverage(self, stock_ids=None) -> int:
+        where, params = "", ()
+        if stock_ids:
+            where = f"WHERE stock_id IN ({', '.join(['?'] * len(stock_ids))})"
+            params = tuple(stock_ids)
+
+        def work(conn):
+            conn.execute(f"DELETE FROM stock_price_coverage {where}", params)
+            return conn.execute(
+                f"""
+                INSERT INTO stock_price_coverage (stock_id, first_date, last_date, row_count, updated_at)
+                SELECT stock_id, MIN(trade_date), MAX(trade_date), COUNT(*), datetime('now', 'localtime')
+                FROM stock_price_daily {where}
+                GROUP BY stock_id
+                """,
+                params,
+            ).rowcount
+        return self.write(work)
+
+    def load_stock_ids(self) -> set:
+        return {row[0] for row in self.connect().execute("SELECT stock_id FROM stock_info")}
+
+    def upsert_stock_info(self, rows, overwrite: bool = True):
+        if overwrite:
+            conflict = "DO UPDATE SET " + ", ".join(f"{col} = excluded.{col}" for col in STOCK_INFO_COLUMNS[1:])
+        else:
+            conflict = "DO NOTHING"
+        rows = [tuple(str(v) if isinstance(v, date) else v for v in row) for row in rows]
+        query = f"""
+            INSERT INTO stock_info ({", ".join(STOCK_INFO_COLUMNS)})
+            VALUES ({", ".join(["?"] * len(STOCK_INFO_COLUMNS))})
+            ON CONFLICT(stock_id) {conflict}
+        """
+        self.write(lambda conn: conn.executemany(query, rows))
+
+    def list_stocks(self) -> list:
+        rows = self.connect().execute("SELECT stock_id, stock_name FROM stock_info").fetchall()
+        return [{"stock_id": stock_id, "stock_name": stock_name} for stock_id, stock_name in rows]
+
+    def get_all_coverage(self) -> dict:
+        rows = self.connect().execute("SELECT stock_id, first_date, last_date, row_count FROM stock_price_coverage").fetchall()
+        return {
+            stock_id: {"first_date": date.fromisoformat(first), "last_date": date.fromisoformat(last), "row_count": count}
+            for stock_id, first, last, count in rows
+        }
+
+    def get_empty_intervals(self, stock_id) -> list:
+        rows = self.connect().execute(
+            "SELECT start_date, end_date FROM stock_price_empty_interval WHERE stock_id = ?", (stock_id,)
+        ).fetchall()
+        return [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in rows]
+
+    def add_empty_interval(self, stock_id, start_date, end_date):
+        self.write(lambda conn: conn.execute(
+            """
+            INSERT INTO stock_price_empty_interval (stock_id, start_date, end_date, checked_at)
+            VALUES (?, ?, ?, datetime('now', 'localtime'))
+            ON CONFLICT(stock_id, start_date, end_date) DO UPDATE SET checked_at = excluded.checked_at
+            """,
+            (stock_id, str(start_date)[:10], str(end_date)[:10]),
+        ))
+
+    def write_indicators(self, rows, states, reset_ids=()):
+        columns = ("stock_id", "trade_date") + INDICATOR_COLUMNS
+        rows = [(row[0], str(row[1])[:10]) + tuple(row[2:]) for row in rows]
+        states = [(row[0], row[1], str(row[2])[:10]) + tuple(row[3:]) for row in states]
+        indicator_query = f"""
+            INSERT INTO stock_indicator_daily ({", ".join(columns)})
+            VALUES ({", ".join(["?"] * len(columns))})
+            ON CONFLICT(stock_id, trade_date) DO UPDATE SET {", ".join(f"{col} = excluded.{col}" for col in INDICATOR_COLUMNS)}
+        """
+        state_query = f"""
+            INSERT INTO stock_indicator_state ({", ".join(INDICATOR_STATE_COLUMNS)}, updated_at)
+            VALUES ({", ".join(["?"] * len(INDICATOR_STATE_COLUMNS))}, datetime('now', 'localtime'))
+            ON CONFLICT(stock_id) DO UPDATE SET
+                {", ".join(f"{col} = excluded.{col}" for col in INDICATOR_STATE_COLUMNS[1:])}, updated_at = excluded.updated_at
+        """
+
+        def work(conn):
+            if reset_ids:
+                conn.execute(
+                    f"DELETE FROM stock_indicator_daily WHERE stock_id IN ({', '.join(['?'] * len(reset_ids))})",
+                    tuple(reset_ids),
+                )
+            conn.executemany(indicator_query, rows)
+            conn.executemany(state_query, states)
+        self.write(work)
+
+    def read_indicators(self, stock_ids, start_date, end_date) -> list:
+        where, params = build_price_filter("?", stock_ids, str(start_date)[:10], str(end_date)[:10])
+        return self.connect().execute(
+            f"SELECT stock_id, trade_date, {', '.join(INDICATOR_COLUMNS)} FROM stock_indicator_daily "
+            f"WHERE {where} ORDER BY stock_id, trade_date",
+            params,
+        ).fetchall()
+
+    def get_indicator_states(self, stock_ids=None) -> dict:
+        sql, params = f"SELECT {', '.join(INDICATOR_STATE_COLUMNS)} FROM stock_indicator_state", ()
+        if stock_ids:
+            sql += f" WHERE stock_id IN ({', '.join(['?'] * len(stock_ids))})"
+            params = tuple(stock_ids)
+        states = {}
+        for row in self.connect().execute(sql, params).fetchall():
+            state = dict(zip(INDICATOR_STATE_COLUMNS, row))
+            state["last_date"] = date.fromisoformat(state["last_date"])
+            states[state["stock_id"]] = state
+        return states
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> StorageBackend:
+    """
+    取得程序共用的儲存後端（依 STORAGE_BACKEND 建立）
+
+    參數：
+        NA
+
+    返回：
+        storage (StorageBackend)
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = SQLiteStorage(SQLITE_PATH) if STORAGE_BACKEND == "sqlite" else MySQLStorage()
+            logger.info(f"使用儲存後端：{_storage.name}")
+        return _storage
+
+def set_storage(storage: StorageBackend):
+    """
+    指定儲存後端（例如測試時改用暫存 SQLite 檔）
+
+    參數：
+        storage (StorageBackend)
+
+    返回：
+        NA
+    """
+    global _storage
+    with _storage_lock:
+        _storage = storage
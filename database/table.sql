@@ -10,15 +10,85 @@ CREATE TABLE IF NOT EXISTS stock_info (
     listing_date DATE
 );
 
+-- 與 database/schema.py 的最新版本相同（建議改執行 python -m database.schema 建表與遷移；
+-- 各版本遷移皆會先檢查現況，以本檔建立的資料庫執行 migrate 只會補上版本紀錄）
+-- 叢集主鍵 (stock_id, trade_date)、年度分區；分區表不支援外鍵，股票是否存在由程式確保
 CREATE TABLE IF NOT EXISTS stock_price_daily (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    stock_id VARCHAR(10),
-    trade_date DATE,
-    open_price DECIMAL(10,2),
-    high_price DECIMAL(10,2),
-    low_price DECIMAL(10,2),
-    close_price DECIMAL(10,2),
-    volume BIGINT,
-    UNIQUE KEY uniq_stock_date (stock_id, trade_date),
-    FOREIGN KEY (stock_id) REFERENCES stock_info(stock_id)
+    stock_id VARCHAR(10) CHARACTER SET ascii NOT NULL,
+    trade_date DATE NOT NULL,
+    open_price DECIMAL(8,2),
+    high_price DECIMAL(8,2),
+    low_price DECIMAL(8,2),
+    close_price DECIMAL(8,2),
+    volume BIGINT UNSIGNED,
+    PRIMARY KEY (stock_id, trade_date),
+    KEY idx_trade_date (trade_date)
+) ENGINE=InnoDB
+PARTITION BY RANGE COLUMNS (trade_date) (
+    PARTITION p_before VALUES LESS THAN ('2000-01-01'),
+    PARTITION p2000 VALUES LESS THAN ('2001-01-01'),
+    PARTITION p2001 VALUES LESS THAN ('2002-01-01'),
+    PARTITION p2002 VALUES LESS THAN ('2003-01-01'),
+    PARTITION p2003 VALUES LESS THAN ('2004-01-01'),
+    PARTITION p2004 VALUES LESS THAN ('2005-01-01'),
+    PARTITION p2005 VALUES LESS THAN ('2006-01-01'),
+    PARTITION p2006 VALUES LESS THAN ('2007-01-01'),
+    PARTITION p2007 VALUES LESS THAN ('2008-01-01'),
+    PARTITION p2008 VALUES LESS THAN ('2009-01-01'),
+    PARTITION p2009 VALUES LESS THAN ('2010-01-01'),
+    PARTITION p2010 VALUES LESS THAN ('2011-01-01'),
+    PARTITION p2011 VALUES LESS THAN ('2012-01-01'),
+    PARTITION p2012 VALUES LESS THAN ('2013-01-01'),
+    PARTITION p2013 VALUES LESS THAN ('2014-01-01'),
+    PARTITION p2014 VALUES LESS THAN ('2015-01-01'),
+    PARTITION p2015 VALUES LESS THAN ('2016-01-01'),
+    PARTITION p2016 VALUES LESS THAN ('2017-01-01'),
+    PARTITION p2017 VALUES LESS THAN ('2018-01-01'),
+    PARTITION p2018 VALUES LESS THAN ('2019-01-01'),
+    PARTITION p2019 VALUES LESS THAN ('2020-01-01'),
+    PARTITION p2020 VALUES LESS THAN ('2021-01-01'),
+    PARTITION p2021 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
 );
+
+-- 每檔股票的資料覆蓋範圍（寫入 stock_price_daily 時同步更新，建表後執行 python -m database.coverage 初始化）
+CREATE TABLE IF NOT EXISTS stock_price_coverage (
+    stock_id VARCHAR(10) PRIMARY KEY,
+    first_date DATE,
+    last_date DATE,
+    row_count INT,
+    updated_at DATETIME,
+    KEY idx_last_date (last_date)
+);
+
+-- 已確認 Yahoo 無資料的區間（停牌、尚未上市），補抓缺口時略過（data_collector/data_updater）
+CREATE TABLE IF NOT EXISTS stock_price_empty_interval (
+    stock_id VARCHAR(10) CHARACTER SET ascii NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    checked_at DATETIME,
+    PRIMARY KEY (stock_id, start_date, end_date)
+) ENGINE=InnoDB;
+
+-- 預先計算的技術指標與增量計算狀態（analytics/indicator_store，python main.py indicators 更新）
+CREATE TABLE IF NOT EXISTS stock_indicator_daily (
+    stock_id VARCHAR(10) CHARACTER SET ascii NOT NULL,
+    trade_date DATE NOT NULL,
+    ma_5 DOUBLE, ma_20 DOUBLE, rsi DOUBLE, macd DOUBLE, macd_signal DOUBLE,
+    bb_middle DOUBLE, bb_upper DOUBLE, bb_lower DOUBLE, volume_ma5 DOUBLE,
+    PRIMARY KEY (stock_id, trade_date)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS stock_indicator_state (
+    stock_id VARCHAR(10) CHARACTER SET ascii PRIMARY KEY,
+    params_hash CHAR(16),
+    last_date DATE,
+    row_count INT,
+    state TEXT,
+    updated_at DATETIME
+) ENGINE=InnoDB;
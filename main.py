@@ -36,8 +36,15 @@ def main():
     elif cmd == "daily":
         t = sys.argv[2].lower() if len(sys.argv) > 2 else "09:30"
         daily_task(t)
+
+    elif cmd == "sync":
+        sync_stock_list()
+
+    elif cmd == "indicators":
+        rebuild = len(sys.argv) > 2 and sys.argv[2].lower() == "rebuild"
+        update_indicators(rebuild)
     else:
-        print("未知參數，請使用 fetch 或 dashboard")
+        print("未知參數，請使用 fetch、dashboard、daily、sync 或 indicators")
         
 # ---------------------
 # 啟動 Dashboard
@@ -71,6 +78,43 @@ def daily_task(t: str):
     run_scheduler(t)
     
 
+# ---------------------
+# 同步股票清單
+# ---------------------
+def sync_stock_list():
+    """
+    重新爬取台股清單並整批同步至 stock_info
+    
+    參數：
+        NA
+    
+    返回：
+        NA
+    """
+    from data_collector.twse_crawler import fetch_twse_stock_list
+    from database.stock_info_manager import sync_stock_info
+
+    df = fetch_twse_stock_list()
+    if df is not None:
+        sync_stock_info(df)
+
+# ---------------------
+# 預先計算技術指標
+# ---------------------
+def update_indicators(rebuild: bool = False):
+    """
+    更新 stock_indicator_daily（只計算新交易日；rebuild 時全部重算）
+    
+    參數：
+        rebuild (bool): 是否全部重算
+    
+    返回：
+        NA
+    """
+    from analytics.indicator_store import refresh_indicators
+
+    refresh_indicators(rebuild=rebuild)
+
 # ---------------------
 # 主程式
 # ---------------------
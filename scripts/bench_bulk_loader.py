@@ -0,0 +1,93 @@
+"""
+scripts/bench_bulk_loader.py
+比較 stock_price_daily 寫入方式的吞吐量（筆/秒）：
+1. executemany : insert_stock_price 原本的逐筆參數 upsert
+2. values      : bulk_insert_stock_price 多列 VALUES
+3. infile      : bulk_insert_stock_price LOAD DATA LOCAL INFILE + 合併（需開啟 local_infile）
+
+以合成資料寫入 BENCH 開頭的股票代碼，每種方式都從空表開始寫入，結束後刪除（--keep 保留）。需連線至 MySQL。
+
+執行: python scripts/bench_bulk_loader.py --rows 100000 --chunk-size 5000 [--methods executemany,values,infile]
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import date, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from database.db_connection import get_connection, close_connection
+from database.data_loader import bulk_insert_stock_price, ensure_price_stocks
+from database.storage import build_upsert_query
+
+BENCH_PREFIX = "BENCH"
+
+def make_rows(total, stocks=20):
+    """產生合成股價資料（tuple 格式，依 PRICE_COLUMNS 排列）"""
+    per_stock = total // stocks
+    start = date(2000, 1, 3)
+    rows = []
+    for s in range(stocks):
+        stock_id = f"{BENCH_PREFIX}{s:02d}"
+        for d in range(per_stock):
+            price = 100 + (d % 50)
+            rows.append((stock_id, (start + timedelta(days=d)).isoformat(), price, price + 1, price - 1, price + 0.5, 1000 + d))
+    return rows
+
+def run_executemany(rows, chunk_size):
+    """原本的 executemany 寫入"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    query = build_upsert_query(named=False)
+    for i in range(0, len(rows), chunk_size):
+        cursor.executemany(query, rows[i:i + chunk_size])
+        conn.commit()
+    cursor.close()
+    close_connection(conn)
+
+def cleanup(prices_only=False):
+    """刪除測試資料（prices_only 時保留 stock_info，讓每種方式都從空表開始寫入）"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM stock_price_daily WHERE stock_id LIKE %s", (f"{BENCH_PREFIX}%",))
+    cursor.execute("DELETE FROM stock_price_coverage WHERE stock_id LIKE %s", (f"{BENCH_PREFIX}%",))
+    if not prices_only:
+        cursor.execute("DELETE FROM stock_info WHERE stock_id LIKE %s", (f"{BENCH_PREFIX}%",))
+    conn.commit()
+    cursor.close()
+    close_connection(conn)
+
+def main():
+    parser = argparse.ArgumentParser(description="stock_price_daily 寫入吞吐量比較")
+    parser.add_argument("--rows", type=int, default=100000, help="寫入筆數 (預設: 100000)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="每批筆數 (預設: 5000)")
+    parser.add_argument("--methods", default="executemany,values", help="比較方式，逗號分隔 (executemany,values,infile)")
+    parser.add_argument("--keep", action="store_true", help="保留測試資料")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    ensure_price_stocks(dict.fromkeys(row[0] for row in rows))
+
+    results = []
+    for method in args.methods.split(","):
+        cleanup(prices_only=True)
+        t0 = time.perf_counter()
+        if method == "executemany":
+            run_executemany(rows, args.chunk_size)
+        else:
+            bulk_insert_stock_price(rows, chunk_size=args.chunk_size, method=method)
+        elapsed = time.perf_counter() - t0
+        results.append((method, elapsed, len(rows) / elapsed))
+
+    print(f"\n{'方式':<14}{'筆數':>10}{'秒':>10}{'筆/秒':>14}")
+    for method, elapsed, rate in results:
+        print(f"{method:<14}{len(rows):>10}{elapsed:>10.2f}{rate:>14,.0f}")
+
+    if not args.keep:
+        cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+scripts/bench_tpex_fetcher.py
+比較 TPEx 熱門股抓取方式的延遲與記憶體用量：
+1. http     : fetch_hot_stocks_tpex（直接請求 JSON，單次解析）
+2. selenium : fetch_hot_stocks_tpex_selenium（舊版無頭瀏覽器，需 pip install -r requirements-dev.txt）
+3. --offline: 僅以 tests/fixtures 錄製的回應測量解析成本（不需網路）
+
+記憶體：Python 端以 tracemalloc 量測峰值；瀏覽器等子行程以 ru_maxrss 量測（僅限 Linux/macOS）。
+
+執行: python scripts/bench_tpex_fetcher.py --repeat 3 [--offline] [--skip-selenium]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from data_collector.hot_stock_fetcher import (
+    fetch_hot_stocks_tpex,
+    fetch_hot_stocks_tpex_selenium,
+    parse_tpex_hot_stocks,
+)
+
+FIXTURE_PATH = os.path.join(PROJECT_ROOT, "tests", "fixtures", "tpex_daily_quotes_20240102.json")
+
+def child_maxrss_mb():
+    """子行程最大常駐記憶體 (MB)，不支援的平台回傳 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def measure(name, func, repeat):
+    """執行 func repeat 次，回傳平均延遲與 Python 記憶體峰值"""
+    timings, peaks, rows = [], [], 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        df = func()
+        timings.append(time.perf_counter() - t0)
+        peaks.append(tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+        tracemalloc.stop()
+        rows = len(df)
+    return {
+        "name": name,
+        "rows": rows,
+        "avg_sec": sum(timings) / len(timings),
+        "min_sec": min(timings),
+        "py_peak_mb": max(peaks),
+        "child_maxrss_mb": child_maxrss_mb(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="TPEx 熱門股抓取效能比較")
+    parser.add_argument("--repeat", type=int, default=3, help="每種方式執行次數 (預設: 3)")
+    parser.add_argument("--limit", type=int, default=20, help="取前 N 筆 (預設: 20)")
+    parser.add_argument("--offline", action="store_true", help="僅以錄製的回應量測解析成本")
+    parser.add_argument("--skip-selenium", action="store_true", help="略過舊版 Selenium 量測")
+    args = parser.parse_args()
+
+    results = []
+    if args.offline:
+        with open(FIXTURE_PATH, encoding="utf-8") as f:
+            payload = json.load(f)
+        results.append(measure("parse (fixture)", lambda: parse_tpex_hot_stocks(payload, args.limit), args.repeat))
+    else:
+        results.append(measure("http", lambda: fetch_hot_stocks_tpex(args.limit), args.repeat))
+        if not args.skip_selenium:
+            results.append(measure("selenium", lambda: fetch_hot_stocks_tpex_selenium(args.limit), args.repeat))
+
+    print(f"\n{'方式':<18}{'筆數':>6}{'平均秒':>10}{'最快秒':>10}{'Py峰值MB':>12}{'子行程MB':>12}")
+    for r in results:
+        child = f"{r['child_maxrss_mb']:.1f}" if r["child_maxrss_mb"] is not None else "-"
+        print(f"{r['name']:<18}{r['rows']:>6}{r['avg_sec']:>10.3f}{r['min_sec']:>10.3f}{r['py_peak_mb']:>12.2f}{child:>12}")
+
+if __name__ == "__main__":
+    main()
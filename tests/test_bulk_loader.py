@@ -0,0 +1,209 @@
+"""
+test_bulk_loader.py
+-------------------
+大量寫入測試：多列 VALUES 與 LOAD DATA INFILE 兩種方式的分批（含最後不足一批）、每次呼叫只提交一次、
+中途失敗時整批回滾、跨批次的覆蓋範圍筆數與覆蓋範圍列的鎖定順序，以及 bulk_insert_stock_price 的回報與 BULK_THRESHOLD 分流。
+以記憶體內的假 MySQL 連線執行，不需 MySQL。
+"""
+
+import contextlib
+import unittest
+from datetime import date
+from unittest import mock
+from database import storage, data_loader
+from database.storage import MySQLStorage, get_storage
+from database.data_loader import bulk_insert_stock_price, insert_stock_price
+
+def price_rows(stock_id, days):
+    """1 月份指定日期的股價 tuple"""
+    return [(stock_id, date(2024, 1, day), 1.0, 1.0, 1.0, float(day), 100) for day in days]
+
+class FakeMySQL:
+    """
+    記憶體內的假 MySQL：只模擬大量寫入用到的語法，
+    交易中的變更寫在工作副本，commit 時套用、rollback 時捨棄
+
+    參數：
+        fail_on (int): 第幾個 stock_price_daily 寫入語句丟出例外（None 為不失敗）
+    """
+
+    def __init__(self, fail_on=None):
+        self.prices, self.coverage = {}, {}
+        self.work_prices, self.work_coverage = {}, {}
+        self.staging = []
+        self.fail_on = fail_on
+        self.price_writes = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.result = []
+        self.statements = []
+        self.locked = []
+
+    # ---- 連線 ----
+    def cursor(self, dictionary=False):
+        self.work_prices, self.work_coverage = dict(self.prices), {k: dict(v) for k, v in self.coverage.items()}
+        return self
+
+    def commit(self):
+        self.prices, self.coverage = self.work_prices, self.work_coverage
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    # ---- 游標 ----
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        params = list(params)
+        self.statements.append(sql.split(" WHERE ")[0])
+        if sql.startswith("SELECT stock_id FROM stock_price_coverage") and sql.endswith("FOR UPDATE"):
+            self.locked.append(params)
+            self.result = [(stock_id,) for stock_id in params if stock_id in self.work_coverage]
+        elif sql.startswith("SELECT stock_id, COUNT(*) FROM stock_price_daily"):
+            keys = list(zip(params[::2], params[1::2]))
+            counts = {}
+            for stock_id, day in keys:
+                if (stock_id, str(day)) in self.work_prices:
+                    counts[stock_id] = counts.get(stock_id, 0) + 1
+            self.result = list(counts.items())
+        elif sql.startswith("INSERT INTO stock_price_daily") and "SELECT" in sql:
+            self.write_prices(self.staging)
+        elif sql.startswith("INSERT INTO stock_price_daily"):
+            self.write_prices([tuple(params[i:i + 7]) for i in range(0, len(params), 7)])
+        elif sql.startswith("LOAD DATA LOCAL INFILE"):
+            with open(params[0], encoding="utf-8") as f:
+                self.staging += [tuple(line.rstrip("\n").split("\t")) for line in f]
+        elif sql.startswith("TRUNCATE"):
+            self.staging = []
+
+    def executemany(self, sql, rows):
+        sql = " ".join(sql.split())
+        self.statements.append(sql.split(" VALUES ")[0])
+        if sql.startswith("INSERT INTO stock_price_daily"):
+            self.write_prices(rows)
+        elif sql.startswith("INSERT INTO stock_price_coverage"):
+            # lock_coverage 建立的列 row_count 為 0，record_coverage 才遞增
+            increment = "row_count + VALUES(row_count)" in sql
+            for stock_id, first, last, *count in rows:
+                count = count[0] if count else 0
+                current = self.work_coverage.get(stock_id)
+                if current is None:
+                    self.work_coverage[stock_id] = {"first_date": str(first), "last_date": str(last), "row_count": count}
+                elif increment:
+                    current.update(first_date=min(current["first_date"], str(first)),
+                                   last_date=max(current["last_date"], str(last)),
+                                   row_count=current["row_count"] + count)
+
+    def write_prices(self, rows):
+        self.price_writes += 1
+        if self.fail_on == self.price_writes:
+            raise OSError("connection lost")
+        for row in rows:
+            self.work_prices[(row[0], str(row[1]))] = row
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+    def row_count(self, stock_id):
+        return sum(1 for key in self.prices if key[0] == stock_id)
+
+class TestBulkLoad(unittest.TestCase):
+    """
+    MySQL 大量寫入測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.db = FakeMySQL()
+        storage.set_storage(MySQLStorage())
+        patches = [
+            mock.patch("database.storage.pooled_connection", side_effect=lambda: contextlib.nullcontext(self.db)),
+            mock.patch.object(data_loader, "ensure_price_stocks"),
+            mock.patch.object(data_loader, "invalidate_partitions"),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        storage.set_storage(None)
+
+    def test_values_chunks(self):
+        """10 筆每批 4 筆分 3 批（最後一批 2 筆），整次呼叫只提交一次"""
+        rows = price_rows("2330", range(2, 12))
+        report = bulk_insert_stock_price(rows, chunk_size=4, method="values")
+        self.assertEqual((report["rows"], report["chunks"], report["method"]), (10, 3, "values"))
+        self.assertEqual((self.db.commits, self.db.rollbacks, self.db.price_writes), (1, 0, 3))
+        self.assertEqual(self.db.row_count("2330"), 10)
+        self.assertEqual(self.db.coverage["2330"], {"first_date": "2024-01-02", "last_date": "2024-01-11", "row_count": 10})
+
+    def test_coverage_across_chunks(self):
+        """跨批次與跨呼叫的覆蓋筆數只計新增的交易日，與實際筆數一致"""
+        bulk_insert_stock_price(price_rows("2330", range(2, 7)) + price_rows("2317", [2, 3]), chunk_size=3, method="values")
+        # 與前次部分重疊，且同一股票分散在不同批次
+        rows = price_rows("2330", range(5, 10)) + price_rows("2317", [3, 4]) + price_rows("1101", [8])
+        report = bulk_insert_stock_price(rows, chunk_size=3, method="values")
+        self.assertEqual((report["rows"], report["chunks"]), (8, 3))
+        for stock_id in ("2330", "2317", "1101"):
+            self.assertEqual(self.db.coverage[stock_id]["row_count"], self.db.row_count(stock_id))
+        self.assertEqual(self.db.coverage["2330"]["row_count"], 8)
+        self.assertEqual(self.db.coverage["2317"]["last_date"], "2024-01-04")
+
+    def test_rollback_mid_chunk(self):
+        """第二批寫入失敗時整批回滾，已寫入的批次與覆蓋範圍都不保留，回傳 None"""
+        bulk_insert_stock_price(price_rows("2330", [2]), chunk_size=4, method="values")
+        self.db.fail_on = self.db.price_writes + 2
+        self.assertIsNone(bulk_insert_stock_price(price_rows("2330", range(3, 13)), chunk_size=4, method="values"))
+        self.assertEqual((self.db.commits, self.db.rollbacks), (1, 1))
+        self.assertEqual(self.db.row_count("2330"), 1)
+        self.assertEqual(self.db.coverage["2330"]["row_count"], 1)
+
+    def test_infile_chunks(self):
+        """LOAD DATA INFILE 每批一個暫存檔，合併後覆蓋範圍正確且只提交一次"""
+        bulk_insert_stock_price(price_rows("2330", [2, 3]), chunk_size=4, method="infile")
+        report = bulk_insert_stock_price(price_rows("2330", range(3, 9)), chunk_size=4, method="infile")
+        self.assertEqual((report["rows"], report["chunks"], report["method"]), (6, 2, "infile"))
+        self.assertEqual(self.db.commits, 2)
+        self.assertEqual(self.db.coverage["2330"]["row_count"], self.db.row_count("2330"))
+        self.assertEqual(self.db.row_count("2330"), 7)
+
+    def test_threshold_dispatch(self):
+        """insert_stock_price 筆數達 BULK_THRESHOLD 時改走大量寫入"""
+        with mock.patch.object(data_loader, "BULK_THRESHOLD", 5), \
+             mock.patch.object(data_loader, "bulk_insert_stock_price", wraps=bulk_insert_stock_price) as bulk:
+            self.assertTrue(insert_stock_price(price_rows("2330", range(2, 6))))
+            bulk.assert_not_called()
+            self.assertTrue(insert_stock_price(price_rows("2330", range(6, 11))))
+            bulk.assert_called_once()
+        self.assertEqual(self.db.coverage["2330"]["row_count"], self.db.row_count("2330"))
+        self.assertEqual(self.db.row_count("2330"), 9)
+
+    def test_coverage_locked_first(self):
+        """各寫入路徑先以 SELECT ... FOR UPDATE 鎖定覆蓋範圍列（依代碼排序），不存在的列先建立再遞增"""
+        rows = price_rows("2330", [2, 3]) + price_rows("1101", [2])
+        for method in ("values", "infile"):
+            self.db.statements, self.db.locked = [], []
+            bulk_insert_stock_price(rows, chunk_size=2, method=method)
+            self.assertEqual(self.db.locked, [["1101", "2330"]])
+            first_read = self.db.statements.index("SELECT stock_id, COUNT(*) FROM stock_price_daily")
+            self.assertLess(self.db.statements.index("SELECT stock_id FROM stock_price_coverage"), first_read)
+        self.db.statements = []
+        get_storage().upsert_prices(price_rows("2317", [2]))
+        self.assertEqual(self.db.statements[:3], [
+            "SELECT stock_id FROM stock_price_coverage",
+            "INSERT INTO stock_price_coverage (stock_id, first_date, last_date, row_count, updated_at)",
+            "SELECT stock_id, COUNT(*) FROM stock_price_daily",
+        ])
+        self.assertEqual(self.db.coverage["1101"]["row_count"], 1)
+        self.assertEqual(self.db.coverage["2317"]["row_count"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
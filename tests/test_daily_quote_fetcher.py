@@ -0,0 +1,89 @@
+"""
+test_daily_quote_fetcher.py
+-------------------
+全市場每日行情解析測試：以 tests/fixtures 內保存的交易所 JSON 離線驗證；
+過去交易日的報表只有完整內容才永久快取。
+"""
+
+import os
+import json
+import unittest
+from datetime import date
+from unittest import mock
+from data_collector import daily_quote_fetcher
+from data_collector.daily_quote_fetcher import parse_twse_daily_report, parse_tpex_daily_report, fetch_twse_daily
+from data_collector.http_cache import IMMUTABLE_TTL
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def load_fixture(name):
+    """讀取 JSON 測試資料"""
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+class TestDailyQuoteParser(unittest.TestCase):
+    """
+    TWSE MI_INDEX / TPEx 每日收盤行情解析測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def test_twse_report(self):
+        """上市行情：只取每日收盤行情表格，略過無成交股票"""
+        rows = parse_twse_daily_report(load_fixture("twse_mi_index_20240102.json"), "2024-01-02")
+        self.assertEqual([r[0] for r in rows], ["0050", "1101", "2330"])
+        self.assertEqual(rows[2], ("2330", "2024-01-02", 590.0, 593.0, 589.0, 593.0, 26059058))
+
+    def test_twse_legacy_report(self):
+        """上市行情：舊版 fieldsN / dataN 格式"""
+        table = load_fixture("twse_mi_index_20240102.json")["tables"][1]
+        rows = parse_twse_daily_report({"fields9": table["fields"], "data9": table["data"]}, "2024-01-02")
+        self.assertEqual(len(rows), 3)
+
+    def test_twse_holiday(self):
+        """非交易日回傳空資料"""
+        self.assertEqual(parse_twse_daily_report({"stat": "很抱歉，沒有符合條件的資料!"}, "2024-01-01"), [])
+
+    def test_tpex_report(self):
+        """上櫃行情：欄位名稱含多餘空白，略過無成交股票"""
+        rows = parse_tpex_daily_report(load_fixture("tpex_daily_quotes_20240102.json"), "2024-01-02")
+        self.assertEqual([r[0] for r in rows], ["006201", "3105", "5483"])
+        self.assertEqual(rows[1], ("3105", "2024-01-02", 168.5, 169.0, 163.5, 164.0, 4561935))
+
+    def test_tpex_legacy_report(self):
+        """上櫃行情：舊版 aaData 格式"""
+        rows = parse_tpex_daily_report(load_fixture("tpex_daily_quotes_legacy_20230103.json"), "2023-01-03")
+        self.assertEqual(rows[0], ("3105", "2023-01-03", 161.0, 163.5, 159.5, 162.5, 3872145))
+
+class TestReportCaching(unittest.TestCase):
+    """
+    行情報表快取期限測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def fetch(self, *payloads):
+        with mock.patch.object(daily_quote_fetcher, "request_json", side_effect=list(payloads)) as request:
+            rows = fetch_twse_daily(date(2024, 1, 2))
+        return rows, [call.kwargs.get("ttl") for call in request.call_args_list]
+
+    def test_complete_report_immutable(self):
+        """完整報表沿用永久快取"""
+        rows, ttls = self.fetch(load_fixture("twse_mi_index_20240102.json"))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(ttls, [IMMUTABLE_TTL])
+
+    def test_error_payload_revalidated(self):
+        """錯誤或查無資料的回應改依端點 TTL 重新取得"""
+        rows, ttls = self.fetch({"stat": "查詢日期大於今日，請重新查詢!"}, load_fixture("twse_mi_index_20240102.json"))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(ttls, [IMMUTABLE_TTL, None])
+
+if __name__ == "__main__":
+    unittest.main()
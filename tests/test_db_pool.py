@@ -0,0 +1,96 @@
+"""
+test_db_pool.py
+-------------------
+連線池測試：以假連線取代 mysql.connector.connect，驗證重用、上限等待、健康檢查與統計，不需資料庫。
+"""
+
+import threading
+import unittest
+from unittest import mock
+from mysql.connector import Error
+from database.db_connection import ConnectionPool
+
+class FakeConnection:
+    """模擬 mysql.connector 連線"""
+    def __init__(self):
+        self.alive = True
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def is_connected(self):
+        return self.alive
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise Error("gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.alive = False
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    連線池測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        patcher = mock.patch("database.db_connection.mysql.connector.connect", side_effect=lambda **kw: FakeConnection())
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reuse(self):
+        """歸還的連線再次借出時重用，不重新建立"""
+        pool = ConnectionPool({}, pool_size=2)
+        for _ in range(5):
+            with pool.checkout() as conn:
+                conn.in_transaction = False
+        stats = pool.get_stats()
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual((stats["checkouts"], stats["created"], stats["active"], stats["idle"]), (5, 1, 0, 1))
+
+    def test_rollback_on_release(self):
+        """歸還時回滾未提交的交易"""
+        pool = ConnectionPool({}, pool_size=1)
+        conn = pool.checkout()
+        raw = conn._raw
+        raw.in_transaction = True
+        conn.close()
+        conn.close()
+        self.assertEqual(raw.rollbacks, 1)
+        self.assertEqual(pool.get_stats()["active"], 0)
+
+    def test_health_check(self):
+        """閒置過久且已失效的連線借出前被捨棄並重建"""
+        pool = ConnectionPool({}, pool_size=1, ping_after=0)
+        conn = pool.checkout()
+        raw = conn._raw
+        conn.close()
+        raw.alive = False                 # 模擬閒置期間被伺服器斷線
+        with pool.checkout() as conn:
+            self.assertIsNot(conn._raw, raw)
+        self.assertEqual(pool.get_stats()["discarded"], 1)
+
+    def test_limit_and_wait(self):
+        """借出數達上限時等待歸還，逾時丟出 Error"""
+        pool = ConnectionPool({}, pool_size=1, checkout_timeout=0.05)
+        conn = pool.checkout()
+        with self.assertRaises(Error):
+            pool.checkout()
+        threading.Timer(0.05, conn.close).start()
+        with pool.checkout(timeout=2) as again:
+            self.assertTrue(again.is_connected())
+        stats = pool.get_stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreater(stats["wait_max"], 0.0)
+        self.assertEqual(stats["active_peak"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+test_gap_detection.py
+-------------------
+缺口偵測測試：依交易日曆找出缺少的交易日區間並合併補抓請求，非上市/上櫃股票不套用 TWSE 交易日曆；
+休市日表未涵蓋的年度不判斷缺口，已確認無資料的區間寫入暫存 SQLite 後跨程序略過。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from database import storage
+from database.storage import SQLiteStorage
+from data_collector import data_updater
+from utils import trading_calendar
+from utils.trading_calendar import trading_days
+from data_collector.data_updater import coalesce_missing_sessions, find_missing_intervals, backfill_intervals, is_contiguous, is_tw_market
+
+class TestGapDetection(unittest.TestCase):
+    """
+    缺口區間偵測與合併測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        """2024/07 交易日（7/24、7/25 颱風停止交易）"""
+        self.sessions = trading_days(date(2024, 7, 1), date(2024, 7, 31))
+
+    def test_complete(self):
+        """資料完整時無缺口，週末與颱風休市不視為缺口"""
+        self.assertNotIn(date(2024, 7, 24), self.sessions)
+        self.assertEqual(coalesce_missing_sessions(self.sessions, set(self.sessions)), [])
+
+    def test_holes_across_closure(self):
+        """跨越休市日的連續缺口合併為單一區間"""
+        existing = set(self.sessions) - {date(2024, 7, 23), date(2024, 7, 26)}
+        self.assertEqual(coalesce_missing_sessions(self.sessions, existing, bridge=0),
+                         [(date(2024, 7, 23), date(2024, 7, 26))])
+
+    def test_bridge(self):
+        """兩缺口間隔不超過 bridge 個交易日時合併，否則分開"""
+        existing = set(self.sessions) - {date(2024, 7, 2), date(2024, 7, 5), date(2024, 7, 30)}
+        self.assertEqual(coalesce_missing_sessions(self.sessions, existing, bridge=2),
+                         [(date(2024, 7, 2), date(2024, 7, 5)), (date(2024, 7, 30), date(2024, 7, 30))])
+        self.assertEqual(len(coalesce_missing_sessions(self.sessions, existing, bridge=0)), 3)
+
+    def test_existing_dates(self):
+        """提供已載入的交易日時不查詢資料庫，頭尾與中段缺口皆能找出"""
+        existing = [d for d in self.sessions if date(2024, 7, 3) <= d <= date(2024, 7, 12) or d >= date(2024, 7, 22)]
+        intervals = find_missing_intervals("2330", date(2024, 7, 1), date(2024, 7, 31), existing_dates=existing, bridge=0)
+        self.assertEqual(intervals, [(date(2024, 7, 1), date(2024, 7, 2)), (date(2024, 7, 15), date(2024, 7, 19))])
+
+    def test_other_markets(self):
+        """只有上市/上櫃代碼判斷缺口，其他市場的代碼一律不視為有缺口"""
+        july = (date(2024, 7, 1), date(2024, 7, 31))
+        for stock_id in ("2330", "2330.TW", "6488.two"):
+            self.assertEqual(find_missing_intervals(stock_id, *july, existing_dates=[]), [july], stock_id)
+        for stock_id in ("AAPL", "7203.T", "0700.HK", "^TWII"):
+            self.assertEqual(find_missing_intervals(stock_id, *july, existing_dates=[]), [], stock_id)
+        self.assertFalse(is_tw_market("00632R"))
+        with mock.patch.object(data_updater, "get_stock_type", return_value="TW"):
+            self.assertTrue(is_tw_market("00632R"))
+
+class TestGapPersistence(unittest.TestCase):
+    """
+    休市日表涵蓋範圍與無資料區間記錄測試（暫存 SQLite）
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "twse.sqlite")
+        storage.set_storage(SQLiteStorage(self.path))
+        patches = [
+            mock.patch.object(data_updater, "_empty_intervals", set()),
+            mock.patch.object(data_updater, "fetch_and_store", return_value=None),
+            mock.patch.object(trading_calendar, "_fetch_attempted", set()),
+            mock.patch.object(trading_calendar, "refresh_holidays", side_effect=OSError("offline")),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.fetch = data_updater.fetch_and_store
+
+    def tearDown(self):
+        storage.set_storage(None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_uncovered_year_skipped(self):
+        """未涵蓋年度（2022）的平日不視為缺口，也不判定覆蓋範圍連續"""
+        existing = trading_days(date(2023, 1, 1), date(2023, 1, 31))
+        self.assertEqual(find_missing_intervals("2330", date(2022, 6, 1), date(2023, 1, 31), existing_dates=existing), [])
+        self.assertFalse(is_contiguous({"first_date": date(2022, 12, 1), "last_date": date(2023, 1, 31), "row_count": 99}))
+        self.assertTrue(is_contiguous({"first_date": date(2023, 1, 3), "last_date": date(2023, 1, 31), "row_count": len(existing)}))
+
+    def test_empty_interval_persisted(self):
+        """無資料區間寫入資料庫，新程序（清空記憶體記錄、重新開啟資料庫）不再請求"""
+        gap = (date(2024, 7, 1), date(2024, 7, 5))
+        self.assertEqual(backfill_intervals("9999", [gap]), [])
+        data_updater._empty_intervals.clear()
+        storage.set_storage(SQLiteStorage(self.path))
+        self.assertEqual(backfill_intervals("9999", [gap]), [])
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(find_missing_intervals("9999", date(2024, 7, 1), date(2024, 7, 12), existing_dates=[], bridge=0),
+                         [(date(2024, 7, 8), date(2024, 7, 12))])
+
+    def test_recent_interval_not_persisted(self):
+        """近期的無資料區間只保留於本程序（Yahoo 可能尚未更新）"""
+        gap = (date.today() - timedelta(days=3), date.today())
+        backfill_intervals("9999", [gap])
+        backfill_intervals("9999", [gap])
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(storage.get_storage().get_empty_intervals("9999"), [])
+
+if __name__ == "__main__":
+    unittest.main()
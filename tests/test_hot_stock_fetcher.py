@@ -0,0 +1,49 @@
+"""
+test_hot_stock_fetcher.py
+-------------------
+TPEx 熱門股解析測試：以 tests/fixtures 內錄製的回應離線驗證，不需瀏覽器。
+"""
+
+import os
+import sys
+import json
+import unittest
+from data_collector.hot_stock_fetcher import parse_tpex_hot_stocks
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+class TestTpexHotStocks(unittest.TestCase):
+    """
+    TPEx 熱門股解析測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        """讀取錄製的 TPEx 每日收盤行情"""
+        with open(os.path.join(FIXTURE_DIR, "tpex_daily_quotes_20240102.json"), encoding="utf-8") as f:
+            self.payload = json.load(f)
+
+    def test_ranking(self):
+        """依成交量排序並維持 StockID/StockName/Volumn/Market 欄位"""
+        df = parse_tpex_hot_stocks(self.payload, limit=2)
+        self.assertEqual(list(df.columns), ["StockID", "StockName", "Volumn", "Market"])
+        self.assertEqual(df["StockID"].tolist(), ["3105", "5483"])
+        self.assertEqual(df["Volumn"].tolist(), [4561935, 2618411])
+        self.assertTrue((df["Market"] == "TWO").all())
+
+    def test_untraded_and_empty(self):
+        """無成交股票不列入，空回應回傳空表格"""
+        df = parse_tpex_hot_stocks(self.payload, limit=20)
+        self.assertNotIn("8044", df["StockID"].tolist())
+        self.assertTrue(parse_tpex_hot_stocks({"tables": []}).empty)
+
+    def test_no_browser_import(self):
+        """模組載入不應引入 selenium"""
+        self.assertNotIn("selenium", sys.modules)
+
+if __name__ == "__main__":
+    unittest.main()
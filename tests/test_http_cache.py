@@ -0,0 +1,169 @@
+"""
+test_http_cache.py
+-------------------
+HTTP 回應磁碟快取測試：串流下載邊寫入內容檔邊交給呼叫端、期限內由本地內容檔分段讀取、
+中途中斷不留下快取，以及多個程序共用快取目錄時合併索引。以假的連線取代網路，快取目錄改為暫存資料夾。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from data_collector import http_cache
+from data_collector.http_cache import cached_stream
+
+URL = "https://isin.twse.com.tw/isin/C_public.jsp?strMode=2"
+
+class FakeResponse:
+    """stream=True 的回應：iter_content 依序產生片段"""
+
+    def __init__(self, body, status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.encoding = None
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+class FakeSession:
+    """記錄請求並回傳預設回應"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.calls.append({"url": url, "headers": headers, "stream": stream})
+        return self.responses.pop(0)
+
+class TestCachedStream(unittest.TestCase):
+    """
+    串流快取測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        patches = [
+            mock.patch.object(http_cache, "CACHE_DIR", self.tmpdir),
+            mock.patch.object(http_cache, "_index", None),
+            mock.patch.object(http_cache, "_pending", {}),
+            mock.patch.object(http_cache, "_touched", {}),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.body = bytes(range(256)) * 40
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_stream_then_cached(self):
+        """下載時逐段交給呼叫端並寫入快取，期限內改由本地內容檔分段讀取"""
+        response = FakeResponse(self.body, headers={"ETag": '"v1"'})
+        session = FakeSession(response)
+        chunks = list(cached_stream(URL, 1000, session=session, encoding="big5"))
+        self.assertEqual([len(c) for c in chunks[:2]], [1000, 1000])
+        self.assertEqual(b"".join(chunks), self.body)
+        self.assertTrue(session.calls[0]["stream"])
+        self.assertTrue(response.closed)
+
+        cached = list(cached_stream(URL, 4096, session=session))
+        self.assertEqual(b"".join(cached), self.body)
+        self.assertEqual(len(cached), 3)
+        self.assertEqual(len(session.calls), 1)
+
+    def test_revalidate_not_modified(self):
+        """過期後以 ETag 詢問，304 時沿用本地內容"""
+        session = FakeSession(FakeResponse(self.body, headers={"ETag": '"v1"'}), FakeResponse(b"", status_code=304))
+        list(cached_stream(URL, 1000, ttl=0, session=session))
+        self.assertEqual(b"".join(cached_stream(URL, 1000, ttl=0, session=session)), self.body)
+        self.assertEqual(session.calls[1]["headers"], {"If-None-Match": '"v1"'})
+
+    def test_interrupted_stream_not_cached(self):
+        """呼叫端中途停止讀取時不寫入索引，也不留下暫存檔"""
+        session = FakeSession(FakeResponse(self.body), FakeResponse(self.body))
+        stream = cached_stream(URL, 1000, session=session)
+        next(stream)
+        stream.close()
+        self.assertEqual(http_cache.load_index(), {})
+        self.assertEqual(os.listdir(os.path.join(self.tmpdir, "objects")), [])
+        self.assertEqual(b"".join(cached_stream(URL, 1000, session=session)), self.body)
+        self.assertEqual(len(session.calls), 2)
+
+def entry(url, accessed_at=0.0):
+    """單筆索引資訊"""
+    return {"url": url, "sha256": "0" * 64, "size": 1, "etag": None, "last_modified": None,
+            "encoding": None, "fetched_at": 0.0, "accessed_at": accessed_at}
+
+class TestSharedIndex(unittest.TestCase):
+    """
+    多程序共用索引測試：以重設模組狀態模擬另一個已先載入索引的程序
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        patches = [
+            mock.patch.object(http_cache, "CACHE_DIR", self.tmpdir),
+            mock.patch.object(http_cache, "_index", None),
+            mock.patch.object(http_cache, "_pending", {}),
+            mock.patch.object(http_cache, "_touched", {}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def switch_process(self, index):
+        """切換為另一個程序：沿用其先前載入的索引，尚無未寫回的變更"""
+        http_cache._index = index
+        http_cache._pending.clear()
+        http_cache._touched.clear()
+
+    def test_concurrent_saves_merged(self):
+        """兩個程序各自寫入時保留對方的項目，刪除只影響自己移除的項目"""
+        stale = {}
+        http_cache.save_entry("a", entry("https://a"))
+        self.switch_process(stale)
+        http_cache.save_entry("b", entry("https://b"))
+        self.assertEqual(set(http_cache.read_index_file()), {"a", "b"})
+        self.assertEqual(set(http_cache.load_index()), {"a", "b"})
+
+        self.switch_process({"b": entry("https://b")})
+        with http_cache._lock:
+            http_cache.remove_entry("b")
+            http_cache.flush_index()
+        http_cache.save_entry("c", entry("https://c"))
+        self.assertEqual(set(http_cache.read_index_file()), {"a", "c"})
+
+    def test_touch_keeps_latest_access(self):
+        """存取時間於下次寫回時合併，取較新者"""
+        http_cache.save_entry("a", entry("https://a", accessed_at=50.0))
+        http_cache.save_entry("b", entry("https://b", accessed_at=10.0))
+        http_cache.touch_entry("a", 20.0)
+        http_cache.touch_entry("b", 30.0)
+        http_cache.save_entry("c", entry("https://c"))
+        index = http_cache.read_index_file()
+        self.assertEqual((index["a"]["accessed_at"], index["b"]["accessed_at"]), (50.0, 30.0))
+
+if __name__ == "__main__":
+    unittest.main()
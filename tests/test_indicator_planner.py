@@ -0,0 +1,99 @@
+"""
+test_indicator_planner.py
+-------------------
+指標執行計畫測試：共用的中間運算只計算一次、結果與逐欄計算的各指標函式逐位元相同、不修改傳入的 DataFrame，
+以及均線帶（單一補償前綴和）與 rolling().mean() 一致。
+"""
+
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from analytics import indicator_planner
+from analytics.indicator_planner import build_indicator_spec, build_plan, evaluate_plan, ribbon_spec, ribbon_column
+from analytics.indicators import (
+    calculate_all_indicators, calculate_ma, calculate_rsi, calculate_macd,
+    calculate_bollinger_bands, calculate_volume_ma, calculate_ma_ribbon, RIBBON_WINDOWS,
+)
+
+def legacy_indicators(df, rsi_method="sma"):
+    """原本逐欄計算的方式"""
+    df = calculate_ma(df.copy())
+    df = calculate_rsi(df, method=rsi_method)
+    df = calculate_macd(df)
+    df = calculate_bollinger_bands(df)
+    return calculate_volume_ma(df)
+
+class TestIndicatorPlanner(unittest.TestCase):
+    """
+    指標執行計畫測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        closes = 80 + np.cumsum(rng.normal(0, 1, 250))
+        closes[30:45] = closes[30]
+        closes[[5, 100]] = np.nan
+        self.df = pd.DataFrame({
+            "trade_date": pd.bdate_range("2024-01-01", periods=250),
+            "close_price": closes,
+            "volume": rng.integers(1_000, 50_000, 250),
+        })
+
+    def test_shared_primitives(self):
+        """MA_20 與 BB_middle 共用同一節點，diff 與 20 日均線只出現一次"""
+        spec = build_indicator_spec()
+        self.assertEqual(spec["MA_20"], spec["BB_middle"])
+        ops = [node[0] for node in build_plan(spec)]
+        self.assertEqual(ops.count("diff"), 1)
+        self.assertEqual(ops.count("col"), 2)
+        with mock.patch.dict(indicator_planner.OPS, {"rolling_mean": mock.Mock(wraps=indicator_planner.OPS["rolling_mean"])}):
+            evaluate_plan(spec, {"close_price": self.df["close_price"].to_numpy(), "volume": self.df["volume"].to_numpy()})
+            # MA_5、MA_20(=BB_middle)、RSI 漲/跌、volume_MA5
+            self.assertEqual(indicator_planner.OPS["rolling_mean"].call_count, 5)
+
+    def test_matches_legacy(self):
+        for rsi_method in ("sma", "wilder"):
+            result = calculate_all_indicators(self.df, {"rsi_method": rsi_method})
+            expected = legacy_indicators(self.df, rsi_method)
+            self.assertEqual(list(result.columns), list(expected.columns))
+            for col in expected.columns:
+                np.testing.assert_array_equal(result[col], expected[col], err_msg=f"{rsi_method} {col}")
+
+    def test_does_not_mutate_input(self):
+        before = self.df.copy()
+        result = calculate_all_indicators(self.df)
+        pd.testing.assert_frame_equal(self.df, before)
+        again = calculate_all_indicators(result)
+        self.assertEqual(list(again.columns), list(result.columns))
+
+    def test_ribbon_matches_rolling(self):
+        """均線帶與 rolling(w).mean() 一致（含缺值位置），大數值長序列的誤差維持在機器精度"""
+        result = calculate_ma_ribbon(self.df)
+        for column in ("close_price", "volume"):
+            for w in RIBBON_WINDOWS:
+                expected = self.df[column].rolling(w).mean().to_numpy()
+                np.testing.assert_allclose(result[ribbon_column(column, w)], expected, rtol=1e-13, equal_nan=True)
+
+        rng = np.random.default_rng(0)
+        volumes = rng.integers(10**8, 10**9, 50_000).astype(np.float64)
+        ribbon = evaluate_plan(ribbon_spec([240], "volume"), {"volume": volumes})[ribbon_column("volume", 240)]
+        np.testing.assert_allclose(ribbon, pd.Series(volumes).rolling(240).mean(), rtol=1e-14, equal_nan=True)
+
+    def test_ribbon_shares_prefix(self):
+        """均線帶每個欄位只建立一次前綴和，並可由 calculate_all_indicators 一併計算"""
+        spec = build_indicator_spec({"ribbon_windows": RIBBON_WINDOWS})
+        ops = [node[0] for node in build_plan(spec)]
+        self.assertEqual(ops.count("prefix_sum"), 2)
+        self.assertEqual(ops.count("window_mean"), 2 * len(RIBBON_WINDOWS))
+        result = calculate_all_indicators(self.df, {"ribbon_windows": RIBBON_WINDOWS})
+        self.assertIn(ribbon_column("volume", 240), result.columns)
+        np.testing.assert_array_equal(result["MA_20"], calculate_all_indicators(self.df)["MA_20"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+test_indicator_store.py
+-------------------
+預先計算指標測試：接續計算與整段重算結果一致、補入舊資料時整檔重算、讀取時涵蓋不足改為即時計算（補上較早的歷史後結果相同）。
+以暫存 SQLite 檔作為資料庫後端，不需 MySQL。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+import numpy as np
+import pandas as pd
+from database import storage, price_cache
+from database.storage import SQLiteStorage
+from database.data_loader import insert_stock_price
+from analytics.indicators import calculate_all_indicators
+from analytics import indicator_store
+from analytics.indicator_store import refresh_indicators, attach_indicators, attach_indicators_multi, FRAME_COLUMNS, params_hash
+from data_collector.data_updater import load_stock_data, load_stock_data_multi
+
+DAYS = pd.bdate_range("2024-01-01", periods=120)
+
+def price_rows(days, seed=0, stock_id="2330"):
+    """產生隨機漫步股價 tuple"""
+    rng = np.random.default_rng(seed)
+    closes = 500 + np.cumsum(rng.normal(0, 5, len(days)))
+    volumes = rng.integers(1_000_000, 5_000_000, len(days))
+    return [(stock_id, d.date().isoformat(), c, c + 2, c - 2, c, int(v)) for d, c, v in zip(days, closes, volumes)]
+
+class TestIndicatorStore(unittest.TestCase):
+    """
+    預先計算指標測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = SQLiteStorage(os.path.join(self.tmpdir, "twse.sqlite"))
+        storage.set_storage(self.db)
+        patches = [
+            mock.patch.object(price_cache, "CACHE_DIR", os.path.join(self.tmpdir, "cache")),
+            mock.patch("database.data_loader.is_known_stock", return_value=True),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.rows = price_rows(DAYS)
+
+    def tearDown(self):
+        storage.set_storage(None)
+        shutil.rmtree(self.tmpdir)
+
+    def stored_frame(self):
+        df = load_stock_data("2330", "2024-01-01", "2024-12-31")
+        return attach_indicators(df, "2330"), calculate_all_indicators(df.copy())
+
+    def test_incremental_matches_batch(self):
+        """分三次寫入並接續計算，結果與整段重算一致"""
+        insert_stock_price(self.rows[:80])
+        self.assertEqual(refresh_indicators()["rebuilt"], 1)
+        insert_stock_price(self.rows[80:100])
+        self.assertEqual(refresh_indicators()["extended"], 1)
+        insert_stock_price(self.rows[100:])
+        report = refresh_indicators()
+        self.assertEqual((report["extended"], report["rows"]), (1, 20))
+        self.assertEqual(refresh_indicators()["skipped"], 1)
+
+        stored, batch = self.stored_frame()
+        for col in FRAME_COLUMNS:
+            np.testing.assert_array_equal(stored[col], batch[col], err_msg=col)
+        self.assertEqual(self.db.get_indicator_states(["2330"])["2330"]["params_hash"], params_hash())
+
+    def test_backfill_triggers_rebuild(self):
+        """補入早於最後計算日的資料時整檔重算"""
+        insert_stock_price(self.rows[10:])
+        refresh_indicators()
+        insert_stock_price(self.rows[:10])
+        self.assertEqual(refresh_indicators()["rebuilt"], 1)
+        stored, batch = self.stored_frame()
+        np.testing.assert_array_equal(stored["MACD"], batch["MACD"])
+
+    def test_attach_falls_back(self):
+        """預先計算的指標不足或參數不同時即時計算"""
+        insert_stock_price(self.rows[:100])
+        refresh_indicators()
+        insert_stock_price(self.rows[100:])
+        df = load_stock_data("2330", "2024-01-01", "2024-12-31")
+        with mock.patch.object(indicator_store, "calculate_all_indicators", wraps=calculate_all_indicators) as spy:
+            attach_indicators(df, "2330")
+            self.assertEqual(spy.call_count, 1)
+            refresh_indicators()
+            attach_indicators(df, "2330")
+            self.assertEqual(spy.call_count, 1)
+            with mock.patch.object(indicator_store, "INDICATOR_VERSION", 99):
+                attach_indicators(df, "2330")
+            self.assertEqual(spy.call_count, 2)
+
+    def test_fallback_uses_history(self):
+        """即時計算補上查詢區間之前的歷史，與預先計算的指標逐位元相同"""
+        insert_stock_price(self.rows)
+        insert_stock_price(price_rows(DAYS, seed=1, stock_id="2317"))
+        refresh_indicators()
+        start, end = DAYS[60].date(), DAYS[-1].date()
+        frames = load_stock_data_multi(["2330", "2317"], start, end)
+        stored = {s: attach_indicators(df, s) for s, df in frames.items()}
+        with mock.patch.object(indicator_store, "INDICATOR_VERSION", 99):
+            single = attach_indicators(frames["2330"], "2330")
+            multi = attach_indicators_multi(frames)
+        for stock_id, expected in stored.items():
+            for result in (multi[stock_id], single) if stock_id == "2330" else (multi[stock_id],):
+                np.testing.assert_array_equal(result["trade_date"], expected["trade_date"])
+                for col in FRAME_COLUMNS:
+                    np.testing.assert_array_equal(result[col], expected[col], err_msg=f"{stock_id} {col}")
+
+    def test_attach_multi(self):
+        """多檔讀取：已計算的股票讀資料表，其餘合併為一次面板計算"""
+        insert_stock_price(self.rows)
+        refresh_indicators()
+        insert_stock_price(price_rows(DAYS[:60], seed=1, stock_id="2317"))
+        frames = load_stock_data_multi(["2330", "2317"], "2024-01-01", "2024-12-31")
+        with mock.patch.object(indicator_store, "calculate_panel_indicators", wraps=indicator_store.calculate_panel_indicators) as spy:
+            result = attach_indicators_multi(frames)
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual(list(spy.call_args.args[0]), ["2317"])
+        for stock_id, df in frames.items():
+            batch = calculate_all_indicators(df.copy())
+            for col in FRAME_COLUMNS:
+                np.testing.assert_array_equal(result[stock_id][col], batch[col], err_msg=col)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+test_panel_indicators.py
+-------------------
+面板指標計算測試：長表、寬表、各股字典三種輸入與逐檔 calculate_all_indicators 結果逐位元相同
+（各股上市日與筆數不同、含缺值），以及引擎快速推進後接續計算的狀態。
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from analytics.indicators import calculate_all_indicators
+from analytics.panel_indicators import calculate_panel_indicators, panel_to_frames
+from analytics.streaming_indicators import StreamingIndicators
+from analytics.indicator_store import FRAME_COLUMNS
+
+def stock_frames(count=12, seed=3):
+    """產生起始日與長度各不相同的多檔股價"""
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for k in range(count):
+        n = int(rng.integers(10, 260))
+        days = pd.bdate_range("2024-01-01", periods=n) + pd.Timedelta(days=int(rng.integers(0, 60)))
+        closes = 50 + np.cumsum(rng.normal(0, 1, n))
+        closes[rng.integers(0, n, 2)] = np.nan
+        stock_id = str(2000 + k)
+        frames[stock_id] = pd.DataFrame({
+            "stock_id": stock_id, "trade_date": days, "close_price": closes,
+            "volume": rng.integers(1_000, 90_000, n),
+        })
+    return frames
+
+class TestPanelIndicators(unittest.TestCase):
+    """
+    面板指標計算測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.frames = stock_frames()
+        self.expected = {s: calculate_all_indicators(df.copy()) for s, df in self.frames.items()}
+
+    def assert_matches(self, panel):
+        self.assertEqual(panel.index.names, ["stock_id", "trade_date"])
+        result = panel_to_frames(panel)
+        self.assertEqual(sorted(result), sorted(self.frames))
+        for stock_id, expected in self.expected.items():
+            np.testing.assert_array_equal(result[stock_id]["trade_date"], expected["trade_date"])
+            for col in FRAME_COLUMNS:
+                np.testing.assert_array_equal(result[stock_id][col], expected[col], err_msg=f"{stock_id} {col}")
+
+    def test_dict_input(self):
+        self.assert_matches(calculate_panel_indicators(self.frames))
+
+    def test_long_input(self):
+        long = pd.concat(list(self.frames.values())[::-1], ignore_index=True)
+        self.assert_matches(calculate_panel_indicators(long))
+
+    def test_wide_input(self):
+        """寬表依日期對齊，未交易日的空值不視為 K 棒"""
+        long = pd.concat(self.frames.values(), ignore_index=True)
+        wide = long.pivot(index="trade_date", columns="stock_id", values=["close_price", "volume"])
+        self.assert_matches(calculate_panel_indicators(wide))
+
+    def test_missing_columns(self):
+        with self.assertRaises(ValueError):
+            calculate_panel_indicators(pd.DataFrame({"stock_id": ["2330"], "trade_date": [pd.Timestamp("2024-01-02")]}))
+
+    def test_warm_state_continues(self):
+        """快速推進後的狀態接續計算，與逐筆計算全部歷史的結果逐位元相同"""
+        df = max(self.frames.values(), key=len)
+        closes, volumes = df["close_price"].to_numpy(np.float64), df["volume"].to_numpy(np.float64)
+        for rsi_method in ("sma", "wilder"):
+            full = StreamingIndicators({"rsi_method": rsi_method}).run(closes, volumes)
+            warm = StreamingIndicators({"rsi_method": rsi_method}).warm(closes[:200], volumes[:200])
+            np.testing.assert_array_equal(warm.run(closes[200:], volumes[200:]), full[200:])
+
+if __name__ == "__main__":
+    unittest.main()
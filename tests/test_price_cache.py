@@ -0,0 +1,94 @@
+"""
+test_price_cache.py
+-------------------
+Parquet 股價快取測試：已結束年度不查資料庫、未結束年度增量附加、寫入後分區失效。
+以暫存 SQLite 檔作為資料庫後端，不需 MySQL。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+from database import storage, price_cache
+from database.storage import SQLiteStorage
+from database.data_loader import insert_stock_price
+from data_collector.data_updater import load_stock_data_multi
+
+THIS_YEAR = date.today().year
+LAST_YEAR = THIS_YEAR - 1
+
+def bar(stock_id, day, close):
+    """產生一筆股價 tuple"""
+    return (stock_id, day.isoformat(), close, close + 1, close - 1, close, 1000)
+
+class TestPriceCache(unittest.TestCase):
+    """
+    Parquet 快取測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = SQLiteStorage(os.path.join(self.tmpdir, "twse.sqlite"))
+        storage.set_storage(self.db)
+        patches = [
+            mock.patch.object(price_cache, "CACHE_DIR", os.path.join(self.tmpdir, "cache")),
+            mock.patch("database.data_loader.is_known_stock", return_value=True),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        insert_stock_price([
+            bar("2330", date(LAST_YEAR, 12, 1), 100.0),
+            bar("2330", date(LAST_YEAR, 12, 2), 101.0),
+            bar("2330", date(THIS_YEAR, 1, 5), 110.0),
+            bar("2317", date(LAST_YEAR, 12, 1), 50.0),
+        ])
+
+    def tearDown(self):
+        storage.set_storage(None)
+        shutil.rmtree(self.tmpdir)
+
+    def load(self, stock_ids=("2330", "2317")):
+        return load_stock_data_multi(list(stock_ids), f"{LAST_YEAR}-01-01", f"{THIS_YEAR}-12-31")
+
+    def test_closed_partition_skips_database(self):
+        """已結束年度寫入後即不再查詢資料庫"""
+        first = self.load()
+        self.assertEqual(first["2330"]["close_price"].tolist(), [100.0, 101.0, 110.0])
+        self.assertEqual(first["2317"]["stock_id"].tolist(), ["2317"])
+        self.assertTrue(os.path.exists(price_cache.partition_path("2330", LAST_YEAR, closed=True)))
+        self.assertTrue(os.path.exists(price_cache.partition_path("2330", THIS_YEAR, closed=False)))
+
+        calls = []
+        original = self.db.read_prices
+        def spy(stock_ids, start_date=None, end_date=None, intervals=None):
+            calls.append(str(start_date)[:4])
+            return original(stock_ids, start_date, end_date, intervals)
+        with mock.patch.object(self.db, "read_prices", side_effect=spy):
+            again = self.load()
+        self.assertEqual(again["2330"]["close_price"].tolist(), [100.0, 101.0, 110.0])
+        self.assertEqual(calls, [str(THIS_YEAR)])
+
+    def test_open_partition_appends(self):
+        """未結束年度只附加新交易日，分區保留不失效"""
+        self.load()
+        insert_stock_price([bar("2330", date(THIS_YEAR, 1, 6), 111.0)])
+        self.assertTrue(os.path.exists(price_cache.partition_path("2330", THIS_YEAR, closed=False)))
+        self.assertEqual(self.load(["2330"])["2330"]["close_price"].tolist(), [100.0, 101.0, 110.0, 111.0])
+
+    def test_rewrite_invalidates(self):
+        """改寫已快取日期時刪除分區，下次讀取取得新值"""
+        self.load()
+        insert_stock_price([bar("2330", date(LAST_YEAR, 12, 2), 99.0)])
+        self.assertFalse(os.path.exists(price_cache.partition_path("2330", LAST_YEAR, closed=True)))
+        self.assertEqual(self.load(["2330"])["2330"]["close_price"].tolist(), [100.0, 99.0, 110.0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+test_price_loader.py
+-------------------
+多檔股價讀取測試：由 tuple 查詢結果建立具型別欄位並依股票切分，不需資料庫。
+"""
+
+import unittest
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from data_collector.data_updater import rows_to_price_frame, split_price_frame
+
+ROWS = [
+    ("2317", date(2024, 1, 2), 104.0, 105.5, 103.5, 105.0, 23000000),
+    ("2317", date(2024, 1, 3), 105.0, 105.0, 103.0, 103.5, 31000000),
+    ("2330", date(2024, 1, 2), Decimal("590.00"), Decimal("593.00"), Decimal("589.00"), Decimal("593.00"), 26059058),
+    ("2330", date(2024, 1, 3), 584.0, 585.0, 576.0, 578.0, 37106763),
+    ("2330", date(2024, 1, 4), 580.0, 581.0, 577.0, None, 0),
+]
+
+class TestPriceLoader(unittest.TestCase):
+    """
+    欄位式股價讀取測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def test_dtypes(self):
+        """價格為 float、成交量為 int64、日期為 datetime64，Decimal 與空值皆可轉換"""
+        df = rows_to_price_frame(ROWS)
+        self.assertEqual(df["close_price"].dtype, np.float64)
+        self.assertEqual(df["volume"].dtype, np.int64)
+        self.assertTrue(np.issubdtype(df["trade_date"].dtype, np.datetime64))
+        self.assertEqual(df["open_price"].iloc[2], 590.0)
+        self.assertTrue(np.isnan(df["close_price"].iloc[4]))
+        self.assertEqual(rows_to_price_frame(ROWS, np.float32)["high_price"].dtype, np.float32)
+
+    def test_split(self):
+        """依 stock_id 切分，各檔索引重新編號"""
+        frames = split_price_frame(rows_to_price_frame(ROWS))
+        self.assertEqual(sorted(frames), ["2317", "2330"])
+        self.assertEqual(len(frames["2330"]), 3)
+        self.assertEqual(frames["2330"].index.tolist(), [0, 1, 2])
+        self.assertEqual(frames["2317"]["close_price"].tolist(), [105.0, 103.5])
+        self.assertEqual(split_price_frame(rows_to_price_frame([])), {})
+
+if __name__ == "__main__":
+    unittest.main()
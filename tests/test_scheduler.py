@@ -0,0 +1,72 @@
+"""
+test_scheduler.py
+-------------------
+每日排程測試：新交易日執行全市場更新（有股票失敗仍記為已更新），同一交易日再次觸發時只重試上次失敗的股票，
+沒有失敗時略過；無休市日表時照常更新。更新與指標計算以 mock 取代，不需資料庫與網路。
+"""
+
+import unittest
+from datetime import date
+from unittest import mock
+from data_collector import scheduler
+from utils.trading_calendar import CalendarCoverageError
+
+class TestSchedulerJob(unittest.TestCase):
+    """
+    排程作業測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.update = mock.MagicMock(return_value={"updated": 1799, "failed": 1, "failures": {"9999": "down"}})
+        self.failures = mock.MagicMock(return_value=["9999"])
+        self.session = mock.MagicMock(return_value=date(2024, 7, 26))
+        patches = [
+            mock.patch.object(scheduler, "_last_session", None),
+            mock.patch.object(scheduler, "update_all_stocks", self.update),
+            mock.patch.object(scheduler, "last_run_failures", self.failures),
+            mock.patch.object(scheduler, "expected_latest_session", self.session),
+            mock.patch.object(scheduler, "refresh_indicators"),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_retry_failed_only(self):
+        """有股票失敗時仍記錄交易日，同一交易日再次觸發只重試失敗的股票，全部成功後略過"""
+        scheduler.job()
+        self.assertEqual(scheduler._last_session, date(2024, 7, 26))
+        self.assertEqual(self.update.call_args.kwargs.get("stock_ids"), None)
+
+        scheduler.job()
+        self.assertEqual(self.update.call_args.kwargs["stock_ids"], ["9999"])
+
+        self.failures.return_value = []
+        scheduler.job()
+        self.assertEqual(self.update.call_count, 2)
+
+        self.session.return_value = date(2024, 7, 29)
+        scheduler.job()
+        self.assertEqual(self.update.call_count, 3)
+        self.assertEqual(self.update.call_args.kwargs.get("stock_ids"), None)
+
+    def test_not_attempted(self):
+        """無法讀取股票清單（回傳空報告）時不記錄交易日；無休市日表時每次照常更新"""
+        self.update.return_value = {}
+        scheduler.job()
+        self.assertIsNone(scheduler._last_session)
+
+        self.session.side_effect = CalendarCoverageError("2030 年無休市日表")
+        self.update.return_value = {"updated": 1800, "failed": 0}
+        scheduler.job()
+        scheduler.job()
+        self.assertEqual(self.update.call_count, 3)
+        self.failures.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
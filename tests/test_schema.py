@@ -0,0 +1,140 @@
+"""
+test_schema.py
+-------------------
+schema 版本遷移、年度分區、EXPLAIN 檢查與大量寫入的交易範圍測試：以記錄 SQL 的假游標取代 MySQL。
+"""
+
+import contextlib
+import unittest
+from datetime import date
+from unittest import mock
+from database import schema
+from database.storage import MySQLStorage
+
+class FakeCursor:
+    """依 SQL 關鍵字回傳預設結果，並記錄執行過的語法"""
+
+    def __init__(self, answers, plans=None):
+        self.answers = answers
+        self.plans = plans or {}
+        self.executed = []
+        self.rowcount = 0
+        self.last = None
+
+    def execute(self, sql, params=()):
+        self.executed.append(" ".join(sql.split()))
+        self.last = (sql, params)
+
+    def executemany(self, sql, rows):
+        self.executed.append(" ".join(sql.split()))
+
+    def fetchone(self):
+        sql = self.last[0]
+        for key, value in self.answers.items():
+            if key in sql:
+                return value
+        return (0,)
+
+    def fetchall(self):
+        sql, params = self.last
+        if sql.startswith("EXPLAIN"):
+            for key, plan in self.plans.items():
+                if key in sql:
+                    return [plan]
+            return [{"table": "stock_price_daily", "type": "range", "key": "PRIMARY", "rows": 250, "partitions": "p2025,p2026"}]
+        return self.answers.get("PARTITION_NAME FROM", [])
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+class TestSchema(unittest.TestCase):
+    """
+    schema 管理測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def run_with(self, cursor, func, *args):
+        conn = FakeConnection(cursor)
+        with mock.patch.object(schema, "get_connection", return_value=conn), \
+             mock.patch.object(schema, "close_connection"), \
+             mock.patch.object(schema, "STORAGE_BACKEND", "mysql"):
+            return func(*args)
+
+    def test_price_table_ddl(self):
+        """叢集主鍵、無外鍵、年度分區含前後兩端"""
+        ddl = schema.price_table_ddl(last_year=2002)
+        self.assertIn("PRIMARY KEY (stock_id, trade_date)", ddl)
+        self.assertNotIn("FOREIGN KEY", ddl)
+        self.assertNotIn("AUTO_INCREMENT", ddl)
+        self.assertIn("PARTITION p2002 VALUES LESS THAN ('2003-01-01')", ddl)
+        self.assertIn("p_before", ddl)
+        self.assertIn("p_future VALUES LESS THAN (MAXVALUE)", ddl)
+
+    def test_migrate_legacy_table(self):
+        """舊版資料表（v1 已套用、未分區）只套用 v2 以後，並以 RENAME 交換重建的分區表"""
+        cursor = FakeCursor({
+            "MAX(version)": (1,),
+            "information_schema.TABLES": (1,),
+            "information_schema.PARTITIONS": (0,),
+            "information_schema.STATISTICS": (0,),
+        })
+        self.assertEqual(self.run_with(cursor, schema.migrate), len(schema.MIGRATIONS))
+        sql = "\n".join(cursor.executed)
+        self.assertNotIn("CREATE TABLE IF NOT EXISTS stock_info", sql)
+        self.assertIn("CREATE TABLE stock_price_daily_new", sql)
+        self.assertIn("RENAME TABLE stock_price_daily TO stock_price_daily_old, stock_price_daily_new TO stock_price_daily", sql)
+        self.assertIn("ADD KEY idx_last_date", sql)
+        versions = [s for s in cursor.executed if s.startswith("INSERT INTO schema_version")]
+        self.assertEqual(len(versions), len(schema.MIGRATIONS) - 1)
+
+    def test_ensure_year_partitions(self):
+        """自 p_future 分出缺少的年度"""
+        year = date.today().year
+        cursor = FakeCursor({"PARTITION_NAME FROM": [("p_before",), (f"p{year - 1}",), ("p_future",)]})
+        self.assertEqual(schema.ensure_year_partitions(cursor), [year, year + 1])
+        self.assertIn(f"REORGANIZE PARTITION p_future INTO (PARTITION p{year}", cursor.executed[-1])
+
+    def test_explain_reports_full_scan(self):
+        """type 為 ALL 或未使用索引的查詢標記為全表掃描"""
+        cursor = FakeCursor({}, plans={
+            "WHERE trade_date = %s": {"table": "stock_price_daily", "type": "ALL", "key": None, "rows": 900000, "partitions": None},
+        })
+        with mock.patch("builtins.print"):
+            report = self.run_with(cursor, schema.explain_queries)
+        self.assertEqual([item["name"] for item in report if item["full_scan"]], ["單日全市場"])
+        self.assertEqual(len(report), len(schema.build_check_queries()))
+
+    def test_bulk_values_single_commit(self):
+        """多列 VALUES 分批寫入只在最後提交一次，失敗時整批回滾"""
+        rows = [("2330", date(2024, 1, day), 1.0, 1.0, 1.0, 1.0, 100) for day in range(1, 11)]
+        cursor = FakeCursor({})
+        conn = FakeConnection(cursor)
+        with mock.patch("database.storage.pooled_connection", return_value=contextlib.nullcontext(conn)):
+            self.assertEqual(MySQLStorage().bulk_upsert_prices(rows, 4, "values"), 3)
+            self.assertEqual(conn.commits, 1)
+            with mock.patch.object(cursor, "execute", side_effect=[None, None, None, OSError("lost")]):
+                with self.assertRaises(OSError):
+                    MySQLStorage().bulk_upsert_prices(rows, 4, "values")
+        self.assertEqual((conn.commits, conn.rollbacks), (1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
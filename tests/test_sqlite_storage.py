@@ -0,0 +1,115 @@
+"""
+test_sqlite_storage.py
+-------------------
+SQLite 內嵌儲存後端測試：upsert、覆蓋範圍與區間讀取，以及股票名稱重抓失敗時的寫入，以暫存檔執行，不需 MySQL。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+import pandas as pd
+from database import storage, price_cache, stock_info_manager
+from utils import stock_info_map
+from database.storage import SQLiteStorage
+from database.data_loader import insert_stock_price
+from data_collector.data_updater import load_stock_data_multi, load_stock_slices
+
+ROWS = [
+    ("2330", "2024-01-02", 590.0, 593.0, 589.0, 593.0, 26059058),
+    ("2330", "2024-01-03", 584.0, 585.0, 576.0, 578.0, 37106763),
+    ("2330", "2024-01-04", 580.0, 581.0, 577.0, 580.0, 15309129),
+    ("2317", "2024-01-02", 104.0, 105.5, 103.5, 105.0, None),
+]
+
+class TestSQLiteStorage(unittest.TestCase):
+    """
+    SQLite 後端測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = SQLiteStorage(os.path.join(self.tmpdir, "twse.sqlite"))
+        patcher = mock.patch.object(price_cache, "CACHE_DIR", os.path.join(self.tmpdir, "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        storage.set_storage(None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_upsert_is_idempotent(self):
+        """重複寫入同一交易日以新值覆蓋，筆數與覆蓋範圍不重複累加"""
+        self.storage.upsert_prices(ROWS)
+        self.storage.upsert_prices([("2330", "2024-01-04", 580.0, 581.0, 577.0, 579.0, 15309129)])
+        rows = self.storage.read_prices(["2330"])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1][5], 579.0)
+        coverage = self.storage.get_coverage("2330")
+        self.assertEqual(coverage["row_count"], 3)
+        self.assertEqual(coverage["first_date"], date(2024, 1, 2))
+        self.assertEqual(coverage["last_date"], date(2024, 1, 4))
+
+    def test_coverage_matches_rebuild(self):
+        """遞增維護的覆蓋範圍與重新計算結果一致"""
+        self.storage.upsert_prices(ROWS[:2])
+        self.storage.upsert_prices(ROWS[1:])
+        incremental = {sid: self.storage.get_coverage(sid)["row_count"] for sid in ("2330", "2317")}
+        self.assertEqual(self.storage.rebuild_coverage(), 2)
+        rebuilt = {sid: self.storage.get_coverage(sid)["row_count"] for sid in ("2330", "2317")}
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(self.storage.get_all_last_dates(), {"2330": date(2024, 1, 4), "2317": date(2024, 1, 2)})
+        self.assertIsNone(self.storage.get_coverage("0050"))
+
+    def test_range_reads(self):
+        """區間與多段區間讀取依 stock_id、trade_date 排序，成交量空值補 0"""
+        self.storage.upsert_prices(ROWS)
+        rows = self.storage.read_prices(["2330", "2317"], date(2024, 1, 2), date(2024, 1, 3))
+        self.assertEqual([(r[0], r[1]) for r in rows], [("2317", "2024-01-02"), ("2330", "2024-01-02"), ("2330", "2024-01-03")])
+        self.assertEqual(rows[0][6], 0)
+        slices = self.storage.read_prices(["2330"], intervals=[(date(2024, 1, 2), date(2024, 1, 2)), (date(2024, 1, 4), date(2024, 1, 4))])
+        self.assertEqual([r[1] for r in slices], ["2024-01-02", "2024-01-04"])
+        self.assertEqual(self.storage.read_trade_dates("2330", date(2024, 1, 3), date(2024, 1, 31)), [date(2024, 1, 3), date(2024, 1, 4)])
+
+    def test_loader_dispatch(self):
+        """data_loader 與 data_updater 經由 get_storage 讀寫所選後端"""
+        storage.set_storage(self.storage)
+        with mock.patch("database.data_loader.is_known_stock", return_value=True):
+            self.assertTrue(insert_stock_price([dict(zip(storage.PRICE_COLUMNS, row)) for row in ROWS]))
+        frames = load_stock_data_multi(["2330", "2317"], "2024-01-01", "2024-01-31")
+        self.assertEqual(len(frames["2330"]), 3)
+        self.assertEqual(frames["2317"]["volume"].tolist(), [0])
+        self.assertEqual(frames["2330"]["trade_date"].iloc[0], pd.Timestamp("2024-01-02"))
+        patch = load_stock_slices("2330", [(date(2024, 1, 3), date(2024, 1, 3))])
+        self.assertEqual(patch["close_price"].tolist(), [578.0])
+
+    def test_name_refresh_failure(self):
+        """未登錄股票的名稱重抓失敗時仍以代碼登錄並寫入；登錄 stock_info 失敗時回傳 False 而不丟出例外"""
+        storage.set_storage(self.storage)
+        patches = [
+            mock.patch.object(stock_info_manager, "_known_ids", None),
+            mock.patch.object(stock_info_map, "stock_dict_n", {}),
+            mock.patch.object(stock_info_map, "_negative_cache", {}),
+            mock.patch.object(stock_info_map, "_last_refresh", 0.0),
+            mock.patch("data_collector.twse_crawler.fetch_twse_stock_list", side_effect=OSError("offline")),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.assertTrue(insert_stock_price(ROWS[3:]))
+        self.assertEqual(self.storage.list_stocks(), [{"stock_id": "2317", "stock_name": "2317"}])
+        with mock.patch("database.data_loader.ensure_stocks_exist", side_effect=RuntimeError("locked")):
+            self.assertFalse(insert_stock_price(ROWS[:1]))
+        self.assertIsNone(self.storage.get_coverage("2330"))
+
+if __name__ == "__main__":
+    unittest.main()
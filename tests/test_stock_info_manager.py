@@ -0,0 +1,93 @@
+"""
+test_stock_info_manager.py
+-------------------
+stock_info 同步測試：整份股票清單批次 upsert（欄位對應、空值、重複代碼）、再次同步覆蓋既有資料、
+ensure_stocks_exist 不覆蓋既有資料，以及程序內已知代碼快取。以暫存 SQLite 檔執行，不需 MySQL。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from database import storage, stock_info_manager
+from database.storage import SQLiteStorage
+from database.stock_info_manager import sync_stock_info, ensure_stocks_exist, is_known_stock
+
+def stock_list(rows):
+    """fetch_twse_stock_list 格式的股票清單"""
+    return pd.DataFrame(rows, columns=["stock_id", "stock_name", "stock_type", "industry", "listing_date"])
+
+class TestSyncStockInfo(unittest.TestCase):
+    """
+    stock_info 同步測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = SQLiteStorage(os.path.join(self.tmpdir, "twse.sqlite"))
+        storage.set_storage(self.db)
+        patches = [
+            mock.patch.object(stock_info_manager, "_known_ids", None),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        storage.set_storage(None)
+        shutil.rmtree(self.tmpdir)
+
+    def stock_info(self) -> dict:
+        rows = self.db.connect().execute("SELECT * FROM stock_info ORDER BY stock_id").fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def test_sync(self):
+        """stock_type 寫入 market_type、空字串寫為 NULL、重複代碼取最後一筆"""
+        count = sync_stock_info(stock_list([
+            ("2330", "台積電", "TW", "半導體業", "1994-09-05"),
+            ("6488", "環球晶", "TWO", "", "2015-09-25"),
+            ("2330", "台灣積體電路", "TW", "半導體業", "1994-09-05"),
+        ]))
+        self.assertEqual(count, 2)
+        self.assertEqual(self.stock_info(), {
+            "2330": ("台灣積體電路", "半導體業", "TW", "1994-09-05"),
+            "6488": ("環球晶", None, "TWO", "2015-09-25"),
+        })
+        self.assertTrue(is_known_stock("6488"))
+
+    def test_resync_overwrites(self):
+        """再次同步時更新既有股票，缺少的欄位寫為 NULL"""
+        sync_stock_info(stock_list([("2330", "台積電", "TW", "半導體業", "1994-09-05")]))
+        sync_stock_info(pd.DataFrame({"stock_id": ["2330", "1101"], "stock_name": ["台積電", "台泥"], "stock_type": ["TW", "TW"]}))
+        self.assertEqual(self.stock_info(), {
+            "1101": ("台泥", None, "TW", None),
+            "2330": ("台積電", None, "TW", None),
+        })
+
+    def test_ensure_keeps_existing(self):
+        """ensure_stocks_exist 只補入不存在的代碼，不覆蓋同步過的資料"""
+        sync_stock_info(stock_list([("2330", "台積電", "TW", "半導體業", "1994-09-05")]))
+        stock_info_manager._known_ids = None
+        self.assertTrue(ensure_stocks_exist([
+            ("2330", "2330", "未知", "TWSE", None),
+            ("0050", "元大台灣50", "未知", "TWSE", None),
+        ]))
+        info = self.stock_info()
+        self.assertEqual(info["2330"], ("台積電", "半導體業", "TW", "1994-09-05"))
+        self.assertEqual(info["0050"], ("元大台灣50", "未知", "TWSE", None))
+
+    def test_sync_failure(self):
+        """寫入失敗時回傳 -1"""
+        with mock.patch.object(self.db, "upsert_stock_info", side_effect=OSError("disk full")):
+            self.assertEqual(sync_stock_info(stock_list([("2330", "台積電", "TW", "半導體業", "1994-09-05")])), -1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+test_stock_info_map.py
+-------------------
+股票名稱解析測試：實際重抓後仍查無的代碼才記入負向快取，重抓因間隔未到而略過時不記入。
+以假的股票清單取代 TWSE 抓取，不需網路。
+"""
+
+import unittest
+from unittest import mock
+import pandas as pd
+from utils import stock_info_map
+from utils.stock_info_map import resolve_stock_name
+
+class TestResolveStockName(unittest.TestCase):
+    """
+    名稱解析與負向快取測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.stock_list = pd.DataFrame({"stock_id": ["2330"], "stock_name": ["台積電"], "stock_type": ["1"]})
+        patches = [
+            mock.patch.object(stock_info_map, "stock_dict_n", {}),
+            mock.patch.object(stock_info_map, "stock_dict_t", {}),
+            mock.patch.object(stock_info_map, "_negative_cache", {}),
+            mock.patch.object(stock_info_map, "_last_refresh", 0.0),
+            mock.patch("data_collector.twse_crawler.fetch_twse_stock_list", return_value=self.stock_list),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_refresh_then_negative_cache(self):
+        """第一次查無即重抓；重抓後仍查無的代碼記入負向快取"""
+        self.assertIsNone(resolve_stock_name("9999"))
+        self.assertIn("9999", stock_info_map._negative_cache)
+        self.assertEqual(resolve_stock_name("2330"), "台積電")
+
+    def test_debounced_miss_not_cached(self):
+        """重抓間隔未到時不記入負向快取，間隔過後仍會重抓"""
+        with mock.patch.object(stock_info_map, "refresh_stock_map", return_value=False) as refresh:
+            self.assertIsNone(resolve_stock_name("2330"))
+            self.assertNotIn("2330", stock_info_map._negative_cache)
+            resolve_stock_name("2330")
+        self.assertEqual(refresh.call_count, 2)
+        self.assertEqual(resolve_stock_name("2330"), "台積電")
+
+    def test_refresh_failure(self):
+        """重抓失敗時回傳 None 而不丟出例外，也不記入負向快取"""
+        with mock.patch("data_collector.twse_crawler.fetch_twse_stock_list", side_effect=OSError("offline")):
+            self.assertIsNone(resolve_stock_name("2330"))
+        self.assertNotIn("2330", stock_info_map._negative_cache)
+
+if __name__ == "__main__":
+    unittest.main()
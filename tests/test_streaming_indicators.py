@@ -0,0 +1,65 @@
+"""
+test_streaming_indicators.py
+-------------------
+逐筆指標引擎測試：輸出與批次計算逐位元相同（含缺值與連續相同收盤價）、保存/還原狀態後接續結果一致。
+"""
+
+import json
+import unittest
+import numpy as np
+import pandas as pd
+from analytics.indicators import calculate_all_indicators, calculate_rsi
+from analytics.streaming_indicators import StreamingIndicators
+
+def price_frame(n=300, seed=1):
+    """產生含缺值與連續相同收盤價的隨機漫步股價"""
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 1.5, n))
+    closes[40:55] = closes[40]
+    closes[[3, 90, 91, 200]] = np.nan
+    volumes = rng.integers(1_000, 50_000, n).astype(np.float64)
+    return pd.DataFrame({"close_price": closes, "volume": volumes})
+
+class TestStreamingIndicators(unittest.TestCase):
+    """
+    逐筆指標引擎測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.df = price_frame()
+
+    def assert_same(self, values, expected, columns):
+        for i, col in enumerate(columns):
+            np.testing.assert_array_equal(values[:, i], expected[col].to_numpy(np.float64), err_msg=col)
+
+    def test_matches_batch(self):
+        """逐筆結果與 calculate_all_indicators 完全相同"""
+        engine = StreamingIndicators()
+        values = engine.run(self.df["close_price"], self.df["volume"])
+        self.assert_same(values, calculate_all_indicators(self.df.copy()), engine.columns())
+
+    def test_wilder_rsi(self):
+        """Wilder 平滑的 RSI 與 calculate_rsi(method='wilder') 相同"""
+        engine = StreamingIndicators({"rsi_method": "wilder"})
+        values = engine.run(self.df["close_price"], self.df["volume"])
+        expected = calculate_rsi(self.df.copy(), method="wilder")
+        np.testing.assert_array_equal(values[:, engine.columns().index("RSI")], expected["RSI"].to_numpy())
+
+    def test_snapshot_restore(self):
+        """中途保存狀態（經 JSON 往返）後還原接續，結果與不中斷計算相同"""
+        closes, volumes = self.df["close_price"].to_numpy(), self.df["volume"].to_numpy()
+        for rsi_method in ("sma", "wilder"):
+            engine = StreamingIndicators({"rsi_method": rsi_method})
+            head = engine.run(closes[:150], volumes[:150])
+            restored = StreamingIndicators.restore(json.loads(json.dumps(engine.snapshot())))
+            tail = restored.run(closes[150:], volumes[150:])
+            expected = StreamingIndicators({"rsi_method": rsi_method}).run(closes, volumes)
+            np.testing.assert_array_equal(np.vstack([head, tail]), expected)
+
+if __name__ == "__main__":
+    unittest.main()
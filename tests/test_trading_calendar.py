@@ -0,0 +1,71 @@
+"""
+test_trading_calendar.py
+-------------------
+交易日曆測試：內附休市日表涵蓋的年度交易日數、未涵蓋年度自動抓取一次，失敗時拒絕判斷而非把平日當成交易日。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+from utils import trading_calendar
+from utils.trading_calendar import trading_days, is_trading_day, covered_ranges, CalendarCoverageError
+
+class TestTradingCalendar(unittest.TestCase):
+    """
+    交易日曆測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "twse_holidays.csv")
+        shutil.copy(trading_calendar.HOLIDAY_PATH, path)
+        patches = [
+            mock.patch.object(trading_calendar, "HOLIDAY_PATH", path),
+            mock.patch.object(trading_calendar, "_holidays", None),
+            mock.patch.object(trading_calendar, "_covered_years", set()),
+            mock.patch.object(trading_calendar, "_fetch_attempted", set()),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_bundled_years(self):
+        """2023 ~ 2026 休市日表已內附"""
+        with mock.patch.object(trading_calendar, "refresh_holidays") as fetch:
+            self.assertEqual(len(trading_days(date(2023, 1, 1), date(2023, 12, 31))), 240)
+            self.assertEqual(len(trading_days(date(2026, 1, 1), date(2026, 10, 16))), 191)
+            self.assertFalse(is_trading_day(date(2026, 2, 17)))
+        fetch.assert_not_called()
+
+    def test_uncovered_year_refuses(self):
+        """未涵蓋的年度只嘗試抓取一次，失敗時丟出例外；週末仍可判斷"""
+        with mock.patch.object(trading_calendar, "refresh_holidays", side_effect=OSError("offline")) as fetch:
+            with self.assertRaises(CalendarCoverageError):
+                is_trading_day(date(2022, 3, 1))
+            with self.assertRaises(CalendarCoverageError):
+                trading_days(date(2022, 12, 1), date(2023, 1, 31))
+            self.assertFalse(is_trading_day(date(2022, 3, 5)))
+            self.assertEqual(covered_ranges(date(2022, 6, 1), date(2023, 3, 1)), [(date(2023, 1, 1), date(2023, 3, 1))])
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_uncovered_year_fetched(self):
+        """自動抓取成功後即以新的休市日表判斷"""
+        def fetch(year):
+            trading_calendar.save_holidays([(date(year, 1, 3), "測試休市", "holiday")])
+
+        with mock.patch.object(trading_calendar, "refresh_holidays", side_effect=fetch):
+            self.assertFalse(is_trading_day(date(2022, 1, 3)))
+            self.assertTrue(is_trading_day(date(2022, 1, 4)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+test_twse_crawler.py
+-------------------
+ISIN 股票清單解析測試：以 tests/fixtures 內的 CP950 (Big5) 頁面離線驗證 lxml 串流解析，
+頁面切成小片段餵入（含切在雙位元組字元中間），確認表頭與分類列被略過、產業別與上市日欄位對應正確，
+且與舊版 BeautifulSoup 解析結果一致。抓取失敗時回傳 None，不讓例外傳出。
+"""
+
+import os
+import unittest
+from unittest import mock
+from data_collector import twse_crawler
+from data_collector.twse_crawler import parse_isin_stream, fetch_isin_market, fetch_stock_list_fast, fetch_stock_list_legacy
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def chunked(content, size):
+    """將頁面內容切成固定大小的片段"""
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+class TestIsinParser(unittest.TestCase):
+    """
+    ISIN 頁面串流解析測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        """讀取 CP950 編碼的上市 ISIN 頁面"""
+        with open(os.path.join(FIXTURE_DIR, "isin_c_public_tw.html"), "rb") as f:
+            self.page = f.read()
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parse_small_chunks(self):
+        """7 位元組片段（會切在 Big5 字元中間）解析結果與整頁一次餵入相同"""
+        expected = [
+            ("1101", "台泥", "TW", "水泥工業", "1962-02-09"),
+            ("2330", "台積電", "TW", "半導體業", "1994-09-05"),
+            ("9911", "櫻花功許", "TW", "其他業", "1992-08-27"),
+            ("030001", "台泥元大41購01", "TW", "", "2024-07-01"),
+        ]
+        self.assertEqual(parse_isin_stream(chunked(self.page, 7), "TW"), expected)
+        self.assertEqual(parse_isin_stream([self.page], "TW"), expected)
+
+    def test_matches_legacy(self):
+        """串流解析與舊版 BeautifulSoup 解析的結果一致"""
+        response = mock.MagicMock(text=self.page.decode("cp950"))
+        with mock.patch.object(twse_crawler, "twse_request", return_value=response), \
+             mock.patch.object(twse_crawler, "TWSE_URL", {"TW": "tw"}):
+            legacy = fetch_stock_list_legacy()
+        self.assertEqual(parse_isin_stream(chunked(self.page, 64), "TW"), legacy)
+
+    def test_fetch_fast(self):
+        """兩個市場並行抓取並依市場別標記"""
+        with mock.patch.object(twse_crawler, "cached_stream", side_effect=lambda *a, **k: iter(chunked(self.page, 100))):
+            rows = fetch_stock_list_fast()
+        self.assertEqual(len(rows), 8)
+        self.assertEqual({row[2] for row in rows}, {"TW", "TWO"})
+
+    def test_failure_returns_none(self):
+        """快取檔讀寫錯誤或內容解析錯誤時回傳 None，並行抓取回傳空清單"""
+        with mock.patch.object(twse_crawler, "cached_stream", side_effect=OSError("disk full")):
+            self.assertIsNone(fetch_isin_market("TW"))
+            self.assertEqual(fetch_stock_list_fast(), [])
+        with mock.patch.object(twse_crawler, "parse_isin_stream", side_effect=UnicodeDecodeError("cp950", b"\xff", 0, 1, "illegal")):
+            with mock.patch.object(twse_crawler, "cached_stream", return_value=iter([self.page])):
+                self.assertIsNone(fetch_isin_market("TW"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+test_update_journal.py
+-------------------
+更新作業進度日誌測試：當日未完成的 run 接續、跨日或已結束的 run 不接續、毀損的最後一行被略過、
+同一秒啟動的 run 不共用日誌檔、最近一次 run 仍失敗的股票，以及 summarize_runs 的耗時統計。日誌寫入暫存目錄。
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from data_collector.update_journal import UpdateJournal, summarize_runs, find_unfinished_run, last_run_failures
+
+def result(stock_id, status, rows=0, elapsed=1.0, last_date=None):
+    """refresh_stock 格式的結果"""
+    return {"stock_id": stock_id, "status": status, "rows": rows, "attempts": 1,
+            "last_date": last_date, "elapsed": elapsed, "error": None if status != "failed" else "down"}
+
+class TestUpdateJournal(unittest.TestCase):
+    """
+    進度日誌測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def journal(self, resume=True):
+        return UpdateJournal(journal_dir=self.tmpdir, resume=resume)
+
+    def test_resume_unfinished(self):
+        """未結束的 run 重新啟動時沿用 run_id，只有 updated/skipped 視為完成"""
+        first = self.journal()
+        first.start(3, "serial")
+        first.record(result("2330", "updated", rows=5, last_date="2024-01-03"))
+        first.record(result("2317", "failed"))
+        first.record(result("1101", "skipped"))
+
+        second = self.journal()
+        self.assertTrue(second.resumed)
+        self.assertEqual(second.run_id, first.run_id)
+        self.assertEqual(second.completed, {"2330": "2024-01-03", "1101": None})
+        self.assertFalse(second.is_done("2317"))
+
+        second.start(1, "serial")
+        second.record(result("2317", "updated", rows=2))
+        second.finish({"updated": 2, "failures": []})
+        third = self.journal()
+        self.assertFalse(third.resumed)
+        self.assertNotEqual(third.run_id, first.run_id)
+
+    def test_no_resume(self):
+        """resume=False、跨日的 run 都不接續"""
+        first = self.journal()
+        first.start(1, "serial")
+        self.assertFalse(self.journal(resume=False).resumed)
+
+        path = os.path.join(self.tmpdir, "20000101-000000-000000-0000.jsonl")
+        os.remove(first.path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"run": "20000101-000000-000000-0000", "ts": "2000-01-01T00:00:00",
+                                "event": "start", "date": str(date.today() - timedelta(days=1))}) + "\n")
+        self.assertIsNone(find_unfinished_run(self.tmpdir))
+
+    def test_truncated_line(self):
+        """中斷時寫到一半的最後一行被略過，其餘紀錄仍可接續"""
+        first = self.journal()
+        first.start(2, "serial")
+        first.record(result("2330", "updated"))
+        with open(first.path, "a", encoding="utf-8") as f:
+            f.write('{"run": "x", "stock_id": "2317", "sta')
+        self.assertEqual(set(self.journal().completed), {"2330"})
+
+    def test_run_ids_unique(self):
+        """同一秒內建立的 run 使用不同日誌檔，排序仍依建立順序"""
+        ids = [self.journal(resume=False).run_id for _ in range(5)]
+        self.assertEqual(len(set(ids)), 5)
+        self.assertEqual(sorted(ids), ids)
+
+    def test_last_run_failures(self):
+        """只看最近一次 run，同檔股票以最後狀態計"""
+        self.assertEqual(last_run_failures(self.tmpdir), [])
+        first = self.journal()
+        first.start(2, "serial")
+        first.record(result("2330", "failed"))
+        first.finish({"updated": 0})
+        second = self.journal()
+        second.start(3, "serial")
+        second.record(result("2317", "failed"))
+        second.record(result("1101", "failed"))
+        second.record(result("2317", "updated"))
+        self.assertEqual(last_run_failures(self.tmpdir), ["1101"])
+
+    def test_summarize_runs(self):
+        """同一 run 中斷後接續算兩段，同檔股票以最後狀態計，耗時統計取各檔 elapsed"""
+        first = self.journal()
+        first.start(3, "serial")
+        first.record(result("2330", "updated", rows=5, elapsed=2.0))
+        first.record(result("2317", "failed", elapsed=8.0))
+        second = self.journal()
+        second.start(1, "serial")
+        second.record(result("2317", "updated", rows=3, elapsed=4.0))
+        second.finish({"updated": 2})
+
+        stats = summarize_runs(self.tmpdir)
+        self.assertEqual(len(stats), 1)
+        run = stats[0]
+        self.assertEqual(run["run_id"], first.run_id)
+        self.assertEqual((run["segments"], run["finished"], run["stocks"], run["updated"], run["failed"], run["rows"]),
+                         (2, True, 2, 2, 0, 8))
+        self.assertAlmostEqual(run["stock_sec_avg"], 14.0 / 3)
+        self.assertEqual((run["stock_sec_p95"], run["stock_sec_max"]), (8.0, 8.0))
+        self.assertGreaterEqual(run["wall_sec"], 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+test_update_plan.py
+-------------------
+每日更新規劃測試：由 stock_info 與 stock_price_coverage 讀取股票清單與最新交易日，
+依交易日曆決定各股票是否需補抓與補抓起始日（颱風休市不算缺資料、無休市日表的年度照常補抓）。
+以暫存 SQLite 檔執行，不需 MySQL 與網路。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+from database import storage
+from database.storage import SQLiteStorage
+from data_collector.data_updater import load_stock_universe, get_all_latest_dates, plan_updates
+from utils import trading_calendar
+
+def bar(stock_id, day):
+    """單筆股價 tuple"""
+    return (stock_id, day, 100.0, 101.0, 99.0, 100.0, 1000)
+
+class TestPlanUpdates(unittest.TestCase):
+    """
+    更新規劃測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = SQLiteStorage(os.path.join(self.tmpdir, "twse.sqlite"))
+        storage.set_storage(self.db)
+        patches = [
+            mock.patch.object(trading_calendar, "_fetch_attempted", set()),
+            mock.patch.object(trading_calendar, "refresh_holidays", side_effect=OSError("offline")),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.db.upsert_stock_info([
+            (stock_id, name, None, "TW", None)
+            for stock_id, name in [("2330", "台積電"), ("2317", "鴻海"), ("1101", "台泥"), ("0050", "元大台灣50")]
+        ])
+        self.db.upsert_prices([
+            bar("2330", "2024-07-23"), bar("2330", "2024-07-26"),
+            bar("2317", "2024-07-22"), bar("2317", "2024-07-23"),
+            bar("0050", "2022-12-30"),
+        ])
+        # 2024/07/24、07/25 颱風停止交易，07/26（週五）為基準日
+        self.today = date(2024, 7, 26)
+
+    def tearDown(self):
+        storage.set_storage(None)
+        shutil.rmtree(self.tmpdir)
+
+    def plan(self, days_tolerance=1):
+        stocks = sorted(load_stock_universe(), key=lambda s: s["stock_id"])
+        plans, skipped = plan_updates(stocks, get_all_latest_dates(), self.today, days_tolerance)
+        return {p["stock_id"]: p["start_date"] for p in plans}, [s["stock_id"] for s in skipped]
+
+    def test_plan(self):
+        """已是最新者略過；缺少交易日者自最新交易日隔天補抓；無資料者補抓一年；無休市日表的年度照常補抓"""
+        plans, skipped = self.plan()
+        self.assertEqual(skipped, ["2330"])
+        self.assertEqual(plans, {
+            "0050": date(2022, 12, 31),
+            "1101": date(2023, 7, 27),
+            "2317": date(2024, 7, 24),
+        })
+
+    def test_tolerance(self):
+        """颱風休市不算缺資料：2317 只缺 07/26 一個交易日，容許 2 日時視為最新"""
+        plans, skipped = self.plan(days_tolerance=2)
+        self.assertEqual(skipped, ["2317", "2330"])
+        self.assertEqual(sorted(plans), ["0050", "1101"])
+
+    def test_latest_dates_filter(self):
+        """get_all_latest_dates 依覆蓋範圍表回傳，可限定股票且略過無資料者"""
+        self.assertEqual(get_all_latest_dates(["2330", "1101"]), {"2330": date(2024, 7, 26)})
+        self.assertEqual(len(get_all_latest_dates()), 3)
+
+if __name__ == "__main__":
+    unittest.main()
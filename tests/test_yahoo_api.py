@@ -0,0 +1,244 @@
+"""
+test_yahoo_api.py
+-------------------
+Yahoo Finance 抓取測試：共用限速器 (TokenBucket) 的額度與等待時間、單檔更新失敗時的指數退避重試、
+批次下載的分批與寬表拆分、歷史資料轉為寫入用 tuple。
+以假時鐘取代 time.monotonic / time.sleep，yfinance 以 mock 取代，不需網路也不實際等待。
+"""
+
+import unittest
+from datetime import date
+from unittest import mock
+import pandas as pd
+from utils import helpers
+from utils.helpers import TokenBucket
+from data_collector import yahoo_api, data_updater
+from data_collector.yahoo_api import fetch_stock_data_batch, split_batch_frame, history_to_rows, history_to_records
+from database.data_loader import PRICE_COLUMNS
+
+class FakeClock:
+    """假時鐘：sleep 只推進時間並記錄等待秒數"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def history_frame(days, closes):
+    """產生 Ticker.history 格式的歷史資料"""
+    return pd.DataFrame(
+        {"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": [1000] * len(closes)},
+        index=pd.DatetimeIndex(pd.to_datetime(days), name="Date"),
+    )
+
+def download_frame(codes, start, end, **kwargs):
+    """假的 yf.download：依請求區間產生 group_by="ticker" 的多檔寬表（9999.TW 查無資料）"""
+    days = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+    frames = {}
+    for k, code in enumerate(c for c in codes if c != "9999.TW"):
+        closes = [100.0 + k + i for i in range(len(days))]
+        frames[code] = history_frame(days, closes)
+    if not frames:
+        return pd.DataFrame()
+    wide = pd.concat(frames, axis=1)
+    if "8888.TW" in frames:
+        wide.loc[wide.index[0], ("8888.TW", "Close")] = float("nan")
+    return wide
+
+class TestTokenBucket(unittest.TestCase):
+    """
+    限速器測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(helpers, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_rate(self):
+        """桶內額度可瞬間取用，用完後依補充速率等待"""
+        bucket = TokenBucket(rate=4, capacity=8)
+        self.assertEqual([bucket.acquire() for _ in range(8)], [0.0] * 8)
+        self.assertAlmostEqual(bucket.acquire(), 0.25)
+        self.assertAlmostEqual(bucket.acquire(), 0.25)
+        self.assertAlmostEqual(self.clock.now, 0.5)
+
+    def test_refill_capped(self):
+        """閒置期間補充的額度不超過桶容量"""
+        bucket = TokenBucket(rate=2, capacity=3)
+        for _ in range(3):
+            bucket.acquire()
+        self.clock.now += 100
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0] * 3)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+
+    def test_multiple_tokens(self):
+        """一次取得多個 token 時等待補足差額"""
+        bucket = TokenBucket(rate=1, capacity=2)
+        self.assertAlmostEqual(bucket.acquire(2), 0.0)
+        self.assertAlmostEqual(bucket.acquire(2), 2.0)
+        self.assertEqual(self.clock.sleeps, [2.0])
+
+class TestRetryBackoff(unittest.TestCase):
+    """
+    單檔更新重試測試（yfinance 以 mock 取代）
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.clock = FakeClock()
+        self.ticker = mock.MagicMock()
+        self.insert = mock.MagicMock(return_value=True)
+        patches = [
+            mock.patch.object(data_updater, "time", self.clock),
+            mock.patch.object(yahoo_api, "YAHOO_RATE_LIMITER", mock.MagicMock()),
+            mock.patch.object(yahoo_api.yf, "Ticker", return_value=self.ticker),
+            mock.patch.object(data_updater, "insert_stock_price", self.insert),
+            mock.patch.object(data_updater, "get_stock_type", return_value="TW"),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def refresh(self, max_retries=3):
+        return data_updater.refresh_stock("2330", "台積電", date(2024, 1, 2), date(2024, 1, 3), max_retries=max_retries)
+
+    def test_retry_then_success(self):
+        """前兩次失敗後成功，等待時間依 RETRY_BACKOFF 加倍"""
+        self.ticker.history.side_effect = [
+            ConnectionError("reset"), TimeoutError("timeout"), history_frame(["2024-01-02", "2024-01-03"], [590.0, 593.0]),
+        ]
+        result = self.refresh()
+        self.assertEqual((result["status"], result["attempts"], result["rows"]), ("updated", 3, 2))
+        self.assertEqual(result["last_date"], "2024-01-03")
+        self.assertEqual(self.clock.sleeps, [data_updater.RETRY_BACKOFF, data_updater.RETRY_BACKOFF * 2])
+        self.assertEqual(self.insert.call_args.args[0][0], ("2330", "2024-01-02", 590.0, 590.0, 590.0, 590.0, 1000))
+        self.assertEqual(yahoo_api.yf.Ticker.call_args.args, ("2330.TW",))
+
+    def test_give_up(self):
+        """超過重試次數時回報失敗，最後一次失敗後不再等待"""
+        self.ticker.history.side_effect = ConnectionError("down")
+        result = self.refresh(max_retries=2)
+        self.assertEqual((result["status"], result["attempts"], result["error"]), ("failed", 2, "down"))
+        self.assertEqual(self.clock.sleeps, [data_updater.RETRY_BACKOFF])
+
+    def test_insert_failure_retried(self):
+        """寫入資料庫失敗亦視為失敗並重試"""
+        self.ticker.history.return_value = history_frame(["2024-01-02"], [590.0])
+        self.insert.side_effect = [False, True]
+        result = self.refresh()
+        self.assertEqual((result["status"], result["attempts"]), ("updated", 2))
+
+class TestBatchDownload(unittest.TestCase):
+    """
+    批次下載測試（yf.download 以假寬表取代）
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def setUp(self):
+        self.download = mock.MagicMock(side_effect=download_frame)
+        patches = [
+            mock.patch.object(yahoo_api.yf, "download", self.download),
+            mock.patch.object(yahoo_api, "YAHOO_RATE_LIMITER", mock.MagicMock()),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_chunks_by_end_date(self):
+        """相同結束日依起始日排序後每 chunk_size 檔一次下載，不同結束日分開下載"""
+        requests_list = [
+            ("1101.TW", "2024-01-03", "2024-01-10"),
+            ("2330.TW", "2024-01-01", "2024-01-10"),
+            ("2317.TW", "2024-01-08", "2024-01-10"),
+            ("2454.TW", "2024-01-02", "2024-01-10"),
+            ("3008.TW", "2024-01-05", "2024-01-06"),
+        ]
+        results = fetch_stock_data_batch(requests_list, chunk_size=2, as_rows=True)
+        calls = [(c.args[0], c.kwargs["start"], c.kwargs["end"]) for c in self.download.call_args_list]
+        self.assertEqual(calls, [
+            (["2330.TW", "2454.TW"], "2024-01-01", "2024-01-10"),
+            (["1101.TW", "2317.TW"], "2024-01-03", "2024-01-10"),
+            (["3008.TW"], "2024-01-05", "2024-01-06"),
+        ])
+        self.assertEqual(sorted(results), sorted(code for code, _, _ in requests_list))
+        # 同批下載區間取最早起始日，各檔再依自己的起始日裁切
+        self.assertEqual([r[1] for r in results["2454.TW"]], ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08", "2024-01-09"])
+        self.assertEqual([r[1] for r in results["2317.TW"]], ["2024-01-08", "2024-01-09"])
+        self.assertEqual(results["2330.TW"][0], ("2330", "2024-01-01", 100.0, 100.0, 100.0, 100.0, 1000))
+
+    def test_missing_and_failed(self):
+        """查無資料的股票回傳空 list，下載失敗的批次略過"""
+        self.download.side_effect = [download_frame(["2330.TW", "9999.TW"], "2024-01-01", "2024-01-05"), ConnectionError("down")]
+        results = fetch_stock_data_batch(
+            [("2330.TW", "2024-01-01", "2024-01-05"), ("9999.TW", "2024-01-01", "2024-01-05"), ("1101.TW", "2024-01-02", "2024-01-05")],
+            chunk_size=2,
+        )
+        self.assertEqual(results["9999.TW"], [])
+        self.assertNotIn("1101.TW", results)
+        self.assertEqual(results["2330.TW"][0]["trade_date"], "2024-01-01")
+
+    def test_split_batch_frame(self):
+        """多檔寬表取出單檔並去除無收盤價的列；單層欄位直接使用；空表回傳空 DataFrame"""
+        wide = download_frame(["2330.TW", "8888.TW"], "2024-01-01", "2024-01-05")
+        self.assertEqual(list(split_batch_frame(wide, "2330.TW").columns), ["Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(len(split_batch_frame(wide, "2330.TW")), 4)
+        self.assertEqual(len(split_batch_frame(wide, "8888.TW")), 3)
+        self.assertTrue(split_batch_frame(wide, "9999.TW").empty)
+        self.assertEqual(len(split_batch_frame(wide["2330.TW"], "2330.TW")), 4)
+        self.assertTrue(split_batch_frame(pd.DataFrame(), "2330.TW").empty)
+
+class TestHistoryToRows(unittest.TestCase):
+    """
+    歷史資料轉換測試
+
+    參數：
+        unittest.TestCase
+
+    返回：
+        NA
+    """
+    def test_rows(self):
+        """依 PRICE_COLUMNS 排列、代碼去除市場後綴、成交量空值補 0，且皆為 Python 原生型別"""
+        hist = pd.DataFrame(
+            {"Open": [590.0, 591.5], "High": [593.0, 594.0], "Low": [589.0, 590.0], "Close": [593.0, 592.0],
+             "Volume": [26059058, float("nan")], "Dividends": [0.0, 0.0]},
+            index=pd.DatetimeIndex(["2024-01-02", "2024-01-03"], tz="Asia/Taipei", name="Date"),
+        )
+        rows = history_to_rows(hist, "2330.TW")
+        self.assertEqual(rows, [
+            ("2330", "2024-01-02", 590.0, 593.0, 589.0, 593.0, 26059058),
+            ("2330", "2024-01-03", 591.5, 594.0, 590.0, 592.0, 0),
+        ])
+        self.assertEqual([type(v) for v in rows[0]], [str, str, float, float, float, float, int])
+        self.assertEqual(history_to_records(hist, "2330.TW")[0], dict(zip(PRICE_COLUMNS, rows[0])))
+
+    def test_empty(self):
+        """無資料時回傳空 list"""
+        self.assertEqual(history_to_rows(pd.DataFrame(), "2330.TW"), [])
+        self.assertEqual(history_to_rows(None, "2330.TW"), [])
+
+if __name__ == "__main__":
+    unittest.main()
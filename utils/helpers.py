@@ -1,11 +1,13 @@
 """
 utils/helpers.py
 -----------
-提供常用工具：日誌設定、日期區間產生等。
+提供常用工具：日誌設定、限速器、日期區間產生等。
 """
 
 import os
+import time
 import logging
+import threading
 # from datetime import datetime, timedelta
 
 def setup_logger(name="app", level=logging.INFO):
@@ -39,3 +41,45 @@ def setup_logger(name="app", level=logging.INFO):
 #         days.append(start.strftime("%Y-%m-%d"))
 #         start += timedelta(days=1)
 #     return days
+
+# ---------------------
+# 限速器
+# ---------------------
+class TokenBucket:
+    """
+    執行緒安全的 Token Bucket 限速器，供多執行緒共用同一組外部 API 額度
+    
+    參數：
+        rate (float): 每秒補充的 token 數
+        capacity (int): 桶容量（允許的瞬間突發請求數，預設與 rate 相同）
+    """
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1):
+        """
+        取得 token，額度不足時阻塞等待
+        
+        參數：
+            tokens (int): 需要的 token 數
+        
+        返回：
+            waited (float): 等待秒數
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -2,20 +2,57 @@
 utils/stock_name_map.py
 -----------
 取得台灣證交所上市股票代碼與中文名稱、上市櫃類別碼對照
+另提供名稱解析服務 resolve_stock_name：
+    - 實際重抓後仍查無名稱的代碼記入負向快取，期限內不再觸發重抓
+      （重抓因間隔未到而略過時不記入，間隔過後仍會重試）
+    - 重抓股票清單為 single-flight：同一時間只有一個呼叫端執行，且每個區間最多一次
+    - 重抓後直接更新記憶體中的對照表
 """
 
 from utils.helpers import setup_logger
+import time
+import threading
 import pandas as pd
 
 logger = setup_logger("stock_name_map")
 
-try:
-    stock_map = pd.read_csv("data/tw_stock_list.csv", dtype=str)
-except FileNotFoundError:
-    stock_map = pd.DataFrame(columns=["stock_id", "stock_name", "stock_type"])
+STOCK_LIST_PATH = "data/tw_stock_list.csv"
+NEGATIVE_CACHE_TTL = 24 * 3600   # 查無名稱代碼的快取秒數
+REFRESH_INTERVAL = 6 * 3600      # 股票清單最短重抓間隔秒數
 
-stock_dict_n = dict(zip(stock_map.stock_id, stock_map.stock_name))
-stock_dict_t = dict(zip(stock_map.stock_id, stock_map.stock_type))
+stock_dict_n = {}
+stock_dict_t = {}
+
+_negative_cache = {}             # stock_id -> 到期時間
+_refresh_lock = threading.Lock()
+_last_refresh = 0.0              # 本程序最近一次重抓的時間（啟動後第一次查無名稱即可重抓）
+
+def reload_stock_map(stock_map: pd.DataFrame = None, path: str = STOCK_LIST_PATH):
+    """
+    重新載入股票對照表至記憶體（就地更新，既有參照同步生效）
+    
+    參數：
+        stock_map (pd.DataFrame): 股票清單，None 時自 path 讀取
+        path (str): 股票清單 CSV 路徑
+    
+    返回：
+        count (int): 股票檔數
+    """
+    if stock_map is None:
+        try:
+            stock_map = pd.read_csv(path, dtype=str)
+        except FileNotFoundError:
+            stock_map = pd.DataFrame(columns=["stock_id", "stock_name", "stock_type"])
+
+    names = dict(zip(stock_map.stock_id, stock_map.stock_name))
+    types = dict(zip(stock_map.stock_id, stock_map.stock_type))
+    stock_dict_n.clear()
+    stock_dict_n.update(names)
+    stock_dict_t.clear()
+    stock_dict_t.update(types)
+    return len(names)
+
+reload_stock_map()
 
 def get_stock_name(stock_id: str) -> str:
     """
@@ -40,3 +77,60 @@ def get_stock_type(stock_id: str) -> str:
         str
     """
     return stock_dict_t.get(stock_id, stock_id)
+
+def resolve_stock_name(stock_id: str):
+    """
+    解析中文名稱：對照表查無時最多觸發一次清單重抓，
+    重抓成功後仍查無的代碼（ETF、權證、外國代碼等）記入負向快取
+    
+    參數：
+        stock_id (str): 股票代碼
+    
+    返回型別：
+        str | None
+    """
+    name = stock_dict_n.get(stock_id)
+    if name:
+        return name
+
+    expiry = _negative_cache.get(stock_id)
+    if expiry and expiry > time.time():
+        return None
+
+    refreshed = refresh_stock_map()
+    name = stock_dict_n.get(stock_id)
+    if not name and refreshed:
+        _negative_cache[stock_id] = time.time() + NEGATIVE_CACHE_TTL
+        logger.info(f"resolve_stock_name 查無 {stock_id}，加入負向快取")
+    return name
+
+def refresh_stock_map(force: bool = False) -> bool:
+    """
+    重抓股票清單並更新記憶體對照表（single-flight，REFRESH_INTERVAL 內最多一次）
+    其他呼叫端會等待進行中的重抓完成後直接使用新對照表
+    
+    參數：
+        force (bool): 忽略重抓間隔
+    
+    返回型別：
+        bool: 是否實際完成重抓（重抓失敗時回傳 False）
+    """
+    global _last_refresh
+    with _refresh_lock:
+        if not force and time.time() - _last_refresh < REFRESH_INTERVAL:
+            return False
+        _last_refresh = time.time()
+
+        try:
+            from data_collector.twse_crawler import fetch_twse_stock_list
+            df = fetch_twse_stock_list(save_path=STOCK_LIST_PATH)
+            if df is None:
+                return False
+            count = reload_stock_map(df.astype(str))
+        except Exception as e:
+            # 重抓失敗只影響名稱解析，不中斷呼叫端（例如股價寫入）
+            logger.warning(f"refresh_stock_map 失敗：{e}")
+            return False
+        _negative_cache.clear()
+        print(f"🔄 股票對照表已重新載入，共 {count} 檔")
+        return True
@@ -0,0 +1,346 @@
+"""
+utils/trading_calendar.py
+-----------
+台股 (TWSE/TPEx) 交易日曆：
+    - 週末、國定假日、春節前無交易日與颱風停止交易日皆視為非交易日
+    - 休市日表快取於 data/twse_holidays.csv，可自 TWSE 休市日程更新，颱風休市可臨時加入
+    - 只判斷休市日表涵蓋的年度：查詢未涵蓋的年度時自動向 TWSE 抓取一次，
+      仍無資料則記錄警告並拋出 CalendarCoverageError，不把平日一律當成交易日
+    - expected_latest_session 回傳「目前應已存在資料的最新交易日」，供資料新鮮度判斷
+"""
+
+from utils.helpers import setup_logger
+import os
+import threading
+from datetime import datetime, date, time, timedelta
+import pandas as pd
+
+logger = setup_logger("trading_calendar")
+
+HOLIDAY_PATH = os.path.join("data", "twse_holidays.csv")
+TWSE_HOLIDAY_URL = "https://www.twse.com.tw/rwd/zh/holidaySchedule/holidaySchedule?date={year}&response=json"
+SESSION_DATA_READY = time(14, 30)   # 收盤 13:30，收盤行情約 14:30 後可取得
+# 休市日程中列出、但其實有交易的日期（開始/最後交易日）
+TRADING_DAY_KEYWORDS = ("開始交易", "最後交易")
+
+_lock = threading.Lock()
+_holidays = None
+_covered_years = set()      # 休市日表涵蓋的年度（含國定假日列，僅有颱風休市的年度不算）
+_fetch_attempted = set()    # 本程序已嘗試自動抓取的年度
+
+
+class CalendarCoverageError(ValueError):
+    """查詢日期所在年度沒有休市日表，無法判斷是否為交易日"""
+
+# ---------------------
+# 休市日表
+# ---------------------
+def load_holidays(path: str = None) -> dict:
+    """
+    載入休市日表（結果快取於記憶體），並記錄涵蓋的年度
+
+    參數：
+        path (str): 休市日 CSV 路徑（None 為 HOLIDAY_PATH）
+
+    返回：
+        holidays (dict[date, str]): {休市日: 名稱}
+    """
+    global _holidays, _covered_years
+    with _lock:
+        if _holidays is None:
+            path = path or HOLIDAY_PATH
+            try:
+                df = pd.read_csv(path, dtype=str)
+                days = [datetime.strptime(d, "%Y-%m-%d").date() for d in df["date"]]
+                _holidays = dict(zip(days, df["name"]))
+                _covered_years = {d.year for d, t in zip(days, df["type"]) if t == "holiday"}
+            except FileNotFoundError:
+                logger.warning(f"找不到休市日表 {path}")
+                _holidays, _covered_years = {}, set()
+        return _holidays
+
+def ensure_year(year: int) -> bool:
+    """
+    確認休市日表涵蓋指定年度，未涵蓋時向 TWSE 抓取（每個年度於本程序只嘗試一次）
+
+    參數：
+        year (int): 西元年
+
+    返回：
+        covered (bool): 是否已涵蓋
+    """
+    load_holidays()
+    if year in _covered_years:
+        return True
+    with _lock:
+        if year in _fetch_attempted:
+            return False
+        _fetch_attempted.add(year)
+
+    try:
+        refresh_holidays(year)
+    except Exception as e:
+        logger.warning(f"自動抓取 {year} 年休市日表失敗：{e}")
+    load_holidays()
+    if year not in _covered_years:
+        logger.warning(f"沒有 {year} 年休市日表，不判斷該年度的交易日（可執行 refresh_holidays({year}) 後重試）")
+        return False
+    return True
+
+def covered_ranges(start_date, end_date) -> list:
+    """
+    將日期區間切成休市日表涵蓋的片段（未涵蓋的年度會先嘗試自動抓取）
+
+    參數：
+        start_date (str | date): 起始日期
+        end_date (str | date): 結束日期
+
+    返回：
+        ranges (list[tuple[date, date]]): 涵蓋的子區間，依日期排序
+    """
+    start, end = to_date(start_date), to_date(end_date)
+    ranges = []
+    for year in range(start.year, end.year + 1):
+        if not ensure_year(year):
+            continue
+        first, last = max(start, date(year, 1, 1)), min(end, date(year, 12, 31))
+        if ranges and ranges[-1][1] + timedelta(days=1) == first:
+            ranges[-1] = (ranges[-1][0], last)
+        else:
+            ranges.append((first, last))
+    return ranges
+
+def save_holidays(rows, path: str = None):
+    """
+    合併寫入休市日表並更新記憶體快取
+
+    參數：
+        rows (list[tuple]): [(date, name, type)]
+        path (str): 休市日 CSV 路徑（None 為 HOLIDAY_PATH）
+
+    返回：
+        NA
+    """
+    global _holidays
+    path = path or HOLIDAY_PATH
+    new = pd.DataFrame([(d.strftime("%Y-%m-%d"), n, t) for d, n, t in rows], columns=["date", "name", "type"])
+    if os.path.exists(path):
+        new = pd.concat([pd.read_csv(path, dtype=str), new], ignore_index=True)
+    new = new.drop_duplicates(subset=["date"], keep="last").sort_values("date")
+    new.to_csv(path, index=False, encoding="utf-8")
+    with _lock:
+        _holidays = None
+
+def add_market_closure(day, reason: str = "颱風停止交易", closure_type: str = "typhoon"):
+    """
+    加入臨時休市日（例如颱風停止交易）
+
+    參數：
+        day (str | date): 休市日
+        reason (str): 原因
+        closure_type (str): 類型
+
+    返回：
+        NA
+    """
+    save_holidays([(to_date(day), reason, closure_type)])
+    print(f"✅ 已加入休市日 {to_date(day)}（{reason}）")
+
+def refresh_holidays(year: int) -> int:
+    """
+    自 TWSE 休市日程更新指定年度的休市日表
+
+    參數：
+        year (int): 西元年
+
+    返回：
+        count (int): 更新筆數
+    """
+    from data_collector.http_cache import cached_get
+
+    resp = cached_get(TWSE_HOLIDAY_URL.format(year=year))
+    resp.raise_for_status()
+    rows = parse_holiday_schedule(resp.json())
+    if rows:
+        save_holidays(rows)
+    print(f"✅ {year} 年休市日表更新完成，共 {len(rows)} 日")
+    return len(rows)
+
+def parse_holiday_schedule(payload: dict) -> list:
+    """
+    解析 TWSE 休市日程 JSON（日期支援西元 YYYY-MM-DD 與民國 YYY/MM/DD），
+    略過「開始交易日」「最後交易日」等有交易的日期與週末
+
+    參數：
+        payload (dict): TWSE 休市日程回傳 JSON
+
+    返回：
+        rows (list[tuple]): [(date, name, "holiday")]
+    """
+    rows = []
+    for record in payload.get("data") or []:
+        text, name = str(record[0]).strip(), str(record[1]).strip()
+        if any(k in name for k in TRADING_DAY_KEYWORDS):
+            continue
+        try:
+            if "-" in text:
+                day = datetime.strptime(text, "%Y-%m-%d").date()
+            else:
+                y, m, d = (int(x) for x in text.split("/"))
+                day = date(y + 1911 if y < 1911 else y, m, d)
+        except ValueError:
+            continue
+        if day.weekday() < 5:
+            rows.append((day, name, "holiday"))
+    return rows
+
+# ---------------------
+# 交易日判斷
+# ---------------------
+def to_date(value) -> date:
+    """
+    將字串 (YYYY-MM-DD)、datetime 或 pd.Timestamp 轉為 date
+
+    參數：
+        value (str | date): 日期
+
+    返回：
+        date
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+def is_trading_day(day) -> bool:
+    """
+    是否為交易日（週末一律不是；平日需休市日表涵蓋該年度，否則丟出 CalendarCoverageError）
+
+    參數：
+        day (str | date): 日期
+
+    返回：
+        bool
+    """
+    day = to_date(day)
+    if day.weekday() >= 5:
+        return False
+    if not ensure_year(day.year):
+        raise CalendarCoverageError(f"沒有 {day.year} 年休市日表，無法判斷 {day} 是否為交易日")
+    return day not in load_holidays()
+
+def previous_trading_day(day) -> date:
+    """
+    指定日期之前（不含當日）的最近交易日
+
+    參數：
+        day (str | date): 日期
+
+    返回：
+        date
+    """
+    day = to_date(day) - timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+def next_trading_day(day) -> date:
+    """
+    指定日期之後（不含當日）的最近交易日
+
+    參數：
+        day (str | date): 日期
+
+    返回：
+        date
+    """
+    day = to_date(day) + timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+def trading_days(start_date, end_date) -> list:
+    """
+    區間內（含頭尾）所有交易日
+
+    參數：
+        start_date (str | date): 起始日期
+        end_date (str | date): 結束日期
+
+    返回：
+        days (list[date])
+    """
+    day, end = to_date(start_date), to_date(end_date)
+    days = []
+    while day <= end:
+        if is_trading_day(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def last_trading_day_on_or_before(day) -> date:
+    """
+    指定日期當日（若為交易日）或之前的最近交易日
+
+    參數：
+        day (str | date): 日期
+
+    返回：
+        date
+    """
+    day = to_date(day)
+    return day if is_trading_day(day) else previous_trading_day(day)
+
+def expected_latest_session(as_of=None) -> date:
+    """
+    目前應已有收盤資料的最新交易日：
+    當日為交易日且已過 SESSION_DATA_READY 時為當日，否則為前一交易日
+
+    參數：
+        as_of (datetime | date): 基準時間，None 為現在；
+                                 傳入今日的 date 時以目前時間判斷，其他日期視為當日已收盤
+
+    返回：
+        date
+    """
+    if as_of is None:
+        as_of = datetime.now()
+    elif not isinstance(as_of, datetime):
+        as_of = to_date(as_of)
+        as_of = datetime.now() if as_of == date.today() else datetime.combine(as_of, time.max)
+
+    day = as_of.date()
+    if is_trading_day(day) and as_of.time() >= SESSION_DATA_READY:
+        return day
+    return previous_trading_day(day)
+
+def has_new_session(latest_date, as_of=None) -> bool:
+    """
+    資料庫最新交易日之後是否已有新的交易日收盤資料可抓
+
+    參數：
+        latest_date (date): 資料庫最新交易日（None 視為無資料）
+        as_of (datetime | date): 基準時間
+
+    返回：
+        bool
+    """
+    return latest_date is None or to_date(latest_date) < expected_latest_session(as_of)
+
+def count_missing_sessions(latest_date, as_of=None) -> int:
+    """
+    資料庫最新交易日之後，至 expected_latest_session 為止缺少的交易日數
+
+    參數：
+        latest_date (date): 資料庫最新交易日
+        as_of (datetime | date): 基準時間
+
+    返回：
+        int
+    """
+    expected = expected_latest_session(as_of)
+    latest = to_date(latest_date)
+    if latest >= expected:
+        return 0
+    return len(trading_days(latest + timedelta(days=1), expected))
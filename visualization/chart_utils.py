@@ -2,12 +2,14 @@
 visualization/chart_utils.py
 ----------------
 建立多股票技術技術指標繪圖功能，
-包含 MA、RSI、MACD、BB、VOL。
+包含 MA、RSI、MACD、BB、VOL、均線帶。
 """
 
 from utils.helpers import setup_logger
 import plotly.graph_objects as go
 import pandas as pd
+from analytics.indicators import RIBBON_WINDOWS, calculate_ma_ribbon
+from analytics.indicator_planner import ribbon_column
 
 logger = setup_logger("chart_utils")
 
@@ -179,4 +181,48 @@ def plot_volume(df: pd.DataFrame, stock_name: str, ma_volume: str = None):
         xaxis_title="日期",
         yaxis_title="成交量"
     )
-    return fig
\ No newline at end of file
+    return fig
+
+# -------------------------
+# 均線帶（收盤價或成交量）
+# -------------------------
+def plot_ma_ribbon(df: pd.DataFrame, stock_name: str, column: str = "close_price", windows=RIBBON_WINDOWS):
+    """
+    均線帶：多個視窗的移動平均由短到長以漸層顏色繪製（缺少均線帶欄位時即時計算）
+    
+    參數：
+        df (pd.Dataframe): 股價資料
+        stock_name (str): 股票名稱
+        column (str): close_price 或 volume
+        windows (list): 均線基準
+    
+    返回型別：
+        fig (go.Figure()): 圖表物件
+    """
+    if column not in df.columns:
+        return None
+    if any(ribbon_column(column, w) not in df.columns for w in windows):
+        df = calculate_ma_ribbon(df, windows, columns=(column,))
+
+    is_volume = column == "volume"
+    label = "成交量" if is_volume else "收盤價"
+    fig = go.Figure()
+    if is_volume:
+        fig.add_trace(go.Bar(x=df["trade_date"], y=df[column], name=label, marker_color="lightgray"))
+    else:
+        fig.add_trace(go.Scatter(x=df["trade_date"], y=df[column], mode="lines", name=label, line=dict(color="black", width=1)))
+
+    for i, w in enumerate(windows):
+        # 短天期偏暖色、長天期偏冷色
+        hue = int(30 + 200 * i / max(len(windows) - 1, 1))
+        fig.add_trace(go.Scatter(
+            x=df["trade_date"], y=df[ribbon_column(column, w)],
+            mode="lines", name=f"{w} 日均線", line=dict(color=f"hsl({hue}, 70%, 45%)", width=1.5)
+        ))
+
+    fig.update_layout(
+        title=f"{stock_name} {label}均線帶",
+        xaxis_title="日期",
+        yaxis_title="成交量" if is_volume else "價格"
+    )
+    return fig
@@ -12,8 +12,10 @@ import pandas as pd
 import time
 from datetime import datetime, timedelta
 from analytics.trend_analysis import analyze_trend
-from analytics.indicators import calculate_all_indicators
+from analytics.indicator_store import attach_indicators, attach_indicators_multi
+from analytics.indicators import calculate_ma_ribbon
 from utils.stock_info_map import get_stock_name
+from utils.trading_calendar import to_date
 from visualization.summary_table import build_summary_table
 from visualization.chart_utils import (
     plot_price_ma,
@@ -21,11 +23,15 @@ from visualization.chart_utils import (
     plot_macd,
     plot_bollinger_bands,
     plot_volume,
+    plot_ma_ribbon,
 )
 from data_collector.data_updater import (
-    fetch_and_store,
-    check_stock_data_exists,
-    load_stock_data,
+    load_stock_data_multi,
+    find_missing_intervals,
+    is_tw_market,
+    backfill_intervals,
+    load_stock_slices,
+    merge_stock_slices,
 )
 from data_collector.hot_stock_fetcher import (
     merge_and_save_hot_stocks,
@@ -37,7 +43,9 @@ logger = setup_logger("dashboard")
 
 def ensure_data_completeness(stock_id: str, start_date: str, end_date: str):
     """
-    檢查資料是否完整，若缺少日期範圍內的最新資料則自動抓取補齊。
+    檢查資料是否完整，偵測區間內缺少的交易日（含中段缺口），
+    合併為最少的補抓請求後補齊，並只重新讀取補上的區段。
+    缺口偵測只用於上市/上櫃股票，其他市場只在區間內無資料時整段抓取。
     
     參數：
         stock_id (str): : 股票代碼
@@ -47,37 +55,48 @@ def ensure_data_completeness(stock_id: str, start_date: str, end_date: str):
     返回：
         df (pd.Dataframe): 股價資料
     """
-    # Step 1: 自動補抓缺資料
-    exists = check_stock_data_exists(stock_id, start_date, end_date)
-    if not exists:
-        print(f"⚠️ 資料庫中無 {stock_id} 資料，自動抓取中...")
-        fetch_and_store(stock_id, start_date, end_date)
-
-        # schedule.every().day.at("09:00").do(daily_task, stock_id=stock_id)
-        # print(f"⏰ 已設定每日 9:00 自動抓取 {stock_id} 資料並更新技術指標")
+    return ensure_data_completeness_multi([stock_id], start_date, end_date)[stock_id]
 
-    # Step 2: 讀取資料庫
-    df = load_stock_data(stock_id, start_date, end_date)
+def ensure_data_completeness_multi(stock_ids: list, start_date: str, end_date: str) -> dict:
+    """
+    多檔股票版 ensure_data_completeness：以單一查詢讀取所有股票後逐檔偵測缺口並補抓
     
-    if df.empty:
-        st.error(f"❌ 抓取 {stock_id} 資料失敗，請檢查股票代碼或網路連線")
-        
-    # Step 3: 偵測資料庫缺口
-    else:
-        latest_date_in_db = df["trade_date"].max().date()
-        if type(start_date) is str:
-            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-        if type(end_date) is str:
-            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
-            
-        # 若資料未涵蓋至結束日期，則補抓缺口
-        if latest_date_in_db < end_date:
-            missing_start = latest_date_in_db + timedelta(days=1)
-            st.info(f"📥 發現 {stock_id} 資料缺少 {missing_start} 到 {end_date}，自動補抓中...")
-            fetch_and_store(stock_id, missing_start, end_date)
-            df = load_stock_data(stock_id, start_date, end_date)
-        
-    return df
+    參數：
+        stock_ids (list[str]): 股票代碼
+        start_date (str): 查詢起始日期
+        end_date (str): 查詢結束日期
+    
+    返回：
+        frames (dict[str, pd.Dataframe]): {stock_id: 股價資料}，查無資料的股票為空 DataFrame
+    """
+    start_date, end_date = to_date(start_date), to_date(end_date)
+
+    # Step 1: 一次讀取所有股票
+    frames = load_stock_data_multi(stock_ids, start_date, end_date)
+
+    for stock_id in stock_ids:
+        df = frames.get(stock_id, pd.DataFrame())
+
+        # Step 2: 依交易日曆偵測缺口（週末與休市日不視為缺口）；
+        # 其他市場不適用 TWSE 交易日曆，只在區間內完全沒有資料時整段抓取
+        if is_tw_market(stock_id):
+            existing = df["trade_date"].dt.date if not df.empty else []
+            gaps = find_missing_intervals(stock_id, start_date, end_date, existing_dates=existing)
+        else:
+            gaps = [(start_date, end_date)] if df.empty else []
+
+        # Step 3: 補抓缺口並只重新讀取補上的區段
+        if gaps:
+            ranges = "、".join(f"{s} ~ {e}" for s, e in gaps)
+            st.info(f"📥 發現 {stock_id} 資料缺少 {ranges}，自動補抓中...")
+            patched = backfill_intervals(stock_id, gaps)
+            df = merge_stock_slices(df, load_stock_slices(stock_id, patched))
+
+        if df.empty:
+            st.error(f"❌ 抓取 {stock_id} 資料失敗，請檢查股票代碼或網路連線")
+        frames[stock_id] = df
+
+    return frames
 
 def run_dashboard():
     """
@@ -126,8 +145,8 @@ def run_dashboard():
                 return
             
             else:
-                # 計算技術指標
-                df = calculate_all_indicators(df)
+                # 技術指標（優先讀取預先計算的結果）
+                df = attach_indicators(df, stock_id)
                 generate_charts(df, stock_name)  
                 
                 # 取得資料更新時間
@@ -151,16 +170,17 @@ def run_dashboard():
             return
 
         stock_data_dict = {}
+        frames = ensure_data_completeness_multi(stock_ids, start_date, end_date)
+        if any(frames[stock_id].empty for stock_id in stock_ids):
+            return
+
+        # 技術指標：預先計算的結果一次讀取，其餘合併為一次面板計算
+        frames = attach_indicators_multi(frames)
         for stock_id in stock_ids:
             stock_name = get_stock_name(stock_id)
-            df = ensure_data_completeness(stock_id, start_date, end_date)
-            if df.empty:
-                return
-            
-            if not df.empty:
-                df = calculate_all_indicators(df)
-                stock_data_dict[stock_id] = (stock_name, df)
-                generate_charts(df, stock_name)                    
+            df = frames[stock_id]
+            stock_data_dict[stock_id] = (stock_name, df)
+            generate_charts(df, stock_name)
 
         if not stock_data_dict:
             st.error("❌ 無法取得任何股票資料，請確認代號是否正確。")
@@ -241,6 +261,14 @@ def generate_charts(df: pd.DataFrame, stock_name: str):
         fig_vol = plot_volume(df, stock_name, ma_volume="volume_MA5")
         fig_vol.data[1].name = "成交量 5 日均線"
         if fig_vol: st.plotly_chart(fig_vol, use_container_width=True)    
+
+        # -----------------------------
+        # 均線帶（5/10/20/60/120/240 日，收盤價與成交量）
+        # -----------------------------
+        df_ribbon = calculate_ma_ribbon(df)
+        for column in ("close_price", "volume"):
+            fig_ribbon = plot_ma_ribbon(df_ribbon, stock_name, column)
+            if fig_ribbon: st.plotly_chart(fig_ribbon, use_container_width=True)
     
 def hot_stock_fetcher() -> str:
     """